@@ -28,6 +28,102 @@ class Settings(BaseSettings):
     # Database (Legacy/Optional)
     database_url: str = ""
 
+    # Object storage: "supabase", "s3" (R2 credentials above) or "local" (disk, for dev/tests),
+    # with per-bucket overrides as "bucket=backend[:target-bucket]" pairs
+    storage_backend: str = "supabase"
+    storage_buckets: str = ""
+    storage_local_root: str = ".storage"
+    storage_max_concurrency: int = 16  # In-flight requests per backend
+
+    # Lesson content delivery
+    content_url_ttl_seconds: int = 3600  # Lifetime of signed lesson content URLs
+    content_url_cache_margin_seconds: int = 300  # Stop handing out URLs this close to expiry
+    lesson_bundle_ttl_seconds: int = 30  # Cached lesson rows and quiz ids behind /bundle
+    course_nav_ttl_seconds: int = 30  # Cached course navigation indexes (other instances' writes show up after this)
+
+    # Published course snapshots: how long an instance trusts its cached
+    # slug/id -> snapshot pointer before asking the database again
+    snapshot_pointer_ttl_seconds: int = 60
+
+    # Response serialization for large course/quiz trees: "off" (FastAPI validates
+    # against response_model), "validate" (precompiled TypeAdapter) or "project"
+    # (field projection + orjson, no re-validation)
+    json_fast_path: str = "off"
+    # Rows fetched per round trip when a list endpoint streams its result
+    stream_page_size: int = 500
+
+    # Response compression: br when the client accepts it (gzip otherwise) for the
+    # allowlisted types at or above compression_min_size bytes. Immutable payloads
+    # (strong ETag or Cache-Control: immutable) are compressed once at
+    # compression_immutable_quality and kept in an in-process cache
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_types: str = "application/json,application/x-ndjson,text/markdown,text/mdx,text/plain,text/html,text/css,text/javascript,application/javascript,image/svg+xml"
+    compression_brotli_quality: int = 5  # 0-11; dynamic responses favour speed
+    compression_gzip_level: int = 6  # 1-9
+    compression_immutable_quality: int = 11
+    compression_cache_size: int = 256  # Compressed immutable bodies kept per instance
+
+    # Lesson view counters: views are buffered ("memory", or "file" - an append-only
+    # spool that survives serverless freezes; "auto" picks file on Vercel) and written
+    # as one batched increment every view_flush_interval_seconds or
+    # view_flush_max_pending views, which bounds what a crash can lose
+    view_buffer_mode: str = "auto"
+    view_flush_interval_seconds: float = 10
+    view_flush_max_pending: int = 5000
+    view_spool_path: str = "/tmp/learnify-lesson-views.log"
+
+    # Learning events (POST /api/events): batches are buffered in memory and appended
+    # with one ingest_learning_events() call per event_flush_batch_size rows, every
+    # event_flush_interval_seconds or once event_flush_max_pending events are waiting.
+    # A full buffer (event_buffer_max) answers 503 so clients back off and resend.
+    event_flush_interval_seconds: float = 2
+    event_flush_max_pending: int = 5000
+    event_flush_batch_size: int = 5000
+    event_buffer_max: int = 100000
+    event_max_age_hours: int = 72  # Events older than this (or over 5 min in the future) are rejected
+    event_rollup_interval_seconds: float = 60
+    event_retention_days: int = 30  # Raw partitions kept after rollup
+
+    # Quiz attempt answers: "compact" stores them on the attempt row as option indices
+    # plus a correctness bitmap against a shared quiz layout (migrations/
+    # add_compact_attempt_answers.sql); "rows" writes one quiz_attempt_answers row per
+    # question. Reads decode both.
+    quiz_answer_storage: str = "compact"
+    # quiz_attempts / quiz_attempt_answers are partitioned by submitted_at month
+    # (migrations/add_quiz_attempt_partitions.sql). /cron/quiz-attempts creates
+    # partitions this many months ahead and rolls up, then detaches, months older
+    # than the retention window
+    quiz_attempt_partitions_ahead: int = 3
+    quiz_attempt_retention_months: int = 24
+    # Regrading after an answer key change ('quiz.regrade' job): attempts are read
+    # regrade_page_size rows per round trip and changed ones written back
+    # regrade_batch_size per apply_quiz_regrade() call
+    regrade_page_size: int = 1000
+    regrade_batch_size: int = 1000
+
+    # Image processing
+    image_variant_widths: str = "320,640,960,1280,1920"  # Responsive widths, comma separated
+    image_webp_quality: int = 80
+
+    # Search: "postgres" (tsvector + GIN) or "memory" (in-process index for local dev)
+    search_backend: str = "postgres"
+
+    # Background jobs: "thread" drains in-process, "cron" leaves draining to /cron/jobs,
+    # "auto" picks cron on Vercel and thread everywhere else
+    job_worker_mode: str = "auto"
+    job_poll_interval_seconds: float = 5
+    job_batch_size: int = 100
+    job_lease_seconds: int = 300
+
+    # Storage garbage collection: objects younger than this are never collected
+    # (covers direct uploads that have not been completed yet)
+    storage_gc_min_age_hours: int = 24
+
+    # Shared secret for the /cron endpoints that change data. Vercel cron sends it as
+    # "Authorization: Bearer <CRON_SECRET>"; unset, those endpoints refuse every call
+    cron_secret: str = ""
+
     # CORS
     allowed_origins: str = "http://localhost:3000,https://learnify-dev-rosy.vercel.app"
 
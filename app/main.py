@@ -2,8 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 from app.config import get_settings
+from app.middleware import CompressionMiddleware, compression_metrics
 # from app.database import engine, Base
-from app.routers import courses, chapters, lessons, quiz, cron
+from app.routers import courses, chapters, lessons, quiz, cron, uploads, search, events
+from app.services.event_service import event_buffer
+from app.services.job_queue import job_worker
+from app.services.view_counter import view_counter
 
 settings = get_settings()
 
@@ -37,12 +41,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added after CORS so it wraps it: every response, CORS headers included, is compressed last
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(courses.router)
 app.include_router(chapters.router)
 app.include_router(lessons.router)
 app.include_router(quiz.router)
 app.include_router(cron.router)
+app.include_router(uploads.router)
+app.include_router(search.router)
+app.include_router(events.router)
+
+
+@app.on_event("startup")
+def start_job_worker():
+    # No-op in serverless mode; /cron/jobs drains the outbox there
+    job_worker.start()
+    view_counter.start()
+    event_buffer.start()
+
+
+@app.on_event("shutdown")
+def stop_job_worker():
+    job_worker.stop()
+    # Write out buffered lesson views before the process exits
+    view_counter.stop()
+    event_buffer.stop()
 
 
 @app.get("/")
@@ -53,3 +79,12 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "compression": compression_metrics.snapshot(),
+        "views": view_counter.metrics(),
+        "events": event_buffer.metrics(),
+    }
@@ -0,0 +1 @@
+from app.middleware.compression import CompressionMiddleware, compression_metrics
@@ -0,0 +1,250 @@
+from typing import List, Optional
+import gzip
+import hashlib
+import threading
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.services.cache_service import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli is in requirements; gzip is always available
+    brotli = None
+
+settings = get_settings()
+
+
+class CompressionMetrics:
+    """Running totals of what compression saved, for the /metrics endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = {
+                "responses": 0, "streams": 0, "skipped": 0,
+                "bytes_in": 0, "bytes_out": 0,
+                "cache_hits": 0, "cache_misses": 0,
+                "br": 0, "gzip": 0,
+            }
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, streamed: bool = False, cached: Optional[bool] = None):
+        with self._lock:
+            self._counts["streams" if streamed else "responses"] += 1
+            self._counts[encoding] += 1
+            self._counts["bytes_in"] += bytes_in
+            self._counts["bytes_out"] += bytes_out
+            if cached is not None:
+                self._counts["cache_hits" if cached else "cache_misses"] += 1
+
+    def skip(self):
+        with self._lock:
+            self._counts["skipped"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["bytes_saved"] = counts["bytes_in"] - counts["bytes_out"]
+        counts["ratio"] = round(counts["bytes_out"] / counts["bytes_in"], 4) if counts["bytes_in"] else None
+        return counts
+
+
+compression_metrics = CompressionMetrics()
+
+# (encoding, ETag or body hash) -> compressed body; immutable payloads are compressed once
+compressed_body_cache = TTLCache(maxsize=settings.compression_cache_size, ttl=24 * 3600)
+
+
+def _content_types() -> List[str]:
+    return [t.strip() for t in settings.compression_types.split(",") if t.strip()]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported encoding the client accepts: br, then gzip"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in (["br"] if brotli is not None else []) + ["gzip"]:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, quality: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality if quality is None else quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level if quality is None else min(quality, 9), mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental encoder; every chunk is flushed so streamed rows reach the client as they are produced"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, chunk: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def _immutable_key(headers: Headers, body: bytes) -> Optional[str]:
+    """
+    Cache key for payloads whose bytes never change under the same identity:
+    strong ETags (snapshots are tagged with their content hash) and
+    Cache-Control: immutable responses (keyed by a hash of the body).
+    """
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return f"etag:{etag}"
+    if "immutable" in headers.get("cache-control", ""):
+        return f"sha256:{hashlib.sha256(body).hexdigest()}"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip response compression for the JSON course trees and MDX
+    documents this API serves. Only allowlisted content types at or above
+    compression_min_size are compressed; streamed responses are compressed
+    chunk by chunk. Immutable payloads are compressed once at the highest
+    quality and served from compressed_body_cache afterwards.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressedResponder(self.app, encoding)(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, app: ASGIApp, encoding: str):
+        self.app = app
+        self.encoding = encoding
+        self.send = None
+        self.start: Optional[Message] = None
+        self.compressible = False
+        self.stream: Optional[_StreamCompressor] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk shows whether this is a stream
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").split(";")[0].strip()
+            self.start = message
+            self.compressible = (
+                message["status"] not in (204, 304)
+                and "content-encoding" not in headers
+                and content_type in _content_types()
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not self.compressible:
+                await self.send(start)
+                await self.send(message)
+                return
+            if not more_body:
+                await self._send_whole(start, body)
+                return
+            self.stream = _StreamCompressor(self.encoding)
+            headers = MutableHeaders(raw=start["headers"])
+            del headers["content-length"]
+            self._set_encoding_headers(headers)
+            await self.send(start)
+
+        if self.stream is None:
+            await self.send(message)
+            return
+
+        self.bytes_in += len(body)
+        chunk = self.stream.process(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        self.bytes_out += len(chunk)
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            compression_metrics.record(self.encoding, self.bytes_in, self.bytes_out, streamed=True)
+
+    async def _send_whole(self, start: Message, body: bytes):
+        headers = MutableHeaders(raw=start["headers"])
+        if len(body) < settings.compression_min_size:
+            compression_metrics.skip()
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        key = _immutable_key(headers, body)
+        cached = None
+        if key is not None:
+            cache_key = f"{self.encoding}:{key}"
+            compressed = compressed_body_cache.get(cache_key)
+            cached = compressed is not None
+            if compressed is None:
+                compressed = compress(body, self.encoding, quality=settings.compression_immutable_quality)
+                compressed_body_cache.set(cache_key, compressed)
+        else:
+            compressed = compress(body, self.encoding)
+
+        if len(compressed) >= len(body):
+            compression_metrics.skip()
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        compression_metrics.record(self.encoding, len(body), len(compressed), cached=cached)
+        headers["content-length"] = str(len(compressed))
+        self._set_encoding_headers(headers)
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _set_encoding_headers(self, headers: MutableHeaders):
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Text, Integer, Date, DateTime, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import uuid
 from app.database import Base
@@ -23,6 +23,9 @@ class Lesson(Base):
     position = Column(Integer, nullable=False)
     status = Column(String(20), nullable=False, default="Draft")
     mdx_path = Column(Text)
+    content_hash = Column(Text)  # sha256 of the MDX the outline was built from
+    content_outline = Column(JSONB)  # Headings, TOC, reading time, references
+    content_text = Column(Text)  # Plain text extracted from the MDX, for search
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
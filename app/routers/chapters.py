@@ -8,8 +8,16 @@ from app.schemas import (
     ChapterUpdate,
     ChapterResponse,
     ChapterWithLessons,
+    BulkChapterCreate,
+    BulkCreateResponse,
     ReorderChapters,
+    MoveRequest,
 )
+from app.services.database_service import bulk_create, constraint_errors
+from app.services.fast_json import respond
+from app.services.navigation_service import NavigationService
+from app.services.ordering_service import OrderingService
+from app.services.search_service import SearchService
 
 router = APIRouter(prefix="/api/chapters", tags=["chapters"])
 
@@ -21,44 +29,40 @@ def supabase_client():
 @router.post("/", response_model=ChapterResponse, status_code=status.HTTP_201_CREATED)
 def create_chapter(chapter: ChapterCreate):
     """Create a new chapter"""
-    # Verify course exists
-    course_exists = (
-        supabase_client().table("courses")
-        .select("id")
-        .eq("id", str(chapter.course_id))
-        .execute()
-    )
-    if not course_exists.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Course with id '{chapter.course_id}' not found",
-        )
-
-    # Check unique slug per course
-    existing = (
-        supabase_client().table("chapters")
-        .select("id")
-        .eq("course_id", str(chapter.course_id))
-        .eq("slug", chapter.slug)
-        .execute()
-    )
-
-    if existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Chapter with slug '{chapter.slug}' already exists in this course",
-        )
-
+    # The course foreign key and unique(course_id, slug) are checked by the insert itself
     data = chapter.model_dump()
     data["course_id"] = str(data["course_id"])
-    result = supabase_client().table("chapters").insert(data).execute()
+    with constraint_errors(
+        unique_detail=f"Chapter with slug '{chapter.slug}' already exists in this course",
+        foreign_key_detail=f"Course with id '{chapter.course_id}' not found",
+    ):
+        result = supabase_client().table("chapters").insert(data).execute()
     
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create chapter")
-        
+
+    SearchService.index_chapter(result.data[0])
+    NavigationService.invalidate(result.data[0]["course_id"])
     return result.data[0]
 
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+def bulk_create_chapters(payload: BulkChapterCreate):
+    """
+    Create many chapters in one request. Items whose course is missing or whose
+    slug is taken are reported in results; the rest are created in list order.
+    """
+    items = [chapter.model_dump(mode="json") for chapter in payload.chapters]
+    response = bulk_create("bulk_create_chapters", items)
+
+    for item, result in zip(items, response["results"]):
+        if result.get("id"):
+            SearchService.index_chapter({**item, "id": result["id"]})
+    for course_id in {item["course_id"] for item in items}:
+        NavigationService.invalidate(course_id)
+    return response
+
+
 @router.get("/course/{course_id}", response_model=List[ChapterWithLessons])
 def list_chapters_by_course(course_id: uuid.UUID):
     """List all chapters for a course, ordered by position"""
@@ -67,17 +71,16 @@ def list_chapters_by_course(course_id: uuid.UUID):
         supabase_client().table("chapters")
         .select("*, lessons(*)")
         .eq("course_id", str(course_id))
-        .order("position", descending=False)
+        .order("sort_key", descending=False)
         .execute()
     )
     
-    chapters = result.data
+    chapters = OrderingService.sort(result.data)
     # Sort lessons inside chapters
     for chapter in chapters:
-        if chapter.get("lessons"):
-             chapter["lessons"] = sorted(chapter["lessons"], key=lambda x: x.get("position", 0))
+        OrderingService.sort(chapter.get("lessons"))
 
-    return chapters
+    return respond(List[ChapterWithLessons], chapters)
 
 
 @router.get("/{chapter_id}", response_model=ChapterWithLessons)
@@ -98,10 +101,9 @@ def get_chapter(chapter_id: uuid.UUID):
         )
     
     chapter = result.data[0]
-    if chapter.get("lessons"):
-             chapter["lessons"] = sorted(chapter["lessons"], key=lambda x: x.get("position", 0))
+    OrderingService.sort(chapter.get("lessons"))
 
-    return chapter
+    return respond(ChapterWithLessons, chapter)
 
 
 @router.put("/{chapter_id}", response_model=ChapterResponse)
@@ -109,61 +111,58 @@ def update_chapter(
     chapter_id: uuid.UUID, chapter_update: ChapterUpdate
 ):
     """Update chapter"""
-    # Check existence
-    existing = (
-        supabase_client().table("chapters")
-        .select("id")
-        .eq("id", str(chapter_id))
-        .execute()
-    )
-    if not existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id '{chapter_id}' not found",
-        )
-
     update_data = chapter_update.model_dump(exclude_unset=True)
     if not update_data:
-        return (
+        result = (
             supabase_client().table("chapters")
             .select("*")
             .eq("id", str(chapter_id))
-            .single()
+            .limit(1)
             .execute()
-            .data
         )
-
-    result = (
-        supabase_client().table("chapters")
-        .update(update_data)
-        .eq("id", str(chapter_id))
-        .execute()
-    )
-    
+    else:
+        with constraint_errors(
+            unique_detail=f"Chapter with slug '{update_data.get('slug')}' already exists in this course",
+        ):
+            result = (
+                supabase_client().table("chapters")
+                .update(update_data)
+                .eq("id", str(chapter_id))
+                .execute()
+            )
+
+    # The update returns the changed rows, so no rows means no such chapter
     if not result.data:
-         raise HTTPException(status_code=500, detail="Failed to update chapter")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chapter with id '{chapter_id}' not found",
+        )
 
+    if update_data:
+        SearchService.index_chapter(result.data[0])
+        NavigationService.invalidate(result.data[0]["course_id"])
     return result.data[0]
 
 
 @router.post("/reorder", response_model=dict)
 def reorder_chapters(reorder_data: ReorderChapters):
     """Reorder chapters (for drag & drop)"""
-    # Note: This is an expensive operation if done one by one. 
-    # Supabase/Postgrest doesn't support bulk update easily.
-    # We will do loop updates for now.
-    
-    for item in reorder_data.chapter_positions:
-        chapter_id = (
-            str(item["id"]) if isinstance(item["id"], uuid.UUID) else item["id"]
-        )
-        new_position = item["position"]
-
-        supabase_client().table("chapters").update({"position": new_position}).eq("id", chapter_id).execute()
+    # Siblings left out of the list keep their order; prefer /{chapter_id}/move for single drags
+    items = reorder_data.chapter_positions
+    OrderingService.reorder("chapters", items)
+    NavigationService.invalidate(item_ids=[item["id"] for item in items])
 
     return {"success": True, "message": "Chapters reordered"}
 
 
+@router.post("/{chapter_id}/move", response_model=ChapterResponse)
+def move_chapter(chapter_id: uuid.UUID, move: MoveRequest):
+    """Move one chapter before/after a sibling (or to the end); only its sort key is rewritten"""
+    chapter = OrderingService.move("chapters", chapter_id, move.before_id, move.after_id)
+    NavigationService.invalidate(chapter.get("course_id"))
+    return chapter
+
+
 @router.delete("/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_chapter(chapter_id: uuid.UUID):
     """Delete chapter (cascade delete lessons)"""
@@ -183,4 +182,6 @@ def delete_chapter(chapter_id: uuid.UUID):
             detail=f"Chapter with id '{chapter_id}' not found",
         )
 
+    NavigationService.invalidate(result.data[0].get("course_id"))
+    SearchService.remove("chapter", str(chapter_id))
     return None
@@ -1,9 +1,28 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from typing import List, Optional
 import uuid
 
 from app.supabase_client import get_client
-from app.schemas import CourseCreate, CourseUpdate, CourseResponse, CourseWithChapters
+from app.schemas import (
+    CourseCreate, CourseUpdate, CourseClone, CourseResponse, CourseWithChapters, CourseNavigation, LessonPosition,
+)
+from app.services.course_bundle_service import CourseBundleService
+from app.services.course_clone_service import CourseCloneService
+from app.services.course_publish_service import CoursePublishService
+from app.services.fast_json import respond, stream_rows, wants_ndjson
+from app.services.database_service import constraint_errors, iter_pages
+from app.services.ordering_service import OrderingService
+from app.services.navigation_service import NavigationService
+from app.services.search_service import SearchService
+from app.services.snapshot_service import SnapshotService
+from app.config import get_settings
+
+settings = get_settings()
+
+# Courses carry their whole outline, so stream them in smaller pages than flat rows
+COURSE_STREAM_PAGE_SIZE = 20
 
 router = APIRouter(prefix="/api/courses", tags=["courses"])
 
@@ -12,60 +31,66 @@ def supabase_client():
     return get_client()
 
 
+def _sort_outline(course: dict) -> dict:
+    """Order chapters and their lessons by sort key (nested selects come back unordered)"""
+    for chapter in OrderingService.sort(course.get("chapters")):
+        OrderingService.sort(chapter.get("lessons"))
+    return course
+
+
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
 def create_course(course: CourseCreate):
     """Create a new course"""
-    # Check if slug already exists
-    existing = (
-        supabase_client().table("courses")
-        .select("id")
-        .eq("slug", course.slug)
-        .execute()
-    )
-    if existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Course with slug '{course.slug}' already exists",
-        )
-
-    # Insert
+    # The unique slug constraint rejects duplicates in the same round trip
     data = course.model_dump()
-    result = supabase_client().table("courses").insert(data).execute()
+    with constraint_errors(unique_detail=f"Course with slug '{course.slug}' already exists"):
+        result = supabase_client().table("courses").insert(data).execute()
     
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create course")
-        
+
+    SearchService.index_course(result.data[0])
     return result.data[0]
 
 
 @router.get("/", response_model=List[CourseWithChapters])
-def list_courses(skip: int = 0, limit: int = 100, status: str = None):
-    """List all courses with chapters and lessons"""
-    query = supabase_client().table("courses").select("*, chapters(*, lessons(*))")
+def list_courses(request: Request, skip: int = 0, limit: int = 100, status: str = None, stream: bool = False):
+    """
+    List all courses with chapters and lessons.
+    stream=true (or Accept: application/x-ndjson) pages through the result and
+    streams it as it is read, so limit can cover the whole catalogue.
+    """
+    def build_query():
+        query = supabase_client().table("courses").select("*, chapters(*, lessons(*))")
+        if status:
+            query = query.eq("status", status)
+        return query.order("created_at").order("id")
 
-    if status:
-        query = query.eq("status", status)
+    ndjson = wants_ndjson(request)
+    if stream or ndjson:
+        pages = iter_pages(build_query, COURSE_STREAM_PAGE_SIZE, start=skip, stop=skip + limit)
+        return stream_rows(
+            ([_sort_outline(course) for course in page] for page in pages), CourseWithChapters, ndjson=ndjson,
+        )
 
-    result = query.range(skip, skip + limit - 1).execute()
+    result = build_query().range(skip, skip + limit - 1).execute()
     
     courses = result.data
     
     # Sort data locally since Supabase nested sorting is limited
     for course in courses:
-        if course.get("chapters"):
-            # Sort chapters
-            course["chapters"].sort(key=lambda x: x.get("position", 0))
-            for chapter in course["chapters"]:
-                if chapter.get("lessons"):
-                    # Sort lessons
-                    chapter["lessons"].sort(key=lambda x: x.get("position", 0))
-                    
-    return courses
+        _sort_outline(course)
+
+    return respond(List[CourseWithChapters], courses)
 
 
 @router.get("/{course_id}", response_model=CourseWithChapters)
 def get_course(course_id: uuid.UUID):
     """Get course by ID with chapters"""
+    return respond(CourseWithChapters, _load_course(course_id))
+
+
+def _load_course(course_id: uuid.UUID) -> dict:
     # Supabase select with nested resources
     # We want chapters and lessons. Note: Sorting within nested resources can be tricky in one query
     # Simple nested select: *, chapters(*, lessons(*))
@@ -84,17 +109,7 @@ def get_course(course_id: uuid.UUID):
             detail=f"Course with id '{course_id}' not found",
         )
 
-    course = result.data[0]
-    # Sort chapters by position
-    if course.get("chapters"):
-        for chapter in course["chapters"]:
-            # Sort lessons by position
-            if chapter.get("lessons"):
-                chapter["lessons"] = sorted(chapter["lessons"], key=lambda x: x.get("position", 0))
-        
-        course["chapters"] = sorted(course["chapters"], key=lambda x: x.get("position", 0))
-
-    return course
+    return _sort_outline(result.data[0])
 
 
 @router.get("/slug/{slug}", response_model=CourseWithChapters)
@@ -114,57 +129,158 @@ def get_course_by_slug(slug: str):
             detail=f"Course with slug '{slug}' not found",
         )
 
-    course = result.data[0]
-    
-    # Sort chapters and lessons (since API might return them unsorted)
-    if course.get("chapters"):
-        for chapter in course["chapters"]:
-            if chapter.get("lessons"):
-                chapter["lessons"] = sorted(chapter["lessons"], key=lambda x: x.get("position", 0))
-        
-        course["chapters"] = sorted(course["chapters"], key=lambda x: x.get("position", 0))
+    return respond(CourseWithChapters, _sort_outline(result.data[0]))
 
-    return course
 
+@router.post("/{course_id}/clone", response_model=CourseWithChapters, status_code=status.HTTP_201_CREATED)
+def clone_course(course_id: uuid.UUID, options: CourseClone = None):
+    """Deep-copy a course (chapters, lessons, quizzes and lesson files) as a new Draft; 502 and no clone if a lesson file cannot be copied"""
+    options = options or CourseClone()
+    clone = CourseCloneService.clone(str(course_id), options.title, options.slug)
+    return respond(CourseWithChapters, SearchService.index_outline(_load_course(uuid.UUID(clone["course_id"]))))
 
-@router.put("/{course_id}", response_model=CourseResponse)
-def update_course(course_id: uuid.UUID, course_update: CourseUpdate):
-    """Update course"""
-    # Check existence
-    existing = (
-        supabase_client().table("courses")
-        .select("id")
-        .eq("id", str(course_id))
-        .execute()
-    )
-    if not existing.data:
+
+@router.post("/{course_id}/publish", response_model=CourseWithChapters)
+def publish_course(course_id: uuid.UUID):
+    """
+    Validate the whole course and publish it with its chapters, lessons and
+    quizzes in one transaction. Responds 422 with the blocking problems when
+    something is incomplete.
+    """
+    CoursePublishService.publish(str(course_id))
+    return respond(CourseWithChapters, _load_course(course_id))
+
+
+@router.get("/{course_id}/export")
+def export_course(course_id: uuid.UUID):
+    """Stream the course tree, quizzes and referenced files as an NDJSON bundle"""
+    course = CourseBundleService.get_course(str(course_id))
+    if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Course with id '{course_id}' not found",
         )
+    return StreamingResponse(
+        CourseBundleService.export_stream(course),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{course["slug"]}.ndjson"'},
+    )
+
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_course(request: Request, slug: Optional[str] = None):
+    """
+    Create a Draft course from an export bundle streamed as the request body.
+    Pass slug to import next to an existing copy of the course; lesson slugs
+    then get the new course slug as a suffix, as they do when cloning.
+    """
+    result = await CourseBundleService.import_stream(request.stream(), slug)
+    SearchService.index_outline(await run_in_threadpool(_load_course, uuid.UUID(result["course_id"])))
+    return result
+
+
+@router.get("/slug/{slug}/snapshot")
+def get_course_snapshot_by_slug(
+    slug: str, request: Request, mode: str = Query("inline", pattern="^(inline|url|redirect)$"),
+):
+    """
+    Published course tree (CourseWithChapters) served from its immutable
+    snapshot instead of the database. mode=url returns the snapshot's storage
+    URL and mode=redirect sends the client straight to it.
+    """
+    return _snapshot_response(SnapshotService.get_pointer(slug=slug), "course", mode, request)
+
+
+@router.get("/{course_id}/snapshot")
+def get_course_snapshot(
+    course_id: uuid.UUID, request: Request, mode: str = Query("inline", pattern="^(inline|url|redirect)$"),
+):
+    """Published course tree by id, served from its snapshot (see /slug/{slug}/snapshot)"""
+    return _snapshot_response(SnapshotService.get_pointer(course_id=str(course_id)), "course", mode, request)
+
+
+@router.get("/{course_id}/quizzes/snapshot")
+def get_course_quizzes_snapshot(
+    course_id: uuid.UUID, request: Request, mode: str = Query("inline", pattern="^(inline|url|redirect)$"),
+):
+    """Published quizzes of a course (QuizUser, without answers) served from the snapshot"""
+    return _snapshot_response(SnapshotService.get_pointer(course_id=str(course_id)), "quizzes", mode, request)
+
+
+@router.get("/{course_id}/navigation", response_model=CourseNavigation)
+def get_course_navigation(course_id: uuid.UUID):
+    """Every lesson of the course in reading order with its ordinal, plus chapter boundaries"""
+    return NavigationService.get(str(course_id)).as_dict()
+
+
+@router.get("/{course_id}/navigation/{lesson_id}", response_model=LessonPosition)
+def get_lesson_position(course_id: uuid.UUID, lesson_id: uuid.UUID):
+    """A lesson's ordinal, chapter and prev/next lessons, across chapter boundaries"""
+    position = NavigationService.get(str(course_id)).position(lesson_id=str(lesson_id))
+    if position is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with id '{lesson_id}' not found in this course",
+        )
+    return position
+
+
+def _snapshot_response(pointer: dict, part: str, mode: str, request: Request):
+    """
+    The snapshot object itself is immutable and cached for a year; responses
+    addressed by course id/slug are only cached as long as the pointer is.
+    """
+    snapshot = pointer[part]
+    etag = f'"{snapshot["etag"]}"'
+    max_age = settings.snapshot_pointer_ttl_seconds
+    headers = {"Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={max_age * 10}", "ETag": etag}
+
+    if mode == "redirect":
+        return RedirectResponse(
+            SnapshotService.public_url(snapshot["path"]), status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers=headers,
+        )
+    if mode == "url":
+        return JSONResponse(
+            {"url": SnapshotService.public_url(snapshot["path"]), "etag": snapshot["etag"], "published_at": pointer["published_at"]},
+            headers=headers,
+        )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(SnapshotService.read(snapshot["path"]), media_type="application/json", headers=headers)
 
+
+@router.put("/{course_id}", response_model=CourseResponse)
+def update_course(course_id: uuid.UUID, course_update: CourseUpdate):
+    """Update course"""
     update_data = course_update.model_dump(exclude_unset=True)
     if not update_data:
         # Nothing to update, fetch and return
-        return (
+        result = (
             supabase_client().table("courses")
             .select("*")
             .eq("id", str(course_id))
-            .single()
+            .limit(1)
             .execute()
-            .data
         )
+    else:
+        with constraint_errors(unique_detail=f"Course with slug '{update_data.get('slug')}' already exists"):
+            result = (
+                supabase_client().table("courses")
+                .update(update_data)
+                .eq("id", str(course_id))
+                .execute()
+            )
 
-    result = (
-        supabase_client().table("courses")
-        .update(update_data)
-        .eq("id", str(course_id))
-        .execute()
-    )
-    
+    # The update returns the changed rows, so no rows means no such course
     if not result.data:
-        raise HTTPException(status_code=500, detail="Failed to update course")
-        
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id '{course_id}' not found",
+        )
+
+    if update_data:
+        SearchService.index_course(result.data[0])
+        SnapshotService.invalidate(str(course_id), result.data[0].get("slug"))
     return result.data[0]
 
 
@@ -184,5 +300,8 @@ def delete_course(course_id: uuid.UUID):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Course with id '{course_id}' not found",
         )
-    
+
+    SearchService.remove("course", str(course_id))
+    SnapshotService.invalidate(str(course_id), result.data[0].get("slug"))
+    NavigationService.invalidate(str(course_id))
     return None
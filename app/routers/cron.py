@@ -1,12 +1,35 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from typing import List, Optional
+import hmac
 import time
 
+from app.config import get_settings
+
+from app.services.event_service import event_buffer
+from app.services.job_queue import JobQueue
+from app.services.quiz_service import QuizService
+from app.services.storage_gc import StorageGCService
+from app.services.view_counter import view_counter
+
+settings = get_settings()
+
 router = APIRouter(
     prefix="/cron",
     tags=["Cron"],
     responses={404: {"description": "Not found"}},
 )
 
+def require_cron_secret(authorization: Optional[str] = Header(None)):
+    """Only the scheduler (Authorization: Bearer <CRON_SECRET>) may run jobs, GC or retention"""
+    if not settings.cron_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="CRON_SECRET is not configured",
+        )
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {settings.cron_secret}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid cron secret")
+
+
 @router.get("/wake")
 async def wake_website():
     """
@@ -18,3 +41,59 @@ async def wake_website():
         "timestamp": time.time(),
         "message": "Server is running hot! 🔥"
     }
+
+
+@router.get("/jobs", dependencies=[Depends(require_cron_secret)])
+def drain_jobs(max_jobs: int = 500):
+    """
+    Drain the background job outbox.
+    Driven by the Vercel cron in serverless mode, where no worker thread runs.
+    """
+    report = JobQueue.drain(max_jobs=max_jobs)
+    return {"status": "ok", "timestamp": time.time(), **report}
+
+
+@router.get("/storage-gc", dependencies=[Depends(require_cron_secret)])
+def collect_storage_garbage(
+    dry_run: bool = True,
+    bucket: Optional[List[str]] = Query(None),
+    include_r2: bool = False,
+):
+    """
+    Find (and with dry_run=false, delete) storage objects no row references.
+    Defaults to a dry run that only reports what would be removed.
+    """
+    report = StorageGCService.run(buckets=bucket, dry_run=dry_run, include_r2=include_r2)
+    return {"status": "ok", "timestamp": time.time(), **report}
+
+
+@router.get("/views", dependencies=[Depends(require_cron_secret)])
+def flush_lesson_views():
+    """
+    Write buffered lesson views to the database.
+    Driven by the Vercel cron in serverless mode; the flusher thread does this otherwise.
+    """
+    report = view_counter.flush()
+    return {"status": "ok", "timestamp": time.time(), **report, "metrics": view_counter.metrics()}
+
+
+@router.get("/events", dependencies=[Depends(require_cron_secret)])
+def flush_learning_events():
+    """
+    Write buffered learning events and roll them up into the per-lesson and
+    per-user aggregates. Driven by the Vercel cron in serverless mode; the
+    buffer's thread does this otherwise.
+    """
+    report = event_buffer.flush()
+    rollup = event_buffer.rollup()
+    return {"status": "ok", "timestamp": time.time(), **report, "rollup": rollup, "metrics": event_buffer.metrics()}
+
+
+@router.get("/quiz-attempts", dependencies=[Depends(require_cron_secret)])
+def maintain_quiz_attempt_partitions(drop_archived: bool = False):
+    """
+    Create upcoming monthly quiz_attempts partitions and archive months past
+    retention (rolled up first, then detached; dropped with drop_archived=true).
+    """
+    report = QuizService.maintain_attempt_partitions(drop_archived=drop_archived)
+    return {"status": "ok", "timestamp": time.time(), **report}
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, BackgroundTasks, Query, status
+from typing import List, Optional
+import uuid
+
+from app.schemas import (
+    LearningEventBatch,
+    EventBatchAccepted,
+    LessonEventStats,
+    UserLessonProgress,
+)
+from app.services.event_service import EventService, event_buffer
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+@router.post("", response_model=EventBatchAccepted, status_code=status.HTTP_202_ACCEPTED)
+def ingest_events(batch: LearningEventBatch, background_tasks: BackgroundTasks):
+    """
+    Accept a batch of lesson opens, scroll depth, video progress and
+    time-on-lesson events. Events are buffered and appended in bulk; clients
+    should send batches (up to 500 events) rather than one request per event,
+    and resend on 503.
+    """
+    result = event_buffer.record(batch)
+    if result["due"]:
+        background_tasks.add_task(event_buffer.flush)
+    return {"accepted": result["accepted"], "rejected": result["rejected"]}
+
+
+@router.get("/lessons/{lesson_id}", response_model=LessonEventStats)
+def get_lesson_event_stats(lesson_id: uuid.UUID, days: int = Query(30, ge=1, le=365)):
+    """Per-day engagement for a lesson from the rolled-up aggregates"""
+    return EventService.get_lesson_stats(str(lesson_id), days)
+
+
+@router.get("/users/{user_id}/progress", response_model=List[UserLessonProgress])
+def get_user_progress(user_id: str, course_id: Optional[uuid.UUID] = None):
+    """A learner's per-lesson progress, most recently seen first"""
+    return EventService.get_user_progress(user_id, str(course_id) if course_id else None)
@@ -1,10 +1,36 @@
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 import uuid
 
 from app.supabase_client import get_client
-from app.schemas import LessonCreate, LessonUpdate, LessonResponse, ReorderLessons
-from app.services.r2_service import r2_service
+from app.schemas import (
+    LessonCreate,
+    LessonUpdate,
+    LessonResponse,
+    BulkLessonCreate,
+    BulkCreateResponse,
+    ReorderLessons,
+    LessonOutline,
+    LessonBundle,
+    MoveLessonRequest,
+)
+from app.services.content_url_service import ContentURLService, LESSON_PATH_TTL_SECONDS
+from app.services.database_service import bulk_create, constraint_errors
+from app.services.image_service import ImageService
+from app.services.lesson_bundle_service import LessonBundleService
+from app.services.mdx_service import MdxService
+from app.services.navigation_service import NavigationService
+from app.services.ordering_service import OrderingService
+from app.services.search_service import SearchService
+from app.services.storage_backends import StorageObjectNotFound
+from app.services.storage_service import storage_service
+from app.services.upload_service import UploadService
+from app.services.view_counter import view_counter
+from app.config import get_settings
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/lessons", tags=["lessons"])
 
@@ -16,32 +42,6 @@ def supabase_client():
 @router.post("/", response_model=LessonResponse, status_code=status.HTTP_201_CREATED)
 def create_lesson(lesson: LessonCreate):
     """Create a new lesson"""
-    # Verify chapter exists
-    chapter_exists = (
-        supabase_client().table("chapters")
-        .select("id")
-        .eq("id", str(lesson.chapter_id))
-        .execute()
-    )
-    if not chapter_exists.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chapter with id '{lesson.chapter_id}' not found",
-        )
-
-    # Check unique slug
-    existing = (
-        supabase_client().table("lessons")
-        .select("id")
-        .eq("slug", lesson.slug)
-        .execute()
-    )
-    if existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Lesson with slug '{lesson.slug}' already exists",
-        )
-
     # Prepare data (map schema fields to DB columns if necessary)
     data = lesson.model_dump()
     if "fileKey" in data:
@@ -54,7 +54,12 @@ def create_lesson(lesson: LessonCreate):
     if data.get("published_at"):
         data["published_at"] = data["published_at"].isoformat()
 
-    result = supabase_client().table("lessons").insert(data).execute()
+    # The chapter foreign key and unique slug are checked by the insert itself
+    with constraint_errors(
+        unique_detail=f"Lesson with slug '{lesson.slug}' already exists",
+        foreign_key_detail=f"Chapter with id '{lesson.chapter_id}' not found",
+    ):
+        result = supabase_client().table("lessons").insert(data).execute()
     
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create lesson")
@@ -65,11 +70,33 @@ def create_lesson(lesson: LessonCreate):
     # OR update schema to have mdx_path as alias.
     # For now, let's manually patch the response dict
     response_data = result.data[0]
+    SearchService.index_lesson(response_data)
+    NavigationService.invalidate(item_ids=[response_data["chapter_id"]])
     response_data["fileKey"] = response_data.get("mdx_path")
     
     return response_data
 
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+def bulk_create_lessons(payload: BulkLessonCreate):
+    """
+    Create many lessons in one request. Items whose chapter is missing or whose
+    slug is taken are reported in results; the rest are created in list order.
+    """
+    items = []
+    for lesson in payload.lessons:
+        data = lesson.model_dump(mode="json")
+        data["mdx_path"] = data.pop("fileKey")
+        items.append(data)
+    response = bulk_create("bulk_create_lessons", items)
+
+    for item, result in zip(items, response["results"]):
+        if result.get("id"):
+            SearchService.index_lesson({**item, "id": result["id"]})
+    NavigationService.invalidate(item_ids={item["chapter_id"] for item in items})
+    return response
+
+
 @router.get("/chapter/{chapter_id}", response_model=List[LessonResponse])
 def list_lessons_by_chapter(chapter_id: uuid.UUID):
     """List all lessons for a chapter, ordered by position"""
@@ -77,11 +104,11 @@ def list_lessons_by_chapter(chapter_id: uuid.UUID):
         supabase_client().table("lessons")
         .select("*")
         .eq("chapter_id", str(chapter_id))
-        .order("position", descending=False)
+        .order("sort_key", descending=False)
         .execute()
     )
     
-    lessons = result.data
+    lessons = OrderingService.sort(result.data)
     for l in lessons:
         l["fileKey"] = l.get("mdx_path")
         
@@ -132,25 +159,20 @@ def get_lesson_by_slug(slug: str):
     return lesson
 
 
+@router.get("/slug/{slug}/bundle", response_model=LessonBundle)
+async def get_lesson_bundle(slug: str):
+    """
+    Lesson metadata, MDX content, chapter context, prev/next lessons and the
+    chapter quiz id in one call (replaces slug + content + chapter tree requests)
+    """
+    return await LessonBundleService.get_bundle(slug)
+
+
 @router.put("/{lesson_id}", response_model=LessonResponse)
 def update_lesson(
     lesson_id: uuid.UUID, lesson_update: LessonUpdate
 ):
     """Update lesson"""
-    # Check existence
-    existing = (
-        supabase_client().table("lessons")
-        .select("id")
-        .eq("id", str(lesson_id))
-        .execute()
-    )
-    
-    if not existing.data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Lesson with id '{lesson_id}' not found",
-        )
-
     update_data = lesson_update.model_dump(exclude_unset=True)
     if "fileKey" in update_data:
         update_data["mdx_path"] = update_data.pop("fileKey")
@@ -159,20 +181,48 @@ def update_lesson(
         update_data["published_at"] = update_data["published_at"].isoformat()
 
     if not update_data:
-         # Return existing
-         return get_lesson(lesson_id)
+        # Return existing
+        result = (
+            supabase_client().table("lessons")
+            .select("*")
+            .eq("id", str(lesson_id))
+            .limit(1)
+            .execute()
+        )
+    else:
+        # A renamed lesson must also drop the bundle cached under its old slug
+        previous_slug = None
+        if "slug" in update_data:
+            previous = supabase_client().table("lessons").select("slug").eq("id", str(lesson_id)).limit(1).execute()
+            previous_slug = previous.data[0].get("slug") if previous.data else None
+        with constraint_errors(
+            unique_detail=f"Lesson with slug '{update_data.get('slug')}' already exists",
+            foreign_key_detail=f"Chapter with id '{update_data.get('chapter_id')}' not found",
+        ):
+            result = (
+                supabase_client().table("lessons")
+                .update(update_data)
+                .eq("id", str(lesson_id))
+                .execute()
+            )
 
-    result = (
-        supabase_client().table("lessons")
-        .update(update_data)
-        .eq("id", str(lesson_id))
-        .execute()
-    )
-    
+    # The update returns the changed rows, so no rows means no such lesson
     if not result.data:
-         raise HTTPException(status_code=500, detail="Failed to update lesson")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lesson with id '{lesson_id}' not found",
+        )
     
+    if "mdx_path" in update_data:
+        ContentURLService.invalidate(lesson_id=str(lesson_id))
+
     lesson = result.data[0]
+    if update_data:
+        SearchService.index_lesson(lesson)
+        LessonBundleService.invalidate(slug=lesson.get("slug"))
+        if previous_slug and previous_slug != lesson.get("slug"):
+            LessonBundleService.invalidate(slug=previous_slug)
+        NavigationService.invalidate(item_ids=[str(lesson_id), lesson.get("chapter_id")])
     lesson["fileKey"] = lesson.get("mdx_path")
     return lesson
 
@@ -181,42 +231,43 @@ def update_lesson(
 async def upload_lesson_content(
     file: UploadFile = File(...), lesson_id: uuid.UUID = Form(...)
 ):
-    """Upload MDX content for a lesson to Supabase Storage"""
+    """Upload MDX content for a lesson to storage"""
     try:
         if not file.filename or not file.filename.endswith(".mdx"):
             raise HTTPException(status_code=400, detail="Only .mdx files allowed")
 
         file_content = await file.read()
-        
-        # Path in bucket
-        file_path = f"{lesson_id}.mdx"
+
+        current = supabase_client().table("lessons").select("mdx_path, content_hash, slug").eq("id", str(lesson_id)).execute()
+        if not current.data:
+            raise HTTPException(status_code=404, detail=f"Lesson with id '{lesson_id}' not found")
+
+        # A fresh versioned path per upload, as for direct uploads: URLs signed or cached
+        # for the previous document never resolve to new bytes. The lessons update
+        # trigger deletes the superseded object.
+        file_path = UploadService.build_path("lesson-content", str(lesson_id), file.filename)
         bucket_name = "lesson-content"
-        
-        # Upload (upsert=True to overwrite)
-        # Try upload with upsert=true
+
         try:
-            res = supabase_client().storage.from_(bucket_name).upload(
-                path=file_path,
-                file=file_content,
-                file_options={"content-type": "text/markdown", "upsert": "true"}
-            )
+            await storage_service.put(bucket_name, file_path, file_content, content_type="text/markdown")
         except Exception as storage_err:
-            print(f"Upload with upsert failed, trying update: {storage_err}")
-            # Fallback to update if upload failed (e.g. if file strictly exists)
-            try:
-                res = supabase_client().storage.from_(bucket_name).update(
-                    path=file_path,
-                    file=file_content,
-                    file_options={"content-type": "text/markdown", "upsert": "true"}
-                )
-            except Exception as update_err:
-                 print(f"Update also failed: {update_err}")
-                 raise HTTPException(status_code=500, detail=f"Storage save failed: {str(update_err)}")
-
-        # Update DB 
-        supabase_client().table("lessons").update({"mdx_path": file_path}).eq("id", str(lesson_id)).execute()
+            print(f"Storage save failed: {storage_err}")
+            raise HTTPException(status_code=500, detail=f"Storage save failed: {str(storage_err)}")
+
+        # Update DB (re-analyse the outline only when the content actually changed);
+        # the analysis is CPU-bound, so it runs off the event loop
+        outline = await run_in_threadpool(MdxService.outline_update, file_content, current.data[0].get("content_hash"))
+        update_data = {"mdx_path": file_path, **outline}
+        supabase_client().table("lessons").update(update_data).eq("id", str(lesson_id)).execute()
+        if "content_text" in update_data:
+            SearchService.index_lesson({"id": str(lesson_id), "content_text": update_data["content_text"]})
+        ContentURLService.invalidate(lesson_id=str(lesson_id), mdx_path=current.data[0].get("mdx_path"))
+        # The cached bundle row carries the old content_hash
+        LessonBundleService.invalidate(slug=current.data[0].get("slug"))
 
         return {"success": True, "file_key": file_path, "lesson_id": lesson_id}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Upload Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -227,6 +278,7 @@ async def upload_lesson_image(
     file: UploadFile = File(...), lesson_id: uuid.UUID = Form(...)
 ):
     """Upload an image for a lesson to Supabase Storage"""
+    bucket_name = "lesson-images"
     try:
         # Validate file type
         allowed_extensions = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"]
@@ -235,32 +287,21 @@ async def upload_lesson_image(
             raise HTTPException(status_code=400, detail="Unsupported image format")
 
         file_content = await file.read()
-        
-        # Path in bucket: lessons/{lesson_id}/{timestamp}_{filename}
-        timestamp = int(uuid.uuid4().hex[:8], 16) # use some random bits
-        safe_filename = "".join([c if c.isalnum() or c in "._-" else "_" for c in file.filename])
-        file_path = f"{lesson_id}/{timestamp}_{safe_filename}"
-        bucket_name = "lesson-images"
-        
-        # Upload
-        upload_res = supabase_client().storage.from_(bucket_name).upload(
-            path=file_path,
-            file=file_content,
-            file_options={"content-type": file.content_type, "upsert": "true"}
-        )
-
-        # Check for error in upload result (depending on supabase-py version)
-        # Note: If upload fails, it usually raises an exception, caught by except block.
 
-        # Get public URL
-        public_url = supabase_client().storage.from_(bucket_name).get_public_url(file_path)
-        
-        # Verify if it returns an object or string (new versions return string directly)
-        if isinstance(public_url, dict):
-            public_url = public_url.get("publicURL")
+        # Downscale to responsive WebP variants stored under the content hash
+        image = await run_in_threadpool(ImageService.store_image, bucket_name, file_content, file.content_type)
+        public_url = image["url"]
 
         print(f"Image uploaded to: {public_url}")
-        return {"success": True, "url": public_url, "file_path": file_path}
+        return {
+            "success": True,
+            "url": public_url,
+            "file_path": image["path"],
+            "hash": image["hash"],
+            "variants": image["variants"],
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Image Upload Error Detail: {str(e)}")
         # If bucket missing, inform the user
@@ -270,8 +311,18 @@ async def upload_lesson_image(
 
 
 @router.get("/{lesson_id}/content")
-def get_lesson_content(lesson_id: uuid.UUID):
-    """Get lesson MDX content from Supabase Storage"""
+def get_lesson_content(
+    lesson_id: uuid.UUID,
+    mode: str = Query("inline", pattern="^(inline|url|redirect)$"),
+):
+    """
+    Get lesson MDX content from storage.
+    mode=inline returns the document in the body, mode=url returns a signed,
+    cacheable storage URL and mode=redirect sends the client straight to it.
+    """
+    if mode != "inline":
+        return _signed_content_response(lesson_id, mode)
+
     result = (
         supabase_client().table("lessons")
         .select("mdx_path")
@@ -293,9 +344,13 @@ def get_lesson_content(lesson_id: uuid.UUID):
 
     try:
         bucket_name = "lesson-content"
-        data = supabase_client().storage.from_(bucket_name).download(mdx_path)
+        data = storage_service.get_sync(bucket_name, mdx_path)
         content_str = data.decode('utf-8')
         return {"success": True, "content": content_str, "mdx_path": mdx_path}
+    except StorageObjectNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Lesson content '{mdx_path}' not found"
+        )
     except Exception as e:
         print(f"Download Error: {str(e)}")
         raise HTTPException(
@@ -303,51 +358,94 @@ def get_lesson_content(lesson_id: uuid.UUID):
         )
 
 
+@router.post("/{lesson_id}/views", status_code=status.HTTP_202_ACCEPTED)
+def track_lesson_view(lesson_id: uuid.UUID, background_tasks: BackgroundTasks):
+    """
+    Count a page view. Views are buffered and written to lessons.views in
+    batches, so this never touches the lessons table on the request path.
+    """
+    if view_counter.record(str(lesson_id)):
+        background_tasks.add_task(view_counter.flush)
+    return {"accepted": True}
+
+
+@router.get("/{lesson_id}/outline", response_model=LessonOutline)
+def get_lesson_outline(lesson_id: uuid.UUID):
+    """Get headings, TOC, reading time and references without downloading the MDX"""
+    return MdxService.get_outline(str(lesson_id))
+
+
+def _signed_content_response(lesson_id: uuid.UUID, mode: str):
+    """Resolve metadata only and let the client read the document from storage"""
+    mdx_path = ContentURLService.get_mdx_path(str(lesson_id))
+
+    if not mdx_path:
+        if mode == "redirect":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Lesson has no content"
+            )
+        return {"success": True, "url": None, "mdx_path": None, "expires_in": 0}
+
+    url, expires_in = ContentURLService.get_signed_url(mdx_path)
+    # Which document a lesson points at can change on any upload, so shared caches must
+    # not keep the answer; browsers may for as long as this instance would itself
+    max_age = min(max(expires_in - settings.content_url_cache_margin_seconds, 0), LESSON_PATH_TTL_SECONDS)
+    headers = {"Cache-Control": f"private, max-age={max_age}"}
+
+    if mode == "redirect":
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers=headers)
+
+    return JSONResponse(
+        {"success": True, "url": url, "mdx_path": mdx_path, "expires_in": expires_in},
+        headers=headers,
+    )
+
+
 @router.post("/reorder", response_model=dict)
 def reorder_lessons(reorder_data: ReorderLessons):
     """Reorder lessons (for drag & drop)"""
-    for item in reorder_data.lesson_positions:
-        lesson_id = str(item["id"]) if isinstance(item["id"], uuid.UUID) else item["id"]
-        new_position = item["position"]
-
-        supabase_client().table("lessons").update({"position": new_position}).eq("id", lesson_id).execute()
+    # Siblings left out of the list keep their order; prefer /{lesson_id}/move for single drags
+    items = reorder_data.lesson_positions
+    OrderingService.reorder("lessons", items)
+    NavigationService.invalidate(item_ids=[item["id"] for item in items])
 
     return {"success": True, "message": "Lessons reordered"}
 
 
+@router.post("/{lesson_id}/move", response_model=LessonResponse)
+def move_lesson(lesson_id: uuid.UUID, move: MoveLessonRequest):
+    """
+    Move one lesson before/after a sibling, or to the end of chapter_id
+    (which may be another chapter of the same course). Only the moved
+    lesson's sort key is rewritten.
+    """
+    lesson = OrderingService.move("lessons", lesson_id, move.before_id, move.after_id, move.chapter_id)
+    NavigationService.invalidate(item_ids=[str(lesson_id), lesson.get("chapter_id")])
+    lesson["fileKey"] = lesson.get("mdx_path")
+    return lesson
+
+
 @router.delete("/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_lesson(lesson_id: uuid.UUID):
     """Delete lesson"""
-    # Get lesson first to get mdx_path for R2 deletion
-    existing = (
+    # Storage cleanup (MDX + images) is enqueued by a DB trigger in the same
+    # transaction and handled by the background job worker.
+    result = (
         supabase_client().table("lessons")
-        .select("mdx_path")
+        .delete()
         .eq("id", str(lesson_id))
-        .single()
         .execute()
     )
-    
-    if not existing.data:
+
+    if not result.data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Lesson with id '{lesson_id}' not found",
         )
-    
-    mdx_path = existing.data.get("mdx_path")
 
-    # Delete from DB
-    result = (
-        supabase_client().table("lessons")
-        .delete()
-        .eq("id", str(lesson_id))
-        .execute()
-    )
-
-    # Optionally delete from R2
-    if mdx_path:
-        try:
-            r2_service.delete_lesson(mdx_path)
-        except Exception as e:
-            print(f"Warning: Could not delete R2 file: {e}")
+    ContentURLService.invalidate(lesson_id=str(lesson_id), mdx_path=result.data[0].get("mdx_path"))
+    LessonBundleService.invalidate(slug=result.data[0].get("slug"))
+    NavigationService.invalidate(item_ids=[str(lesson_id)])
+    SearchService.remove("lesson", str(lesson_id))
 
     return None
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, status, Depends, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import datetime
 import uuid
 from app.services.quiz_service import QuizService
+from app.services.regrade_service import RegradeService
+from app.services.image_service import ImageService
+from app.services.ordering_service import OrderingService
+from app.services.fast_json import respond, stream_rows, wants_ndjson
+from app.schemas.ordering import MoveRequest
 from app.schemas.quiz import (
     Quiz, QuizUpdate, QuizAttemptCreate, QuizAttemptResult, 
-    QuizUser, QuizAttempt
+    QuizUser, QuizAttempt, QuizRegradeRun
 )
 from app.supabase_client import get_client
 
@@ -16,7 +23,7 @@ router = APIRouter(prefix="/api", tags=["quiz"])
 @router.get("/courses/{course_id}/quizzes", response_model=List[QuizUser])
 def get_course_quizzes(course_id: str):
     """Get all published quizzes for a course"""
-    return QuizService.get_quizzes_by_course(course_id)
+    return respond(List[QuizUser], QuizService.get_quizzes_by_course(course_id))
 
 @router.get("/courses/{course_id}/quiz", response_model=QuizUser)
 def get_course_quiz(course_id: str):
@@ -24,7 +31,7 @@ def get_course_quiz(course_id: str):
     quiz = QuizService.get_course_level_quiz(course_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="No published course-level quiz found")
-    return quiz
+    return respond(QuizUser, quiz)
 
 # --- CHAPTER QUIZ ENDPOINTS ---
 
@@ -34,7 +41,7 @@ def get_chapter_quiz(course_id: str, chapter_id: str):
     quiz = QuizService.get_quiz_by_chapter(course_id, chapter_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="No published quiz found for this chapter")
-    return quiz
+    return respond(QuizUser, quiz)
 
 @router.get("/quizzes/{quiz_id}", response_model=QuizUser)
 def get_quiz(quiz_id: str):
@@ -42,7 +49,7 @@ def get_quiz(quiz_id: str):
     quiz = QuizService.get_quiz_by_id(quiz_id)
     if not quiz or quiz["status"] != "Published":
         raise HTTPException(status_code=404, detail="Quiz not found or not published")
-    return quiz
+    return respond(QuizUser, quiz)
 
 @router.post("/quizzes/{quiz_id}/attempts", response_model=QuizAttemptResult)
 def submit_quiz_attempt(
@@ -68,15 +75,23 @@ def submit_quiz_attempt(
 @router.get("/quizzes/{quiz_id}/attempts/me", response_model=List[QuizAttempt])
 def get_my_attempts(
     quiz_id: str,
-    user_id: str
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
 ):
-    """Get my previous attempts for a specific quiz"""
-    return QuizService.get_user_attempts(quiz_id, user_id)
+    """Get my previous attempts for a specific quiz (since/until bound submitted_at)"""
+    return QuizService.get_user_attempts(quiz_id, user_id, since, until)
 
 @router.get("/users/{user_id}/attempts", response_model=List[dict])
-def get_user_history(user_id: str):
-    """Get all quiz attempts for a user"""
-    return QuizService.get_user_all_attempts(user_id)
+def get_user_history(user_id: str, request: Request, stream: bool = False,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    Get all quiz attempts for a user (stream=true or Accept: application/x-ndjson streams them in pages).
+    since/until bound submitted_at, so only those months' partitions are read.
+    """
+    if stream or wants_ndjson(request):
+        return stream_rows(QuizService.iter_user_all_attempts(user_id, since, until), ndjson=wants_ndjson(request))
+    return QuizService.get_user_all_attempts(user_id, since, until)
 
 
 # --- ADMIN ENDPOINTS ---
@@ -84,12 +99,12 @@ def get_user_history(user_id: str):
 @router.get("/admin/courses/{course_id}/quizzes", response_model=List[Quiz])
 def admin_get_course_quizzes(course_id: str):
     """Get all quizzes for course for admin"""
-    return QuizService.get_quizzes_admin(course_id)
+    return respond(List[Quiz], QuizService.get_quizzes_admin(course_id))
 
 @router.get("/admin/courses/{course_id}/chapters/{chapter_id}/quizzes", response_model=List[Quiz])
 def admin_get_chapter_quizzes(course_id: str, chapter_id: str):
     """Get all quizzes for a specific chapter (admin)"""
-    return QuizService.get_quizzes_admin_by_chapter(course_id, chapter_id)
+    return respond(List[Quiz], QuizService.get_quizzes_admin_by_chapter(course_id, chapter_id))
 
 @router.get("/admin/quizzes/{quiz_id}", response_model=Quiz)
 def admin_get_quiz(quiz_id: str):
@@ -97,7 +112,7 @@ def admin_get_quiz(quiz_id: str):
     quiz = QuizService.get_quiz_by_id(quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    return quiz
+    return respond(Quiz, quiz)
 
 @router.post("/admin/courses/{course_id}/quiz", response_model=Quiz)
 def admin_create_quiz_draft(course_id: str, title: str = "Untitled Quiz"):
@@ -115,6 +130,16 @@ def admin_update_quiz(quiz_id: str, updates: QuizUpdate):
     """Update quiz content (meta + questions + options)"""
     return QuizService.update_quiz(quiz_id, updates)
 
+@router.post("/admin/questions/{question_id}/move", response_model=dict)
+def admin_move_question(question_id: uuid.UUID, move: MoveRequest):
+    """Move one question before/after a sibling (or to the end) without rewriting the quiz"""
+    return OrderingService.move("quiz_questions", question_id, move.before_id, move.after_id)
+
+@router.post("/admin/options/{option_id}/move", response_model=dict)
+def admin_move_option(option_id: uuid.UUID, move: MoveRequest):
+    """Move one answer option before/after a sibling (or to the end)"""
+    return OrderingService.move("quiz_options", option_id, move.before_id, move.after_id)
+
 @router.post("/admin/quizzes/{quiz_id}/publish", response_model=Quiz)
 def admin_publish_quiz(quiz_id: str):
     """Publish the quiz"""
@@ -128,9 +153,37 @@ def admin_archive_quiz(quiz_id: str):
     return QuizService.update_quiz(quiz_id, updates)
 
 @router.get("/admin/quizzes/{quiz_id}/analytics", response_model=List[dict])
-def admin_get_quiz_analytics(quiz_id: str):
-    """Get attempt analytics for admin"""
-    return QuizService.get_quiz_analytics(quiz_id)
+def admin_get_quiz_analytics(quiz_id: str, request: Request, stream: bool = False,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    Get attempt analytics for admin (stream=true or Accept: application/x-ndjson streams them in pages).
+    since/until bound submitted_at, so only those months' partitions are read.
+    """
+    if stream or wants_ndjson(request):
+        return stream_rows(QuizService.iter_quiz_analytics(quiz_id, since, until), ndjson=wants_ndjson(request))
+    return QuizService.get_quiz_analytics(quiz_id, since, until)
+
+@router.get("/admin/quizzes/{quiz_id}/analytics/rollups", response_model=dict)
+def admin_get_quiz_rollups(quiz_id: str):
+    """Monthly and per-question aggregates for months whose raw attempts were archived"""
+    return QuizService.get_quiz_rollups(quiz_id)
+
+@router.post("/admin/quizzes/{quiz_id}/regrade", response_model=QuizRegradeRun, status_code=status.HTTP_202_ACCEPTED)
+def admin_regrade_quiz(quiz_id: str):
+    """Queue a regrade of every attempt against the current answer key (runs automatically after key edits)"""
+    if not QuizService.get_quiz_by_id(quiz_id):
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return RegradeService.start(quiz_id)
+
+@router.get("/admin/quizzes/{quiz_id}/regrade", response_model=QuizRegradeRun)
+def admin_get_latest_regrade(quiz_id: str):
+    """Progress of the quiz's most recent regrade (written_attempts / changed_attempts)"""
+    return RegradeService.get_run(quiz_id)
+
+@router.get("/admin/quizzes/{quiz_id}/regrade/{run_id}", response_model=QuizRegradeRun)
+def admin_get_regrade(quiz_id: str, run_id: str):
+    """Progress of a specific regrade run"""
+    return RegradeService.get_run(quiz_id, run_id)
 
 @router.delete("/admin/quizzes/{quiz_id}", status_code=status.HTTP_204_NO_CONTENT)
 def admin_delete_quiz(quiz_id: str):
@@ -171,28 +224,19 @@ async def admin_upload_quiz_image(
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Generate unique filename
-    ext = file.filename.split(".")[-1] if "." in file.filename else "png"
-    unique_filename = f"quiz-media/{quiz_id}/{uuid.uuid4()}.{ext}"
-    
     try:
-        client = get_client()
-        # Upload to Supabase Storage
-        result = client.storage.from_("quiz-media").upload(
-            path=unique_filename,
-            file=content,
-            file_options={"content-type": file.content_type}
-        )
-        
-        # Get public URL
-        public_url = client.storage.from_("quiz-media").get_public_url(unique_filename)
-        
+        # Downscale to responsive WebP variants stored under the content hash
+        image = await run_in_threadpool(ImageService.store_image, "quiz-media", content, file.content_type)
+
         return {
-            "url": public_url,
-            "path": unique_filename,
-            "content_type": file.content_type,
-            "size": len(content)
+            "url": image["url"],
+            "path": image["path"],
+            "content_type": image["content_type"],
+            "size": image["size"],
+            "hash": image["hash"],
+            "variants": image["variants"],
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
-
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.schemas import SearchResponse
+from app.services.search_service import SearchService, SEARCH_KINDS
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    type: str = Query(",".join(SEARCH_KINDS), description="Comma separated: course, chapter, lesson"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Ranked full-text search over courses, chapters, lessons and lesson content"""
+    kinds = [k.strip() for k in type.split(",") if k.strip()]
+    invalid = [k for k in kinds if k not in SEARCH_KINDS]
+    if invalid or not kinds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid search type. Allowed: {', '.join(SEARCH_KINDS)}",
+        )
+    return SearchService.search(q, kinds, skip, limit)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+
+from app.schemas import (
+    PresignedUploadCreate,
+    PresignedUploadResponse,
+    UploadComplete,
+    UploadCompleteResponse,
+)
+from app.services.upload_service import UploadService
+
+router = APIRouter(prefix="/api/uploads", tags=["uploads"])
+
+
+@router.post("/presign", response_model=PresignedUploadResponse)
+def create_presigned_upload(request: PresignedUploadCreate):
+    """
+    Issue a signed URL so the client can upload lesson content or an image
+    straight to storage. Call /complete once the upload has finished.
+    Backends without signed uploads (local disk) answer 501.
+    """
+    return UploadService.create_presigned_upload(request)
+
+
+@router.post("/complete", response_model=UploadCompleteResponse)
+def complete_upload(request: UploadComplete):
+    """Verify a direct upload and record its metadata (mdx_path / public URL)"""
+    return UploadService.complete_upload(request)
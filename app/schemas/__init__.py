@@ -3,6 +3,7 @@ from app.schemas.course import (
     CourseBase,
     CourseCreate,
     CourseUpdate,
+    CourseClone,
     CourseResponse,
     CourseWithChapters,
 )
@@ -12,6 +13,7 @@ from app.schemas.chapter import (
     ChapterUpdate,
     ChapterResponse,
     ChapterWithLessons,
+    BulkChapterCreate,
     ReorderChapters,
 )
 from app.schemas.lesson import (
@@ -19,7 +21,46 @@ from app.schemas.lesson import (
     LessonCreate,
     LessonUpdate,
     LessonResponse,
+    BulkLessonCreate,
     ReorderLessons,
+    LessonHeading,
+    LessonTocEntry,
+    LessonOutline,
+    LessonNavEntry,
+    LessonBundleChapter,
+    LessonBundle,
+)
+from app.schemas.bulk import (
+    BulkItemResult,
+    BulkCreateResponse,
+)
+from app.schemas.ordering import (
+    MoveRequest,
+    MoveLessonRequest,
+)
+from app.schemas.navigation import (
+    NavChapter,
+    CourseNavigation,
+    LessonPosition,
+)
+from app.schemas.event import (
+    LearningEvent,
+    LearningEventBatch,
+    EventBatchAccepted,
+    LessonEventDay,
+    LessonEventStats,
+    UserLessonProgress,
+)
+from app.schemas.search import (
+    SearchResult,
+    SearchResponse,
+)
+from app.schemas.upload import (
+    ImageVariant,
+    PresignedUploadCreate,
+    PresignedUploadResponse,
+    UploadComplete,
+    UploadCompleteResponse,
 )
 
 __all__ = [
@@ -27,6 +68,7 @@ __all__ = [
     "CourseBase",
     "CourseCreate",
     "CourseUpdate",
+    "CourseClone",
     "CourseResponse",
     "CourseWithChapters",
     # Chapter schemas
@@ -35,11 +77,45 @@ __all__ = [
     "ChapterUpdate",
     "ChapterResponse",
     "ChapterWithLessons",
+    "BulkChapterCreate",
     "ReorderChapters",
     # Lesson schemas
     "LessonBase",
     "LessonCreate",
     "LessonUpdate",
     "LessonResponse",
+    "BulkLessonCreate",
     "ReorderLessons",
+    "LessonHeading",
+    "LessonTocEntry",
+    "LessonOutline",
+    "LessonNavEntry",
+    "LessonBundleChapter",
+    "LessonBundle",
+    # Bulk create schemas
+    "BulkItemResult",
+    "BulkCreateResponse",
+    # Ordering schemas
+    "MoveRequest",
+    "MoveLessonRequest",
+    # Navigation schemas
+    "NavChapter",
+    "CourseNavigation",
+    "LessonPosition",
+    # Learning event schemas
+    "LearningEvent",
+    "LearningEventBatch",
+    "EventBatchAccepted",
+    "LessonEventDay",
+    "LessonEventStats",
+    "UserLessonProgress",
+    # Search schemas
+    "SearchResult",
+    "SearchResponse",
+    # Upload schemas
+    "ImageVariant",
+    "PresignedUploadCreate",
+    "PresignedUploadResponse",
+    "UploadComplete",
+    "UploadCompleteResponse",
 ]
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+import uuid
+
+
+class BulkItemResult(BaseModel):
+    index: int  # Position of the item in the request
+    id: Optional[uuid.UUID] = None  # Set when the item was created
+    slug: str
+    error: Optional[str] = None  # "parent_not_found" or "duplicate_slug"
+
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkItemResult]
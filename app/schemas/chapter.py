@@ -25,6 +25,7 @@ class ChapterUpdate(BaseModel):
 class ChapterResponse(ChapterBase):
     id: uuid.UUID
     course_id: uuid.UUID
+    sort_key: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -39,5 +40,9 @@ class ChapterWithLessons(ChapterResponse):
         from_attributes = True
 
 
+class BulkChapterCreate(BaseModel):
+    chapters: list[ChapterCreate] = Field(min_length=1, max_length=500)
+
+
 class ReorderChapters(BaseModel):
     chapter_positions: list[dict[str, int]]  # [{"id": "uuid", "position": 1}, ...]
@@ -28,8 +28,14 @@ class CourseUpdate(BaseModel):
     file_key: Optional[str] = None
 
 
+class CourseClone(BaseModel):
+    title: Optional[str] = None  # Defaults to "<title> (Copy)"
+    slug: Optional[str] = None  # Defaults to "<slug>-copy", "<slug>-copy-2", ...
+
+
 class CourseResponse(CourseBase):
     id: uuid.UUID
+    published_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
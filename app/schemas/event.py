@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from datetime import date, datetime
+import uuid
+
+# open | scroll (v = depth 0-100) | video (v = position, seconds) | time (v = seconds on lesson)
+EventKind = Literal["open", "scroll", "video", "time"]
+
+
+class LearningEvent(BaseModel):
+    """One event in the compact wire format; single-letter keys keep batches small"""
+    k: EventKind
+    l: uuid.UUID  # Lesson id
+    t: int = Field(gt=0)  # When it happened, ms since epoch (client clock)
+    v: Optional[float] = Field(None, ge=0, allow_inf_nan=False)
+
+
+class LearningEventBatch(BaseModel):
+    user_id: str = Field(min_length=1, max_length=128)
+    course_id: Optional[uuid.UUID] = None
+    session_id: Optional[str] = Field(None, max_length=128)
+    events: list[LearningEvent] = Field(min_length=1, max_length=500)
+
+
+class EventBatchAccepted(BaseModel):
+    accepted: int
+    rejected: int = 0  # Timestamps outside the accepted clock window
+
+
+class LessonEventDay(BaseModel):
+    day: date
+    opens: int = 0
+    time_seconds: float = 0
+    average_scroll: Optional[float] = None
+    video_events: int = 0
+
+
+class LessonEventStats(BaseModel):
+    lesson_id: uuid.UUID
+    learners: int  # Distinct users with any event, all time
+    opens: int
+    time_seconds: float
+    average_scroll: Optional[float] = None
+    days: list[LessonEventDay] = []
+
+
+class UserLessonProgress(BaseModel):
+    user_id: str
+    lesson_id: uuid.UUID
+    course_id: Optional[uuid.UUID] = None
+    opens: int = 0
+    time_seconds: float = 0
+    max_scroll: Optional[float] = None
+    max_video_position: Optional[float] = None
+    first_seen_at: datetime
+    last_seen_at: datetime
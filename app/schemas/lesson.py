@@ -35,6 +35,7 @@ class LessonUpdate(BaseModel):
 class LessonResponse(LessonBase):
     id: uuid.UUID
     chapter_id: uuid.UUID
+    sort_key: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -42,5 +43,59 @@ class LessonResponse(LessonBase):
         from_attributes = True
 
 
+class BulkLessonCreate(BaseModel):
+    lessons: list[LessonCreate] = Field(min_length=1, max_length=500)
+
+
 class ReorderLessons(BaseModel):
     lesson_positions: list[dict]  # [{"id": "uuid", "position": 1}, ...]
+
+
+class LessonHeading(BaseModel):
+    depth: int
+    text: str
+    slug: str
+
+
+class LessonTocEntry(LessonHeading):
+    children: list["LessonTocEntry"] = []
+
+
+class LessonOutline(BaseModel):
+    lesson_id: uuid.UUID
+    content_hash: Optional[str] = None
+    headings: list[LessonHeading] = []
+    toc: list[LessonTocEntry] = []
+    word_count: int = 0
+    reading_time_minutes: int = 0
+    images: list[str] = []
+    links: list[str] = []
+    code_languages: list[str] = []
+
+
+class LessonNavEntry(BaseModel):
+    id: uuid.UUID
+    chapter_id: uuid.UUID
+    title: str
+    slug: str
+    type: Optional[str] = None
+    status: Optional[str] = None
+    ordinal: Optional[int] = None  # 1-based position in the course
+
+
+class LessonBundleChapter(BaseModel):
+    id: uuid.UUID
+    course_id: uuid.UUID
+    title: str
+    slug: str
+    position: int
+    lessons: list[LessonNavEntry] = []
+
+
+class LessonBundle(BaseModel):
+    lesson: LessonResponse
+    content: Optional[str] = None  # MDX source, None when the lesson has no content yet
+    chapter: LessonBundleChapter
+    prev_lesson: Optional[LessonNavEntry] = None  # Crosses into the previous chapter
+    next_lesson: Optional[LessonNavEntry] = None
+    quiz_id: Optional[uuid.UUID] = None  # Published quiz of the lesson's chapter
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Optional
+import uuid
+
+from app.schemas.lesson import LessonNavEntry
+
+
+class NavChapter(BaseModel):
+    id: uuid.UUID
+    slug: str
+    title: str
+    first_ordinal: Optional[int] = None  # None for chapters without lessons
+    lesson_count: int = 0
+
+
+class CourseNavigation(BaseModel):
+    course_id: uuid.UUID
+    version: int
+    total: int
+    chapters: list[NavChapter] = []
+    lessons: list[LessonNavEntry] = []  # Reading order; lessons[i].ordinal == i + 1
+
+
+class LessonPosition(BaseModel):
+    course_id: uuid.UUID
+    version: int
+    lesson: LessonNavEntry
+    ordinal: int
+    total: int
+    chapter: NavChapter
+    chapter_ordinal: int  # 1-based position inside the chapter
+    prev_lesson: Optional[LessonNavEntry] = None
+    next_lesson: Optional[LessonNavEntry] = None
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, model_validator
+from typing import Optional
+import uuid
+
+
+class MoveRequest(BaseModel):
+    """Place an item directly before or after a sibling; neither moves it to the end"""
+    before_id: Optional[uuid.UUID] = None
+    after_id: Optional[uuid.UUID] = None
+
+    @model_validator(mode="after")
+    def check_single_anchor(self):
+        if self.before_id and self.after_id:
+            raise ValueError("Specify before_id or after_id, not both")
+        return self
+
+
+class MoveLessonRequest(MoveRequest):
+    chapter_id: Optional[uuid.UUID] = None  # Move into another chapter of the same course
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -126,3 +126,19 @@ class QuizAttemptResult(BaseModel):
     percent: int
     passed: bool
     breakdown: List[QuizAttemptAnswer]
+
+class QuizRegradeRun(BaseModel):
+    id: UUID
+    quiz_id: UUID
+    status: str  # queued, loading, grading, writing, done, failed
+    total_attempts: int
+    total_answers: int
+    unmatched_attempts: int
+    changed_attempts: int
+    changed_answers: int
+    written_attempts: int
+    timings: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
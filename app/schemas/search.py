@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional
+import uuid
+
+
+class SearchResult(BaseModel):
+    kind: str  # course, chapter or lesson
+    id: uuid.UUID
+    course_id: uuid.UUID
+    chapter_id: Optional[uuid.UUID] = None
+    title: str
+    slug: str
+    rank: float
+    headline: Optional[str] = None  # Matched terms wrapped in <b></b>
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    skip: int
+    limit: int
+    results: List[SearchResult] = []
@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import uuid
+
+
+UPLOAD_KIND_PATTERN = "^(lesson-content|lesson-image|quiz-image)$"
+
+
+class PresignedUploadCreate(BaseModel):
+    kind: str = Field(pattern=UPLOAD_KIND_PATTERN)
+    owner_id: uuid.UUID  # Lesson id for lesson-* kinds, quiz id for quiz-image
+    filename: str
+    content_type: str
+    size: int = Field(gt=0)  # Declared size in bytes, checked again on completion
+
+
+class PresignedUploadResponse(BaseModel):
+    kind: str
+    bucket: str
+    path: str
+    upload_url: str
+    token: str
+    content_type: str
+    max_size: int
+    expires_in: int
+
+
+class UploadComplete(BaseModel):
+    kind: str = Field(pattern=UPLOAD_KIND_PATTERN)
+    owner_id: uuid.UUID
+    path: str
+
+
+class ImageVariant(BaseModel):
+    path: str
+    url: str
+    width: Optional[int] = None  # None for pass-through (SVG/GIF) originals
+    height: Optional[int] = None
+    size: int
+    content_type: Optional[str] = None
+
+
+class UploadCompleteResponse(BaseModel):
+    success: bool = True
+    kind: str
+    bucket: str
+    path: str
+    size: int
+    content_type: str
+    url: Optional[str] = None  # Public URL for images
+    file_key: Optional[str] = None  # mdx_path recorded for lesson content
+    hash: Optional[str] = None  # Content hash images are deduplicated by
+    variants: List[ImageVariant] = []
@@ -0,0 +1,76 @@
+"""
+Compact encoding of quiz attempt answers (see migrations/add_compact_attempt_answers.sql).
+
+An attempt's answers are stored as two columns against a shared layout:
+answer_options holds the selected option index per question (-1 when
+unanswered) and correct_bits is a bit string with bit i set when question i
+was correct. decode() rebuilds the row shape quiz_attempt_answers returns.
+"""
+from typing import Iterable, List, Optional
+import hashlib
+import uuid
+
+UNANSWERED = -1
+
+
+def layout_id(question_ids: List[str], option_ids: List[List[str]], points: List[int]) -> str:
+    """md5 of the canonical layout text; must match compact_quiz_attempt_answers() in SQL"""
+    text = ";".join(
+        f"{question_id}:{point}:{','.join(options)}"
+        for question_id, options, point in zip(question_ids, option_ids, points)
+    )
+    return str(uuid.UUID(hashlib.md5(text.encode()).hexdigest()))
+
+
+def build_layout(quiz: dict) -> dict:
+    """Layout of a quiz whose questions and options are already in display order"""
+    questions = quiz.get("questions") or []
+    question_ids = [str(q["id"]) for q in questions]
+    option_ids = [[str(o["id"]) for o in q.get("options") or []] for q in questions]
+    points = [q.get("points", 1) for q in questions]
+    return {
+        "id": layout_id(question_ids, option_ids, points),
+        "quiz_id": str(quiz["id"]),
+        "question_ids": question_ids,
+        "option_ids": option_ids,
+        "points": points,
+    }
+
+
+def encode(layout: dict, graded_answers: Iterable[dict]) -> Optional[dict]:
+    """
+    Encode graded answers ({question_id, selected_option_id, is_correct}) as
+    {"layout_id", "answer_options", "correct_bits"}. Returns None when the
+    arrays cannot represent them (a question answered twice, or an option that
+    is not one of the question's), so the caller keeps the row format.
+    """
+    question_index = {question_id: i for i, question_id in enumerate(layout["question_ids"])}
+    selected = [UNANSWERED] * len(question_index)
+    bits = ["0"] * len(question_index)
+    for answer in graded_answers:
+        i = question_index.get(str(answer["question_id"]))
+        if i is None or selected[i] != UNANSWERED:
+            return None
+        try:
+            selected[i] = layout["option_ids"][i].index(str(answer["selected_option_id"]))
+        except ValueError:
+            return None
+        bits[i] = "1" if answer["is_correct"] else "0"
+    return {"layout_id": layout["id"], "answer_options": selected, "correct_bits": "".join(bits)}
+
+
+def decode(layout: dict, answer_options: List[int], correct_bits: str) -> List[dict]:
+    """Answer rows in layout order, skipping unanswered questions"""
+    answers = []
+    for i, option_index in enumerate(answer_options or []):
+        if option_index is None or option_index < 0:
+            continue
+        is_correct = i < len(correct_bits) and correct_bits[i] == "1"
+        answers.append({
+            "id": None,
+            "question_id": layout["question_ids"][i],
+            "selected_option_id": layout["option_ids"][i][option_index],
+            "is_correct": is_correct,
+            "earned_points": layout["points"][i] if is_correct else 0,
+        })
+    return answers
@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.services.cache_service import TTLCache
+from app.supabase_client import get_client
+from app.services.storage_service import storage_service
+
+settings = get_settings()
+
+CONTENT_BUCKET = "lesson-content"
+
+# mdx_path -> signed URL, and lesson_id -> mdx_path. The lesson entries are only
+# invalidated in the process that changed them, so other instances hold them no
+# longer than the lesson bundle TTL
+LESSON_PATH_TTL_SECONDS = min(settings.lesson_bundle_ttl_seconds, settings.content_url_ttl_seconds)
+content_url_cache = TTLCache(maxsize=4096, ttl=settings.content_url_ttl_seconds)
+
+
+class ContentURLService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def get_mdx_path(lesson_id: str) -> Optional[str]:
+        """Resolve a lesson's mdx_path, served from cache when warm"""
+        key = f"lesson:{lesson_id}"
+        sentinel = object()
+        cached = content_url_cache.get(key, sentinel)
+        if cached is not sentinel:
+            return cached
+
+        result = (
+            ContentURLService.supabase_client().table("lessons")
+            .select("mdx_path")
+            .eq("id", str(lesson_id))
+            .limit(1)
+            .execute()
+        )
+        if not result.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Lesson not found"
+            )
+
+        mdx_path = result.data[0].get("mdx_path")
+        content_url_cache.set(key, mdx_path, ttl=LESSON_PATH_TTL_SECONDS)
+        return mdx_path
+
+    @staticmethod
+    def get_signed_url(mdx_path: str) -> Tuple[str, int]:
+        """
+        Return a signed URL for the document and the seconds it stays valid.
+        URLs are reused until they get close to expiry so CDNs can cache them.
+        """
+        key = f"url:{mdx_path}"
+        cached = content_url_cache.get(key)
+        if cached:
+            return cached, int(content_url_cache.ttl_remaining(key)) + settings.content_url_cache_margin_seconds
+
+        ttl = settings.content_url_ttl_seconds
+        try:
+            url = storage_service.signed_url_sync(CONTENT_BUCKET, mdx_path, ttl)
+        except Exception as e:
+            print(f"Signed URL error: {e}")
+            raise HTTPException(status_code=500, detail="Failed to sign content URL")
+
+        content_url_cache.set(key, url, ttl=max(ttl - settings.content_url_cache_margin_seconds, 0))
+        return url, ttl
+
+    @staticmethod
+    def invalidate(lesson_id: Optional[str] = None, mdx_path: Optional[str] = None):
+        """Drop cached metadata/URLs after content is replaced or deleted"""
+        if lesson_id:
+            content_url_cache.delete(f"lesson:{lesson_id}")
+        if mdx_path:
+            content_url_cache.delete(f"url:{mdx_path}")
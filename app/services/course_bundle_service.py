@@ -0,0 +1,378 @@
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import base64
+import json
+import uuid
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.supabase_client import get_client
+from app.services.database_service import constraint_errors
+from app.services.storage_gc import HASHED_IMAGE_RE, object_group
+from app.services.storage_service import parse_storage_url, storage_service
+
+settings = get_settings()
+
+BUNDLE_FORMAT = "learnify-course"
+BUNDLE_VERSION = 1
+LESSON_CONTENT_BUCKET = "lesson-content"
+IMAGE_BUCKETS = ["lesson-images", "quiz-media"]
+INSERT_BATCH_SIZE = 200
+
+# Columns the database generates (or that describe one environment's usage) and are not carried over
+EXCLUDED_COLUMNS = {"id", "search_vector", "created_at", "updated_at", "views"}
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, default=str, separators=(",", ":")) + "\n").encode()
+
+
+def _public_base(bucket: str) -> str:
+    """Public URL prefix of a bucket in this environment"""
+    return storage_service.public_url(bucket, "_")[:-1]
+
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+class CourseBundleService:
+    """
+    Course bundles are NDJSON: a manifest line, then the course, chapters,
+    lessons and quizzes (parents before children), then every referenced file
+    as a "file" header, base64 "chunk" lines and a "file_end" line. Both
+    directions hold at most one file (or one insert batch) in memory.
+    """
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    # --- Export ---
+
+    @staticmethod
+    def get_course(course_id: str) -> Optional[dict]:
+        result = (
+            CourseBundleService.supabase_client().table("courses")
+            .select("*").eq("id", str(course_id)).limit(1).execute()
+        )
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    def _select(table: str, column: str, value: str, columns: str = "*",
+                order: Tuple[str, ...] = ("sort_key",)) -> List[dict]:
+        query = CourseBundleService.supabase_client().table(table).select(columns).eq(column, value)
+        for order_column in order:
+            query = query.order(order_column)
+        return query.execute().data or []
+
+    @staticmethod
+    async def export_stream(course: dict) -> AsyncIterator[bytes]:
+        files: Dict[Tuple[str, str], Optional[str]] = {}  # (bucket, path or image group) -> lesson id
+
+        def reference(url: Optional[str]):
+            parsed = parse_storage_url(url)
+            if parsed:
+                files.setdefault((parsed[0], object_group(parsed[1])), None)
+
+        yield _line({
+            "type": "manifest",
+            "format": BUNDLE_FORMAT,
+            "version": BUNDLE_VERSION,
+            "source_course_id": course["id"],
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "public_urls": {bucket: _public_base(bucket) for bucket in IMAGE_BUCKETS},
+        })
+
+        yield _line({"type": "course", "data": course})
+        reference(course.get("cover_image"))
+        if course.get("file_key") and settings.r2_bucket_name:
+            files[(settings.r2_bucket_name, course["file_key"])] = None
+
+        chapters = await asyncio.to_thread(CourseBundleService._select, "chapters", "course_id", course["id"])
+        for chapter in chapters:
+            yield _line({"type": "chapter", "data": chapter})
+
+        # One chapter's lessons at a time keeps large courses out of memory
+        for chapter in chapters:
+            lessons = await asyncio.to_thread(CourseBundleService._select, "lessons", "chapter_id", chapter["id"])
+            for lesson in lessons:
+                yield _line({"type": "lesson", "data": lesson})
+                if lesson.get("mdx_path"):
+                    files[(LESSON_CONTENT_BUCKET, lesson["mdx_path"])] = lesson["id"]
+                for url in (lesson.get("content_outline") or {}).get("images") or []:
+                    reference(url)
+
+        quizzes = await asyncio.to_thread(
+            CourseBundleService._select, "quizzes", "course_id", course["id"],
+            "*, questions:quiz_questions(*, options:quiz_options(*))",
+            ("created_at", "id"),  # Quizzes have no sort_key
+        )
+        for quiz in quizzes:
+            yield _line({"type": "quiz", "data": quiz})
+            for question in quiz.get("questions") or []:
+                reference(question.get("image_url"))
+                for option in question.get("options") or []:
+                    reference(option.get("image_url"))
+
+        for (bucket, path), lesson_id in files.items():
+            async for line in CourseBundleService._export_files(bucket, path, lesson_id):
+                yield line
+
+    @staticmethod
+    async def _export_files(bucket: str, path: str, lesson_id: Optional[str]) -> AsyncIterator[bytes]:
+        # A content-addressed image group is every responsive variant under its folder
+        if HASHED_IMAGE_RE.match(f"{path}/"):
+            paths = [item["key"] for item in await storage_service.list(bucket, f"{path}/")]
+        else:
+            paths = [path]
+
+        for object_path in paths:
+            head = await storage_service.head(bucket, object_path)
+            if head is None:
+                print(f"Export skipped missing object {bucket}/{object_path}")
+                continue
+            yield _line({
+                "type": "file", "bucket": bucket, "path": object_path, "lesson_id": lesson_id,
+                "content_type": head.get("content_type"), "cache_control": head.get("cache_control"),
+            })
+            size = 0
+            async for chunk in storage_service.stream(bucket, object_path):
+                size += len(chunk)
+                yield _line({"type": "chunk", "data": base64.b64encode(chunk).decode()})
+            yield _line({"type": "file_end", "size": size})
+
+    # --- Import ---
+
+    @staticmethod
+    async def import_stream(chunks: AsyncIterator[bytes], slug: Optional[str] = None) -> dict:
+        importer = _BundleImporter(CourseBundleService.supabase_client(), slug)
+        try:
+            async for record in _read_lines(chunks):
+                await importer.add(record)
+            return await importer.finish()
+        except BaseException:
+            await importer.abort()
+            raise
+
+
+class _BundleImporter:
+    """Streams bundle records into batched inserts and bounded parallel uploads"""
+
+    def __init__(self, client, slug: Optional[str]):
+        self.client = client
+        self.slug = slug
+        self.manifest: Optional[dict] = None
+        self.course_id: Optional[str] = None
+        self.ids: Dict[str, str] = {}  # old id -> new id (chapters, lessons, quizzes, questions)
+        self.pending_type: Optional[str] = None
+        self.pending: List[dict] = []
+        self.counts = {"chapters": 0, "lessons": 0, "quizzes": 0, "questions": 0, "options": 0, "files": 0}
+        self.url_rewrites: List[Tuple[str, str]] = []
+        self.file: Optional[dict] = None
+        self.uploads: Set[asyncio.Task] = set()
+        self.upload_slots = asyncio.Semaphore(settings.storage_max_concurrency)
+        self.failed_files: List[str] = []
+
+    def _new_id(self, old_id: str) -> str:
+        self.ids[old_id] = str(uuid.uuid4())
+        return self.ids[old_id]
+
+    def _rewrite(self, value):
+        """Point storage URLs from the source environment at this one"""
+        if not isinstance(value, str):
+            return value
+        for old, new in self.url_rewrites:
+            value = value.replace(old, new)
+        return value
+
+    def _row(self, data: dict) -> dict:
+        return {key: value for key, value in data.items() if key not in EXCLUDED_COLUMNS}
+
+    async def add(self, record: dict):
+        kind = record.get("type")
+        if self.manifest is None:
+            if kind != "manifest" or record.get("format") != BUNDLE_FORMAT:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not a course bundle")
+            if record.get("version", 0) > BUNDLE_VERSION:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unsupported bundle version {record.get('version')}",
+                )
+            self.manifest = record
+            self.url_rewrites = [
+                (old, _public_base(bucket))
+                for bucket, old in (record.get("public_urls") or {}).items()
+                if old and old != _public_base(bucket)
+            ]
+            return
+
+        if kind in ("chapter", "lesson", "quiz"):
+            if kind != self.pending_type:
+                await self.flush()
+                self.pending_type = kind
+            self.pending.append(record["data"])
+            if len(self.pending) >= INSERT_BATCH_SIZE:
+                await self.flush()
+            return
+
+        await self.flush()
+        if kind == "course":
+            await self._insert_course(record["data"])
+        elif kind == "file":
+            self.file = {**record, "body": bytearray()}
+        elif kind in ("chunk", "file_end") and self.file is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"'{kind}' record outside a file")
+        elif kind == "chunk":
+            self.file["body"] += base64.b64decode(record["data"])
+        elif kind == "file_end":
+            file, self.file = self.file, None
+            if len(file["body"]) != record.get("size", len(file["body"])):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Truncated file {file['path']}")
+            await self._upload(file)
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown bundle record '{kind}'")
+
+    async def _insert_course(self, data: dict):
+        course = {key: self._rewrite(value) for key, value in self._row(data).items()}
+        course["id"] = self.course_id = str(uuid.uuid4())
+        course["slug"] = self.slug or course["slug"]
+        course["status"] = "Draft"
+        await self._insert_batches("courses", [course], f"Course with slug '{course['slug']}' already exists")
+
+    async def flush(self):
+        rows, kind = self.pending, self.pending_type
+        self.pending = []
+        if not rows:
+            return
+        if self.course_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bundle has no course record")
+
+        if kind == "chapter":
+            chapters = []
+            for data in rows:
+                chapter = self._row(data)
+                chapter.update(id=self._new_id(data["id"]), course_id=self.course_id)
+                chapters.append(chapter)
+            await self._insert_batches("chapters", chapters, "Duplicate chapter slug in bundle")
+            self.counts["chapters"] += len(chapters)
+
+        elif kind == "lesson":
+            lessons = []
+            for data in rows:
+                lesson = self._row(data)
+                lesson.update(id=self._new_id(data["id"]), chapter_id=self.ids[data["chapter_id"]])
+                if lesson.get("mdx_path"):
+                    lesson["mdx_path"] = f"{lesson['id']}.mdx"
+                if lesson.get("content_outline"):
+                    lesson["content_outline"] = json.loads(self._rewrite(json.dumps(lesson["content_outline"])))
+                lessons.append(lesson)
+            if self.slug:
+                await self._suffix_lesson_slugs(lessons)
+            await self._insert_batches(
+                "lessons", lessons, "A lesson slug in this bundle already exists; import into a fresh environment or rename it",
+            )
+            self.counts["lessons"] += len(lessons)
+
+        elif kind == "quiz":
+            quizzes, questions, options = [], [], []
+            for data in rows:
+                quiz = self._row(data)
+                quiz.pop("questions", None)
+                quiz.update(id=self._new_id(data["id"]), course_id=self.course_id, status="Draft", published_at=None)
+                quiz["chapter_id"] = self.ids.get(data.get("chapter_id")) if data.get("chapter_id") else None
+                quizzes.append(quiz)
+                for q_data in data.get("questions") or []:
+                    question = self._row(q_data)
+                    question.pop("options", None)
+                    question.update(id=self._new_id(q_data["id"]), quiz_id=quiz["id"])
+                    question["image_url"] = self._rewrite(question.get("image_url"))
+                    questions.append(question)
+                    for o_data in q_data.get("options") or []:
+                        option = self._row(o_data)
+                        option.update(question_id=question["id"], image_url=self._rewrite(option.get("image_url")))
+                        options.append(option)
+            await self._insert_batches("quizzes", quizzes)
+            await self._insert_batches("quiz_questions", questions)
+            await self._insert_batches("quiz_options", options)
+            self.counts["quizzes"] += len(quizzes)
+            self.counts["questions"] += len(questions)
+            self.counts["options"] += len(options)
+
+    async def _suffix_lesson_slugs(self, lessons: List[dict]):
+        """Lesson slugs are globally unique: "<slug>-<course slug>", then a short id on collision, as clone_course does"""
+        for lesson in lessons:
+            lesson["slug"] = f"{lesson['slug']}-{self.slug}"
+        taken = await asyncio.to_thread(
+            lambda: self.client.table("lessons").select("slug")
+            .in_("slug", [lesson["slug"] for lesson in lessons]).execute()
+        )
+        taken = {row["slug"] for row in taken.data or []}
+        for lesson in lessons:
+            if lesson["slug"] in taken:
+                lesson["slug"] = f"{lesson['slug']}-{lesson['id'][:8]}"
+
+    async def _insert_batches(self, table: str, rows: List[dict], unique_detail: Optional[str] = None):
+        def insert(batch):
+            with constraint_errors(unique_detail=unique_detail):
+                self.client.table(table).insert(batch).execute()
+
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            await asyncio.to_thread(insert, rows[start:start + INSERT_BATCH_SIZE])
+
+    async def _upload(self, file: dict):
+        bucket, path, body = file["bucket"], file["path"], bytes(file["body"])
+        if bucket == LESSON_CONTENT_BUCKET:
+            lesson_id = self.ids.get(file.get("lesson_id"))
+            if not lesson_id:
+                return
+            path = f"{lesson_id}.mdx"
+            body = self._rewrite(body.decode("utf-8")).encode("utf-8")
+
+        # Waiting for a slot before starting the task bounds how many files are held in memory
+        await self.upload_slots.acquire()
+
+        async def upload():
+            try:
+                await storage_service.put(
+                    bucket, path, body, content_type=file.get("content_type"), cache_control=file.get("cache_control"),
+                )
+                self.counts["files"] += 1
+            except Exception as e:
+                print(f"Import upload of {bucket}/{path} failed: {e}")
+                self.failed_files.append(f"{bucket}/{path}")
+            finally:
+                self.upload_slots.release()
+
+        task = asyncio.create_task(upload())
+        self.uploads.add(task)
+        task.add_done_callback(self.uploads.discard)
+
+    async def finish(self) -> dict:
+        await self.flush()
+        if self.course_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bundle has no course record")
+        if self.uploads:
+            await asyncio.gather(*self.uploads)
+        return {
+            "course_id": self.course_id,
+            "counts": self.counts,
+            "failed_files": self.failed_files,
+        }
+
+    async def abort(self):
+        """Undo a partial import; deleting the course cascades to everything inserted under it"""
+        for task in list(self.uploads):
+            task.cancel()
+        if self.course_id:
+            await asyncio.to_thread(
+                lambda: self.client.table("courses").delete().eq("id", self.course_id).execute()
+            )
@@ -0,0 +1,58 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
+from app.supabase_client import get_client
+from app.services.database_service import constraint_errors
+from app.services.storage_service import storage_service
+
+LESSON_CONTENT_BUCKET = "lesson-content"
+
+
+class CourseCloneService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def clone(course_id: str, title: Optional[str] = None, slug: Optional[str] = None) -> dict:
+        """
+        Copy a course with its chapters, lessons, quizzes, questions and options
+        in one database transaction (clone_course), then copy the lesson MDX
+        files server-side in parallel. If any file cannot be copied the new
+        course is deleted again and 502 names the source lessons, so a clone
+        never exists with lessons that silently lost their content.
+
+        Returns {"course_id", "slug", "counts", "files"}.
+        """
+        client = CourseCloneService.supabase_client()
+        try:
+            with constraint_errors(unique_detail=f"Course with slug '{slug}' already exists"):
+                result = client.rpc("clone_course", {
+                    "source_id": str(course_id),
+                    "new_title": title,
+                    "new_slug": slug,
+                }).execute()
+        except APIError as e:
+            if e.code == "P0002":
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Course with id '{course_id}' not found",
+                )
+            raise
+
+        clone = result.data
+        files = clone.get("files") or []
+        failed = set(storage_service.copy_many_sync(LESSON_CONTENT_BUCKET, [(f["source"], f["destination"]) for f in files]))
+        if failed:
+            # Cascades to the copied rows; the lessons delete trigger removes the files that did copy
+            client.table("courses").delete().eq("id", clone["course_id"]).execute()
+            failed_lessons = sorted(f["lesson_id"] for f in files if f["source"] in failed)
+            print(f"Clone of course {course_id} rolled back, content copy failed for lessons {failed_lessons}")
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail={
+                    "message": "Lesson content could not be copied; the clone was not created",
+                    "failed_lessons": failed_lessons,
+                },
+            )
+        return clone
@@ -0,0 +1,61 @@
+from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
+from app.supabase_client import get_client
+from app.services.search_service import SearchService
+
+
+class CoursePublishService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def publish(course_id: str) -> dict:
+        """
+        Validate the course tree and publish the course, its chapters, lessons
+        and quizzes in one transaction (publish_course). Raises 422 with the
+        blocking problems when the tree is incomplete.
+        """
+        try:
+            result = CoursePublishService.supabase_client().rpc(
+                "publish_course", {"target_id": str(course_id)}
+            ).execute()
+        except APIError as e:
+            if e.code == "P0002":
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Course with id '{course_id}' not found",
+                )
+            raise
+
+        outcome = result.data
+        if not outcome.get("published"):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": "Course is not ready to publish", "problems": outcome.get("problems", [])},
+            )
+        return outcome
+
+    @staticmethod
+    def rebuild(course_id: str):
+        """
+        Rebuild derived representations of a freshly published course from its
+        current publish (published_at / publish_version). Runs from the
+        'course.published' job enqueued by publish_course.
+        """
+        from app.services.snapshot_service import SnapshotService
+
+        result = (
+            CoursePublishService.supabase_client().table("courses")
+            .select("*, chapters(*, lessons(*))")
+            .eq("id", str(course_id))
+            .limit(1)
+            .execute()
+        )
+        if not result.data:
+            return
+        course = result.data[0]
+        if not course.get("publish_version"):
+            return
+        SnapshotService.build(course, course["published_at"], course["publish_version"])
+        SearchService.index_outline(course)
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
+from app.supabase_client import get_client
+
+# Postgres SQLSTATE codes surfaced by PostgREST
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+@contextmanager
+def constraint_errors(unique_detail: Optional[str] = None, foreign_key_detail: Optional[str] = None):
+    """
+    Let the database enforce uniqueness and parent existence in the same
+    round trip as the write, and translate violations into the API's
+    400 (duplicate) and 404 (missing parent) responses.
+    """
+    try:
+        yield
+    except APIError as e:
+        if e.code == UNIQUE_VIOLATION and unique_detail:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=unique_detail)
+        if e.code == FOREIGN_KEY_VIOLATION and foreign_key_detail:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=foreign_key_detail)
+        raise
+
+
+def bulk_create(function: str, items: List[dict]) -> dict:
+    """
+    Run one of the bulk_create_* functions, which validate parents and slugs
+    and insert every valid item in a single statement, and summarise its
+    per-item results.
+    """
+    results = get_client().rpc(function, {"items": items}).execute().data or []
+    created = sum(1 for item in results if not item.get("error"))
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+def iter_pages(build_query: Callable[[], Any], page_size: int, start: int = 0, stop: Optional[int] = None) -> Iterator[List[dict]]:
+    """
+    Yield the rows of a select in pages of page_size, so a caller can stream
+    a large result without holding it all. build_query returns a fresh,
+    deterministically ordered query each time (PostgREST builders keep
+    adding range params, so one cannot be reused).
+    """
+    offset = start
+    while stop is None or offset < stop:
+        end = offset + page_size if stop is None else min(offset + page_size, stop)
+        rows = build_query().range(offset, end - 1).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < end - offset:
+            return
+        offset = end
@@ -0,0 +1,308 @@
+from typing import List, Optional
+import os
+import threading
+import time
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.schemas.event import LearningEventBatch
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+# Client clocks may run this far ahead of ours before an event is rejected
+FUTURE_SKEW_MS = 5 * 60 * 1000
+
+
+class EventBuffer:
+    """
+    Write-behind buffer for learning events. Accepted batches are flattened
+    into rows in the compact wire format and appended with one
+    ingest_learning_events() call per event_flush_batch_size rows, so the
+    request path never touches the database.
+
+    Long-running deployments flush from a daemon thread every
+    event_flush_interval_seconds (sooner once event_flush_max_pending events
+    are waiting) and roll up every event_rollup_interval_seconds. On Vercel
+    the request that makes a flush due runs it as a background task, and
+    /cron/events flushes and rolls up.
+
+    Events are analytics, not records of truth: a crash loses at most the
+    flush window. A failed flush puts its rows back for the next attempt, and
+    a full buffer (event_buffer_max) rejects new batches with 503 instead of
+    growing without bound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._oldest_pending: Optional[float] = None
+        self._last_flush_at: Optional[float] = None
+        self._last_flush_seconds: Optional[float] = None
+        self._last_rollup_at: Optional[float] = None
+        self._last_rollup: Optional[dict] = None
+        self._last_error: Optional[str] = None
+        self._accepted = 0
+        self._rejected = 0
+        self._shed = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def threaded() -> bool:
+        return not os.environ.get("VERCEL")
+
+    # --- Recording ---
+
+    def record(self, batch: LearningEventBatch) -> dict:
+        """
+        Buffer a validated batch. Returns {"accepted", "rejected", "due"};
+        raises 503 when the buffer is full so the client retries later.
+        """
+        now = time.time()
+        now_ms = int(now * 1000)
+        oldest_ms = now_ms - settings.event_max_age_hours * 3600 * 1000
+        newest_ms = now_ms + FUTURE_SKEW_MS
+        user_id = batch.user_id
+        course_id = str(batch.course_id) if batch.course_id else None
+        session_id = batch.session_id
+
+        rows = [
+            {
+                "k": event.k,
+                "l": str(event.l),
+                "t": event.t,
+                # Scroll depth is a percentage; clamp overshoot from elastic scrolling
+                "v": min(event.v, 100.0) if event.k == "scroll" and event.v is not None else event.v,
+                "u": user_id,
+                "c": course_id,
+                "s": session_id,
+            }
+            for event in batch.events
+            if oldest_ms <= event.t <= newest_ms
+        ]
+        rejected = len(batch.events) - len(rows)
+
+        with self._lock:
+            if len(self._pending) + len(rows) > settings.event_buffer_max:
+                self._shed += len(rows)
+                full = True
+            else:
+                full = False
+                self._pending.extend(rows)
+                self._accepted += len(rows)
+                self._rejected += rejected
+                if rows:
+                    self._oldest_pending = self._oldest_pending or now
+        if full:
+            # Make room for the retry
+            self._wake.set()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Event buffer is full, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        due = self._due(now)
+        if due and self._thread is not None:
+            self._wake.set()
+            due = False
+        return {"accepted": len(rows), "rejected": rejected, "due": due}
+
+    def _due(self, now: float) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            if len(self._pending) >= settings.event_flush_max_pending:
+                return True
+            return now - self._oldest_pending >= settings.event_flush_interval_seconds
+
+    # --- Flushing ---
+
+    def flush(self) -> dict:
+        """Append buffered events in event_flush_batch_size chunks; concurrent calls skip instead of waiting"""
+        if not self._flush_lock.acquire(blocking=False):
+            return {"status": "busy", "flushed": 0}
+        try:
+            started = time.time()
+            lag = self.flush_lag()
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._oldest_pending = None
+            if not rows:
+                return {"status": "ok", "flushed": 0}
+
+            client = self.supabase_client()
+            size = max(1, settings.event_flush_batch_size)
+            written = 0
+            for offset in range(0, len(rows), size):
+                try:
+                    client.rpc("ingest_learning_events", {"events": rows[offset:offset + size]}).execute()
+                except Exception as e:
+                    print(f"Event flush failed: {e}")
+                    self._requeue(rows[offset:], started - lag)
+                    self._failures += 1
+                    self._flushed += written
+                    self._last_error = str(e)
+                    return {"status": "failed", "flushed": written, "error": str(e)}
+                written += min(size, len(rows) - offset)
+
+            self._flushes += 1
+            self._flushed += written
+            self._last_flush_at = time.time()
+            self._last_flush_seconds = round(self._last_flush_at - started, 4)
+            self._last_error = None
+            return {"status": "ok", "flushed": written, "seconds": self._last_flush_seconds}
+        finally:
+            self._flush_lock.release()
+
+    def _requeue(self, rows: List[dict], oldest: float):
+        """Put unwritten rows back in front of newer ones, dropping what no longer fits"""
+        with self._lock:
+            room = max(0, settings.event_buffer_max - len(self._pending))
+            kept = rows[:room]
+            self._shed += len(rows) - len(kept)
+            self._pending = kept + self._pending
+            if self._pending:
+                self._oldest_pending = min(self._oldest_pending or oldest, oldest)
+
+    # --- Rollups ---
+
+    def rollup(self) -> dict:
+        """Fold newly ingested events into the aggregates and drop expired partitions"""
+        client = self.supabase_client()
+        report = client.rpc("rollup_learning_events", {}).execute().data or {}
+        pruned = client.rpc(
+            "prune_learning_event_partitions", {"keep_days": settings.event_retention_days}
+        ).execute().data
+        self._last_rollup_at = time.time()
+        self._last_rollup = {**report, "pruned_partitions": pruned or 0}
+        return self._last_rollup
+
+    # --- Metrics ---
+
+    def flush_lag(self) -> float:
+        """Age in seconds of the oldest event not yet written to the database"""
+        with self._lock:
+            return round(time.time() - self._oldest_pending, 3) if self._oldest_pending else 0.0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "threaded": self._thread is not None,
+            "pending_events": pending,
+            "flush_lag_seconds": self.flush_lag(),
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+            "shed": self._shed,
+            "flushed": self._flushed,
+            "flushes": self._flushes,
+            "flush_failures": self._failures,
+            "last_flush_at": self._last_flush_at,
+            "last_flush_seconds": self._last_flush_seconds,
+            "last_error": self._last_error,
+            "last_rollup_at": self._last_rollup_at,
+            "last_rollup": self._last_rollup,
+        }
+
+    # --- Background flusher (long-running deployments) ---
+
+    def start(self):
+        if self._thread is None and self.threaded():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        next_rollup = time.time() + settings.event_rollup_interval_seconds
+        while not self._stop.is_set():
+            self._wake.wait(settings.event_flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.time() >= next_rollup:
+                    next_rollup = time.time() + settings.event_rollup_interval_seconds
+                    self.rollup()
+            except Exception as e:
+                print(f"Event buffer error: {e}")
+
+
+event_buffer = EventBuffer()
+
+
+class EventService:
+    """Reads over the rolled-up learning event aggregates"""
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def get_lesson_stats(lesson_id: str, days: int = 30) -> dict:
+        client = EventService.supabase_client()
+        since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+        rows = (
+            client.table("lesson_event_rollups")
+            .select("day, opens, time_seconds, scroll_samples, scroll_total, video_events")
+            .eq("lesson_id", lesson_id)
+            .gte("day", since)
+            .order("day")
+            .execute()
+            .data
+        ) or []
+        learners = (
+            client.table("user_lesson_progress")
+            .select("user_id", count="exact")
+            .eq("lesson_id", lesson_id)
+            .limit(1)
+            .execute()
+            .count
+        ) or 0
+
+        samples = sum(row["scroll_samples"] or 0 for row in rows)
+        return {
+            "lesson_id": lesson_id,
+            "learners": learners,
+            "opens": sum(row["opens"] or 0 for row in rows),
+            "time_seconds": sum(row["time_seconds"] or 0 for row in rows),
+            "average_scroll": sum(row["scroll_total"] or 0 for row in rows) / samples if samples else None,
+            "days": [
+                {
+                    "day": row["day"],
+                    "opens": row["opens"],
+                    "time_seconds": row["time_seconds"],
+                    "average_scroll": row["scroll_total"] / row["scroll_samples"] if row["scroll_samples"] else None,
+                    "video_events": row["video_events"],
+                }
+                for row in rows
+            ],
+        }
+
+    @staticmethod
+    def get_user_progress(user_id: str, course_id: Optional[str] = None) -> List[dict]:
+        query = (
+            EventService.supabase_client()
+            .table("user_lesson_progress")
+            .select("*")
+            .eq("user_id", user_id)
+        )
+        if course_id:
+            query = query.eq("course_id", course_id)
+        return query.order("last_seen_at", desc=True).execute().data or []
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, get_args, get_origin
+from itertools import chain
+import json
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from app.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements, stdlib json is the fallback
+    orjson = None
+
+settings = get_settings()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_adapters: Dict[Any, TypeAdapter] = {}
+_plans: Dict[Any, Any] = {}
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSONResponse rendered with orjson (stdlib json when it is not installed)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def adapter(response_type) -> TypeAdapter:
+    """TypeAdapter built once per response type; its validator/serializer are compiled in pydantic-core"""
+    if response_type not in _adapters:
+        _adapters[response_type] = TypeAdapter(response_type)
+    return _adapters[response_type]
+
+
+# --- Projection ---
+# A plan describes which keys of a PostgREST dict a response type keeps:
+#   None                         -> value passes through unchanged
+#   ("model", fields)            -> dict with only the declared fields, fields = [(name, default, plan)]
+#   ("list", plan)               -> every item projected with plan
+
+_MISSING = object()
+
+
+def _plan(annotation):
+    if annotation in _plans:
+        return _plans[annotation]
+
+    origin = get_origin(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        _plans[annotation] = None  # Placeholder while recursing (self-referencing models)
+        fields = []
+        for name, field in annotation.model_fields.items():
+            default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+            fields.append((name, default, _plan(field.annotation)))
+        plan = ("model", fields)
+    elif origin in (list, List):
+        args = get_args(annotation)
+        inner = _plan(args[0]) if args else None
+        plan = ("list", inner) if inner else None
+    elif origin is Union:
+        # Optional[X] projects like X (None passes through)
+        inner = [_plan(arg) for arg in get_args(annotation) if arg is not type(None)]
+        plan = inner[0] if len(inner) == 1 else None
+    else:
+        plan = None
+
+    _plans[annotation] = plan
+    return plan
+
+
+def _apply(plan, value):
+    if plan is None or value is None:
+        return value
+    kind, spec = plan
+    if kind == "list":
+        return [_apply(spec, item) for item in value]
+    projected = {}
+    for name, default, field_plan in spec:
+        item = value.get(name, _MISSING)
+        if item is _MISSING:
+            if default is _MISSING:
+                continue
+            item = default
+        projected[name] = _apply(field_plan, item)
+    return projected
+
+
+def project(response_type, data):
+    """
+    Keep only the fields response_type declares (recursively), without
+    building models or re-validating values. Drops e.g. is_correct from
+    quiz options for QuizOptionUser and internal columns like search_vector.
+    """
+    return _apply(_plan(response_type), data)
+
+
+def respond(response_type, data, mode: Optional[str] = None):
+    """
+    Return data for response_type according to settings.json_fast_path:
+      "off"      - hand data back; FastAPI validates it against response_model
+      "validate" - full validation and serialization in one precompiled TypeAdapter pass
+      "project"  - field projection only, trusting the database for value types
+    """
+    mode = mode or settings.json_fast_path
+    if mode == "validate":
+        type_adapter = adapter(response_type)
+        return Response(type_adapter.dump_json(type_adapter.validate_python(data)), media_type="application/json")
+    if mode == "project":
+        return FastJSONResponse(project(response_type, data))
+    return data
+
+
+# --- Streaming ---
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _encode_pages(pages: Iterable[List[dict]], item_type, ndjson: bool) -> Iterator[bytes]:
+    plan = _plan(item_type) if item_type is not None else None
+    separator = b"\n" if ndjson else b","
+    if not ndjson:
+        yield b"["
+    started = False
+    try:
+        for page in pages:
+            if not page:
+                continue
+            body = separator.join(dumps(_apply(plan, row)) for row in page)
+            if ndjson:
+                yield body + b"\n"
+            else:
+                yield (separator if started else b"") + body
+            started = True
+    except Exception as e:
+        # Headers are already sent; a truncated body is the only way left to signal failure
+        print(f"Streaming response aborted: {e}")
+        raise
+    if not ndjson:
+        yield b"]"
+
+
+def stream_rows(pages: Iterable[List[dict]], item_type=None, ndjson: bool = False) -> StreamingResponse:
+    """
+    Stream pages of rows as one JSON array (or NDJSON, one row per line),
+    projecting each row to item_type like respond() does. The first page is
+    fetched before the response starts, so query errors still become
+    regular error responses; memory holds one page at a time.
+    """
+    pages = iter(pages)
+    first = next(pages, [])
+    return StreamingResponse(
+        _encode_pages(chain([first], pages), item_type, ndjson),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+    )
@@ -0,0 +1,160 @@
+from typing import List, Optional, Tuple
+import hashlib
+import io
+import mimetypes
+from fastapi import HTTPException, status
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from app.config import get_settings
+from app.services.job_queue import JobQueue
+from app.services.storage_service import storage_service
+
+settings = get_settings()
+
+VARIANT_WIDTHS = sorted(int(w) for w in settings.image_variant_widths.split(",") if w.strip())
+
+# Vector and animated images are stored as-is (only deduplicated)
+PASSTHROUGH_CONTENT_TYPES = {"image/svg+xml": "svg", "image/gif": "gif"}
+
+# Hashed objects never change, so caches may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImageService:
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_folder(content_hash: str) -> str:
+        return f"images/{content_hash}"
+
+    @staticmethod
+    def variant_sizes(width: int, height: int) -> List[Tuple[int, int]]:
+        """(width, height) of each variant of an upright image, smallest first"""
+        # Never upscale; the widest variant is capped at the largest configured width
+        max_width = min(width, VARIANT_WIDTHS[-1]) if VARIANT_WIDTHS else width
+        widths = [w for w in VARIANT_WIDTHS if w < max_width] + [max_width]
+        return [(w, max(1, round(height * w / width))) for w in widths]
+
+    @staticmethod
+    def expected_paths(data: bytes, content_type: Optional[str]) -> List[str]:
+        """
+        Objects a complete store_image() leaves under the content hash, worked out
+        from the image header (size and EXIF orientation) without decoding pixels
+        """
+        folder = ImageService.hash_folder(ImageService.content_hash(data))
+        passthrough_ext = PASSTHROUGH_CONTENT_TYPES.get(content_type or "")
+        if passthrough_ext:
+            return [f"{folder}/original.{passthrough_ext}"]
+        try:
+            img = Image.open(io.BytesIO(data))
+            orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        except (UnidentifiedImageError, OSError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported or corrupt image: {str(e)}",
+            )
+        # Orientations 5-8 rotate by 90 degrees
+        width, height = (img.height, img.width) if orientation in (5, 6, 7, 8) else img.size
+        return [f"{folder}/{w}x{h}.webp" for w, h in ImageService.variant_sizes(width, height)]
+
+    @staticmethod
+    def build_variants(data: bytes) -> List[dict]:
+        """
+        Decode an image, apply EXIF orientation and re-encode it as WebP at each
+        responsive width up to the original size. Metadata (EXIF, ICC, XMP) is
+        not carried over.
+        """
+        try:
+            img = Image.open(io.BytesIO(data))
+            img = ImageOps.exif_transpose(img)
+        except (UnidentifiedImageError, OSError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported or corrupt image: {str(e)}",
+            )
+
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+        variants = []
+        for width, height in ImageService.variant_sizes(img.width, img.height):
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            resized.save(buf, format="WEBP", quality=settings.image_webp_quality, method=4)
+            variants.append({"width": width, "height": height, "data": buf.getvalue()})
+        return variants
+
+    @staticmethod
+    def store_image(bucket_name: str, data: bytes, content_type: Optional[str]) -> dict:
+        """
+        Store an image under its content hash and return the variant set.
+        Re-uploading identical bytes reuses the existing objects, but only when
+        every expected variant is there: an upload that died halfway is redone.
+        Blocking (Pillow and storage calls); async routes run it in a thread.
+        """
+        content_hash = ImageService.content_hash(data)
+        folder = ImageService.hash_folder(content_hash)
+
+        expected = set(ImageService.expected_paths(data, content_type))
+        existing = [item for item in ImageService._list_stored(bucket_name, folder) if item["path"] in expected]
+        if len(existing) == len(expected):
+            return ImageService._describe(bucket_name, content_hash, existing, deduplicated=True)
+
+        stored = []
+        passthrough_ext = PASSTHROUGH_CONTENT_TYPES.get(content_type or "")
+        if passthrough_ext:
+            path = f"{folder}/original.{passthrough_ext}"
+            storage_service.put_sync(bucket_name, path, data, content_type=content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+            stored.append({"path": path, "width": None, "height": None, "size": len(data), "content_type": content_type})
+        else:
+            for variant in ImageService.build_variants(data):
+                path = f"{folder}/{variant['width']}x{variant['height']}.webp"
+                storage_service.put_sync(bucket_name, path, variant["data"], content_type="image/webp", cache_control=IMMUTABLE_CACHE_CONTROL)
+                stored.append({"path": path, "width": variant["width"], "height": variant["height"], "size": len(variant["data"]), "content_type": "image/webp"})
+
+        return ImageService._describe(bucket_name, content_hash, stored, deduplicated=False)
+
+    @staticmethod
+    def process_stored(bucket_name: str, path: str, content_type: Optional[str]) -> dict:
+        """Run a raw object (e.g. a direct upload) through the pipeline and drop the raw copy"""
+        data = storage_service.get_sync(bucket_name, path)
+        result = ImageService.store_image(bucket_name, data, content_type)
+        JobQueue.enqueue("storage.delete", {"bucket": bucket_name, "paths": [path]})
+        return result
+
+    @staticmethod
+    def _list_stored(bucket_name: str, folder: str) -> List[dict]:
+        stored = []
+        for item in storage_service.list_sync(bucket_name, f"{folder}/"):
+            name = item["key"].rsplit("/", 1)[-1]
+            width = height = None
+            stem = name.rsplit(".", 1)[0]
+            if "x" in stem and stem.replace("x", "", 1).isdigit():
+                width, height = (int(v) for v in stem.split("x"))
+            stored.append({
+                "path": item["key"],
+                "width": width,
+                "height": height,
+                "size": int(item.get("size") or 0),
+                "content_type": item.get("content_type") or mimetypes.guess_type(name)[0],
+            })
+        return stored
+
+    @staticmethod
+    def _describe(bucket_name: str, content_hash: str, stored: List[dict], deduplicated: bool) -> dict:
+        variants = sorted(stored, key=lambda v: v["width"] or 0)
+        for variant in variants:
+            variant["url"] = storage_service.public_url(bucket_name, variant["path"])
+
+        # The largest variant doubles as the canonical image
+        primary = variants[-1]
+        return {
+            "url": primary["url"],
+            "path": primary["path"],
+            "content_type": primary["content_type"],
+            "size": primary["size"],
+            "hash": content_hash,
+            "deduplicated": deduplicated,
+            "variants": variants,
+        }
@@ -0,0 +1,57 @@
+from typing import Dict, List
+from app.services.job_queue import job_handler
+from app.services.storage_service import storage_service
+
+
+def _group_by_bucket(payloads: List[dict], key: str) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for payload in payloads:
+        grouped.setdefault(payload["bucket"], []).extend(payload.get(key) or [])
+    return grouped
+
+
+@job_handler("storage.delete")
+def delete_objects(payloads: List[dict]):
+    """payload: {"bucket": str, "paths": [str]}"""
+    for bucket_name, paths in _group_by_bucket(payloads, "paths").items():
+        storage_service.delete_many_sync(bucket_name, paths)
+
+
+@job_handler("storage.delete_prefix")
+def delete_prefixes(payloads: List[dict]):
+    """payload: {"bucket": str, "prefixes": [folder]} - removes every object in each folder"""
+    for bucket_name, prefixes in _group_by_bucket(payloads, "prefixes").items():
+        paths = []
+        for prefix in dict.fromkeys(prefixes):
+            folder = prefix.rstrip("/") + "/"
+            for page in storage_service.iter_pages_sync(bucket_name, folder):
+                paths.extend(item["key"] for item in page)
+        storage_service.delete_many_sync(bucket_name, paths)
+
+
+@job_handler("ordering.rebalance")
+def rebalance_ordering(payloads: List[dict]):
+    """payload: {"table": str, "parent_id": str} - respaces sort keys that have grown long"""
+    from app.services.ordering_service import OrderingService
+
+    for table, parent_id in dict.fromkeys((p["table"], p["parent_id"]) for p in payloads):
+        OrderingService.rebalance(table, parent_id)
+
+
+@job_handler("course.published")
+def rebuild_published_courses(payloads: List[dict]):
+    """payload: {"course_id": str, "published_at": str, "version": str} - one rebuild per course per batch"""
+    from app.services.course_publish_service import CoursePublishService
+
+    # rebuild() reads the course's current publish, so older payloads need no run of their own
+    for course_id in dict.fromkeys(p["course_id"] for p in payloads):
+        CoursePublishService.rebuild(course_id)
+
+
+@job_handler("quiz.regrade")
+def regrade_quizzes(payloads: List[dict]):
+    """payload: {"quiz_id": str, "run_id": str} - runs are idempotent, a repeat finds nothing left to change"""
+    from app.services.regrade_service import RegradeService
+
+    for payload in payloads:
+        RegradeService.run(payload["quiz_id"], payload.get("run_id"))
@@ -0,0 +1,150 @@
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import os
+import threading
+from app.config import get_settings
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+# kind -> handler(payloads). Handlers receive every claimed payload of their kind at once.
+JOB_HANDLERS: Dict[str, Callable[[List[dict]], None]] = {}
+
+RETRY_BASE_SECONDS = 30
+
+
+def job_handler(kind: str):
+    """Register a batch handler for a job kind"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+class JobQueue:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def enqueue(kind: str, payload: dict, delay_seconds: int = 0):
+        JobQueue.enqueue_many([(kind, payload)], delay_seconds)
+
+    @staticmethod
+    def enqueue_many(jobs: List[tuple], delay_seconds: int = 0):
+        """Insert (kind, payload) jobs into the outbox in a single statement"""
+        if not jobs:
+            return
+        run_after = (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat()
+        rows = [{"kind": kind, "payload": payload, "run_after": run_after} for kind, payload in jobs]
+        JobQueue.supabase_client().table("background_jobs").insert(rows).execute()
+        job_worker.notify()
+
+    @staticmethod
+    def drain(max_jobs: Optional[int] = None) -> dict:
+        """Claim due jobs, run them batched by kind and record the outcome"""
+        from app.services import job_handlers  # noqa: F401  (registers handlers)
+
+        client = JobQueue.supabase_client()
+        report = {"claimed": 0, "succeeded": 0, "retried": 0, "failed": 0}
+        remaining = max_jobs or settings.job_batch_size
+
+        while remaining > 0:
+            claimed = client.rpc("claim_background_jobs", {
+                "batch_size": min(remaining, settings.job_batch_size),
+                "lease_seconds": settings.job_lease_seconds,
+            }).execute().data or []
+            if not claimed:
+                break
+            remaining -= len(claimed)
+            report["claimed"] += len(claimed)
+
+            by_kind: Dict[str, List[dict]] = {}
+            for job in claimed:
+                by_kind.setdefault(job["kind"], []).append(job)
+
+            done_ids = []
+            for kind, jobs in by_kind.items():
+                handler = JOB_HANDLERS.get(kind)
+                if handler is None:
+                    for job in jobs:
+                        JobQueue._record_failure(job, f"No handler registered for '{kind}'", report)
+                    continue
+                try:
+                    handler([job["payload"] for job in jobs])
+                    done_ids.extend(job["id"] for job in jobs)
+                except Exception:
+                    # Retry one by one so a single bad payload doesn't hold back the batch
+                    for job in jobs:
+                        try:
+                            handler([job["payload"]])
+                            done_ids.append(job["id"])
+                        except Exception as e:
+                            JobQueue._record_failure(job, str(e), report)
+
+            if done_ids:
+                client.table("background_jobs").delete().in_("id", done_ids).execute()
+                report["succeeded"] += len(done_ids)
+
+        return report
+
+    @staticmethod
+    def _record_failure(job: dict, error: str, report: dict):
+        print(f"Job {job['id']} ({job['kind']}) failed: {error}")
+        exhausted = job["attempts"] >= job.get("max_attempts", 5)
+        delay = RETRY_BASE_SECONDS * (2 ** (job["attempts"] - 1))
+        JobQueue.supabase_client().table("background_jobs").update({
+            "status": "failed" if exhausted else "pending",
+            "run_after": (datetime.utcnow() + timedelta(seconds=delay)).isoformat(),
+            "locked_until": None,
+            "last_error": error[:2000],
+            "updated_at": datetime.utcnow().isoformat(),
+        }).eq("id", job["id"]).execute()
+        report["failed" if exhausted else "retried"] += 1
+
+
+class JobWorker:
+    """Daemon thread that drains the outbox in long-running (non-serverless) deployments"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        mode = settings.job_worker_mode
+        if mode == "auto":
+            return not os.environ.get("VERCEL")
+        return mode == "thread"
+
+    def start(self):
+        if self._thread is None and self.enabled():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="job-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                report = JobQueue.drain()
+                busy = report["claimed"] > 0
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                busy = False
+            if not busy:
+                self._wake.wait(settings.job_poll_interval_seconds)
+                self._wake.clear()
+
+
+job_worker = JobWorker()
@@ -0,0 +1,122 @@
+from typing import Optional
+import asyncio
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.config import get_settings
+from app.services.cache_service import TTLCache
+from app.services.content_url_service import CONTENT_BUCKET
+from app.services.navigation_service import NavigationService
+from app.services.storage_backends import StorageObjectNotFound
+from app.services.storage_service import storage_service
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+# "lesson:<slug>" and "quiz:<chapter_id>" expire after the bundle TTL; "content:<mdx_path>:<content_hash>" is keyed by the document hash
+lesson_bundle_cache = TTLCache(maxsize=4096, ttl=settings.lesson_bundle_ttl_seconds)
+lesson_content_cache = TTLCache(maxsize=512, ttl=3600)
+
+
+class LessonBundleService:
+    """
+    Everything a lesson page needs in one response: the lesson, its MDX,
+    its chapter with sibling lessons, prev/next links and the chapter quiz.
+    """
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def _cached(key: str, factory):
+        return lesson_bundle_cache.get_or_set(key, factory)
+
+    @staticmethod
+    def get_lesson(slug: str) -> dict:
+        """Lesson row with its chapter embedded (one round trip)"""
+        def load():
+            result = (
+                LessonBundleService.supabase_client().table("lessons")
+                .select("*, chapter:chapters(id, course_id, title, slug, position, sort_key, status)")
+                .eq("slug", slug)
+                .limit(1)
+                .execute()
+            )
+            return result.data[0] if result.data else None
+
+        key = f"lesson:{slug}"
+        lesson = lesson_bundle_cache.get(key)
+        if lesson is None:
+            # Misses are not cached, so a lesson created under this slug shows up at once
+            lesson = load()
+            if lesson:
+                lesson_bundle_cache.set(key, lesson)
+        if not lesson:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Lesson with slug '{slug}' not found",
+            )
+        return lesson
+
+    @staticmethod
+    def get_chapter_quiz_id(chapter_id: str) -> Optional[str]:
+        def load():
+            result = (
+                LessonBundleService.supabase_client().table("quizzes")
+                .select("id")
+                .eq("chapter_id", str(chapter_id))
+                .eq("status", "Published")
+                .limit(1)
+                .execute()
+            )
+            return result.data[0]["id"] if result.data else None
+
+        return LessonBundleService._cached(f"quiz:{chapter_id}", load)
+
+    @staticmethod
+    async def get_content(mdx_path: Optional[str], content_hash: Optional[str]) -> Optional[str]:
+        if not mdx_path:
+            return None
+        key = f"content:{mdx_path}:{content_hash}"
+        content = lesson_content_cache.get(key)
+        if content is None:
+            try:
+                content = (await storage_service.get(CONTENT_BUCKET, mdx_path)).decode("utf-8")
+            except StorageObjectNotFound:
+                return None
+            # Without a hash the bytes behind the path can change, so only keep them briefly
+            lesson_content_cache.set(key, content, ttl=None if content_hash else settings.lesson_bundle_ttl_seconds)
+        return content
+
+    @staticmethod
+    async def get_bundle(slug: str) -> dict:
+        lesson = await run_in_threadpool(LessonBundleService.get_lesson, slug)
+        chapter = lesson.get("chapter") or {}
+
+        # Everything else only depends on the lesson row, so fetch it concurrently
+        navigation, content, quiz_id = await asyncio.gather(
+            run_in_threadpool(NavigationService.get, chapter.get("course_id")),
+            LessonBundleService.get_content(lesson.get("mdx_path"), lesson.get("content_hash")),
+            run_in_threadpool(LessonBundleService.get_chapter_quiz_id, lesson["chapter_id"]),
+        )
+
+        position = navigation.position(lesson_id=lesson["id"]) or {}
+        lesson_data = {key: value for key, value in lesson.items() if key != "chapter"}
+        lesson_data["fileKey"] = lesson.get("mdx_path")
+
+        return {
+            "lesson": lesson_data,
+            "content": content,
+            "chapter": {**chapter, "lessons": navigation.chapter_lessons(lesson["chapter_id"])},
+            "prev_lesson": position.get("prev_lesson"),
+            "next_lesson": position.get("next_lesson"),
+            "quiz_id": quiz_id,
+        }
+
+    @staticmethod
+    def invalidate(slug: Optional[str] = None, chapter_id: Optional[str] = None):
+        """Forget cached bundle parts after a lesson or chapter quiz changes"""
+        if slug:
+            lesson_bundle_cache.delete(f"lesson:{slug}")
+        if chapter_id:
+            lesson_bundle_cache.delete(f"quiz:{chapter_id}")
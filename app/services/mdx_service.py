@@ -0,0 +1,196 @@
+from typing import List, Optional
+import hashlib
+import math
+import re
+from fastapi import HTTPException, status
+from app.supabase_client import get_client
+from app.services.search_service import SearchService
+from app.services.storage_backends import StorageObjectNotFound
+from app.services.storage_service import storage_service
+
+WORDS_PER_MINUTE = 200
+
+FENCE_RE = re.compile(r"^\s*(```|~~~)\s*([\w+#.-]*)")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FRONTMATTER_RE = re.compile(r"\A---\s*\n.*?\n---\s*\n", re.DOTALL)
+MD_IMAGE_RE = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+MD_LINK_RE = re.compile(r"(?<!!)\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+JSX_SRC_RE = re.compile(r"<(?:img|Image)\b[^>]*?\bsrc=[\"']([^\"']+)[\"']", re.IGNORECASE)
+JSX_HREF_RE = re.compile(r"<(?:a|Link)\b[^>]*?\bhref=[\"']([^\"']+)[\"']", re.IGNORECASE)
+ESM_RE = re.compile(r"^\s*(import|export)\s")
+TAG_RE = re.compile(r"</?[A-Za-z][^>]*>")
+WORD_RE = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+def _slugify(text: str) -> str:
+    slug = re.sub(r"[^\w\s-]", "", text.lower()).strip()
+    return re.sub(r"[\s]+", "-", slug)
+
+
+def _strip_inline(text: str) -> str:
+    """Reduce inline markdown/JSX to its visible text"""
+    text = MD_IMAGE_RE.sub("", text)
+    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = TAG_RE.sub("", text)
+    text = re.sub(r"`([^`]*)`", r"\1", text)
+    return re.sub(r"[*_~]", "", text).strip()
+
+
+def _unique(items: List[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+
+class MdxService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def analyze(text: str) -> dict:
+        """
+        Extract headings, table of contents, word count, reading time, image and
+        link references and code-block languages from an MDX document.
+        """
+        body = FRONTMATTER_RE.sub("", text, count=1)
+
+        headings = []
+        prose_lines = []
+        code_languages = []
+        slug_counts = {}
+        fence = None
+
+        for line in body.splitlines():
+            fence_match = FENCE_RE.match(line)
+            if fence:
+                if fence_match and fence_match.group(1) == fence and not fence_match.group(2):
+                    fence = None
+                continue
+            if fence_match:
+                fence = fence_match.group(1)
+                if fence_match.group(2):
+                    code_languages.append(fence_match.group(2).lower())
+                continue
+            if ESM_RE.match(line):
+                continue
+
+            heading = HEADING_RE.match(line)
+            if heading:
+                title = _strip_inline(heading.group(2))
+                slug = _slugify(title)
+                if slug in slug_counts:
+                    slug_counts[slug] += 1
+                    slug = f"{slug}-{slug_counts[slug]}"
+                else:
+                    slug_counts[slug] = 0
+                headings.append({"depth": len(heading.group(1)), "text": title, "slug": slug})
+            prose_lines.append(line)
+
+        prose = "\n".join(prose_lines)
+        word_count = len(WORD_RE.findall(_strip_inline(prose)))
+
+        return {
+            "headings": headings,
+            "toc": MdxService.build_toc(headings),
+            "word_count": word_count,
+            "reading_time_minutes": math.ceil(word_count / WORDS_PER_MINUTE) if word_count else 0,
+            "images": _unique(MD_IMAGE_RE.findall(prose) + JSX_SRC_RE.findall(prose)),
+            "links": _unique(MD_LINK_RE.findall(prose) + JSX_HREF_RE.findall(prose)),
+            "code_languages": _unique(code_languages),
+        }
+
+    @staticmethod
+    def extract_text(text: str) -> str:
+        """Visible prose of the document (no frontmatter, imports, code or markup), for search"""
+        body = FRONTMATTER_RE.sub("", text, count=1)
+        lines = []
+        fence = None
+        for line in body.splitlines():
+            fence_match = FENCE_RE.match(line)
+            if fence:
+                if fence_match and fence_match.group(1) == fence and not fence_match.group(2):
+                    fence = None
+                continue
+            if fence_match:
+                fence = fence_match.group(1)
+                continue
+            if ESM_RE.match(line):
+                continue
+            stripped = _strip_inline(line.lstrip("#>-+ \t"))
+            if stripped:
+                lines.append(stripped)
+        return "\n".join(lines)
+
+    @staticmethod
+    def build_toc(headings: List[dict]) -> List[dict]:
+        """Nest a flat heading list by depth"""
+        toc = []
+        stack = []  # (depth, entry)
+        for heading in headings:
+            entry = {**heading, "children": []}
+            while stack and stack[-1][0] >= heading["depth"]:
+                stack.pop()
+            if stack:
+                stack[-1][1]["children"].append(entry)
+            else:
+                toc.append(entry)
+            stack.append((heading["depth"], entry))
+        return toc
+
+    @staticmethod
+    def outline_update(content: bytes, current_hash: Optional[str]) -> dict:
+        """
+        Columns to write alongside a new document. Analysis only runs when the
+        content hash differs from the one already stored on the lesson.
+        """
+        content_hash = MdxService.content_hash(content)
+        if content_hash == current_hash:
+            return {}
+        text = content.decode("utf-8", errors="replace")
+        return {
+            "content_hash": content_hash,
+            "content_outline": MdxService.analyze(text),
+            "content_text": MdxService.extract_text(text),
+        }
+
+    @staticmethod
+    def get_outline(lesson_id: str) -> dict:
+        """Serve the stored outline, analysing legacy content once if missing"""
+        client = MdxService.supabase_client()
+        result = (
+            client.table("lessons")
+            .select("mdx_path, content_hash, content_outline")
+            .eq("id", str(lesson_id))
+            .limit(1)
+            .execute()
+        )
+        if not result.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Lesson with id '{lesson_id}' not found",
+            )
+
+        lesson = result.data[0]
+        outline = lesson.get("content_outline")
+        content_hash = lesson.get("content_hash")
+
+        if outline is None and lesson.get("mdx_path"):
+            try:
+                content = storage_service.get_sync("lesson-content", lesson["mdx_path"])
+            except StorageObjectNotFound:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Lesson content '{lesson['mdx_path']}' not found",
+                )
+            update = MdxService.outline_update(content, None)
+            client.table("lessons").update(update).eq("id", str(lesson_id)).execute()
+            SearchService.index_lesson({"id": str(lesson_id), "content_text": update["content_text"]})
+            outline, content_hash = update["content_outline"], update["content_hash"]
+
+        if outline is None:
+            outline = MdxService.analyze("")
+
+        return {"lesson_id": lesson_id, "content_hash": content_hash, **outline}
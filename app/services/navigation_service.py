@@ -0,0 +1,149 @@
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.services.cache_service import TTLCache
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+# course_id -> CourseNavIndex
+course_nav_cache = TTLCache(maxsize=1024, ttl=settings.course_nav_ttl_seconds)
+# chapter/lesson id -> course_id of the cached index it appeared in, so writes that
+# only know a chapter or lesson id can still drop the right index. Entries expire
+# with their index and are dropped when it is invalidated.
+_course_of = TTLCache(maxsize=256 * course_nav_cache.maxsize, ttl=settings.course_nav_ttl_seconds)
+
+
+class CourseNavIndex:
+    """
+    A course_nav_index row with id/slug lookups: a lesson's ordinal,
+    neighbours and chapter are found in O(1) without the course tree.
+    """
+
+    def __init__(self, row: dict):
+        self.course_id = str(row["course_id"])
+        self.version = row.get("version") or 1
+        self.lessons: List[dict] = row.get("lessons") or []
+        self.chapters: List[dict] = row.get("chapters") or []
+        self._by_id = {str(lesson["id"]): index for index, lesson in enumerate(self.lessons)}
+        self._by_slug = {lesson["slug"]: index for index, lesson in enumerate(self.lessons)}
+        self._chapters = {str(chapter["id"]): chapter for chapter in self.chapters}
+
+    @property
+    def total(self) -> int:
+        return len(self.lessons)
+
+    def ids(self) -> List[str]:
+        return list(self._chapters) + list(self._by_id)
+
+    def _index(self, lesson_id: Optional[str] = None, slug: Optional[str] = None) -> Optional[int]:
+        return self._by_id.get(str(lesson_id)) if lesson_id is not None else self._by_slug.get(slug)
+
+    def position(self, lesson_id: Optional[str] = None, slug: Optional[str] = None) -> Optional[dict]:
+        """Ordinal, chapter and prev/next of a lesson, or None if it is not in this course"""
+        index = self._index(lesson_id, slug)
+        if index is None:
+            return None
+        lesson = self.lessons[index]
+        chapter = self._chapters[str(lesson["chapter_id"])]
+        return {
+            "course_id": self.course_id,
+            "version": self.version,
+            "lesson": lesson,
+            "ordinal": index + 1,
+            "total": self.total,
+            "chapter": chapter,
+            "chapter_ordinal": index + 2 - chapter["first_ordinal"],
+            "prev_lesson": self.lessons[index - 1] if index > 0 else None,
+            "next_lesson": self.lessons[index + 1] if index + 1 < self.total else None,
+        }
+
+    def chapter_lessons(self, chapter_id: str) -> List[dict]:
+        chapter = self._chapters.get(str(chapter_id))
+        if not chapter or not chapter.get("lesson_count"):
+            return []
+        start = chapter["first_ordinal"] - 1
+        return self.lessons[start:start + chapter["lesson_count"]]
+
+    def as_dict(self) -> dict:
+        return {
+            "course_id": self.course_id,
+            "version": self.version,
+            "total": self.total,
+            "chapters": self.chapters,
+            "lessons": self.lessons,
+        }
+
+
+class NavigationService:
+    """Per-course navigation index, maintained by database triggers (migrations/add_course_navigation.sql)"""
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def _load(course_id: str) -> Optional[dict]:
+        result = (
+            NavigationService.supabase_client().table("course_nav_index")
+            .select("course_id, chapters, lessons, version")
+            .eq("course_id", str(course_id))
+            .limit(1)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+
+    @staticmethod
+    def get(course_id: str) -> CourseNavIndex:
+        """Navigation index of a course, from cache when warm"""
+        course_id = str(course_id)
+        index = course_nav_cache.get(course_id)
+        if index is not None:
+            return index
+
+        row = NavigationService._load(course_id)
+        if row is None:
+            # Courses without chapters have no row until the first write; build it on demand
+            if NavigationService.rebuild([course_id]):
+                row = NavigationService._load(course_id)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Course with id '{course_id}' not found",
+            )
+
+        index = CourseNavIndex(row)
+        for item_id in index.ids():
+            _course_of.set(item_id, course_id)
+        course_nav_cache.set(course_id, index)
+        return index
+
+    @staticmethod
+    def rebuild(course_ids: List[str]) -> int:
+        """Recompute indexes explicitly (triggers keep them current otherwise)"""
+        rebuilt = NavigationService.supabase_client().rpc(
+            "rebuild_course_nav", {"target_ids": [str(course_id) for course_id in course_ids]}
+        ).execute().data
+        for course_id in course_ids:
+            NavigationService.invalidate(course_id=course_id)
+        return rebuilt or 0
+
+    @staticmethod
+    def invalidate(course_id: Optional[str] = None, item_ids: Iterable = ()):
+        """
+        Drop cached indexes after a create/delete/move/reorder. Chapter or lesson
+        ids resolve to their course through the ids of previously cached indexes;
+        other instances pick the change up when their cache entry expires.
+        """
+        course_ids = {str(course_id)} if course_id else set()
+        for item_id in item_ids:
+            item_course_id = _course_of.get(str(item_id)) if item_id else None
+            if item_course_id:
+                course_ids.add(item_course_id)
+        for cached_course_id in course_ids:
+            index = course_nav_cache.get(cached_course_id)
+            if index is not None:
+                for item_id in index.ids():
+                    if _course_of.get(item_id) == cached_course_id:
+                        _course_of.delete(item_id)
+            course_nav_cache.delete(cached_course_id)
@@ -0,0 +1,83 @@
+from typing import List, Optional
+from fastapi import HTTPException, status
+from postgrest.exceptions import APIError
+from app.supabase_client import get_client
+
+# Ordered table -> column holding the parent id (mirrors ordering_parent_column() in SQL)
+ORDERED_TABLES = {
+    "chapters": "course_id",
+    "lessons": "chapter_id",
+    "quiz_questions": "quiz_id",
+    "quiz_options": "question_id",
+}
+
+NOT_FOUND = "P0002"
+INVALID_PARAMETER = "22023"
+
+
+class OrderingService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def sort(rows: Optional[List[dict]]) -> List[dict]:
+        """
+        Order siblings by their fractional sort_key and report each row's
+        1-based ordinal as position (stored positions go stale after moves).
+        """
+        if not rows:
+            return rows or []
+        rows.sort(key=lambda r: (r.get("sort_key") or "", str(r.get("id", ""))))
+        for index, row in enumerate(rows, start=1):
+            row["position"] = index
+        return rows
+
+    @staticmethod
+    def _rpc(name: str, params: dict):
+        try:
+            return OrderingService.supabase_client().rpc(name, params).execute()
+        except APIError as e:
+            if e.code == NOT_FOUND:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
+            if e.code == INVALID_PARAMETER:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+            raise
+
+    @staticmethod
+    def move(table: str, row_id: str, before_id: Optional[str] = None,
+             after_id: Optional[str] = None, parent_id: Optional[str] = None) -> dict:
+        """Place a row before/after a sibling (or last under parent_id) by rewriting only its key"""
+        result = OrderingService._rpc("move_ordered_row", {
+            "table_name": table,
+            "row_id": str(row_id),
+            "before_id": str(before_id) if before_id else None,
+            "after_id": str(after_id) if after_id else None,
+            "parent_id": str(parent_id) if parent_id else None,
+        })
+        return result.data
+
+    @staticmethod
+    def reorder(table: str, positions: List[dict]) -> int:
+        """
+        Apply client-side [{"id", "position"}] items in a single call. The items
+        may be a subset of one parent's rows: each lands at its 1-based position
+        among all of them and the siblings left out keep their relative order.
+        """
+        if not positions:
+            return 0
+        result = OrderingService._rpc("set_ordering", {
+            "table_name": table,
+            "ids": [str(item["id"]) for item in positions],
+            "positions": [int(item["position"]) for item in positions],
+        })
+        return result.data or 0
+
+    @staticmethod
+    def rebalance(table: str, parent_id: str) -> int:
+        """Respace one sibling list evenly (run by the background job worker)"""
+        result = OrderingService.supabase_client().rpc("rebalance_ordering", {
+            "table_name": table,
+            "parent_id": str(parent_id),
+        }).execute()
+        return result.data or 0
@@ -1,14 +1,33 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from uuid import UUID
 from datetime import datetime
 from fastapi import HTTPException, status
+from app.config import get_settings
 from app.supabase_client import get_client
+from app.services import attempt_answers
+from app.services.cache_service import TTLCache
+from app.services.database_service import iter_pages
+from app.services.ordering_service import OrderingService
+
+settings = get_settings()
+
+# Attempt fields in response shapes; the compact answer columns are decoded, never returned
+ATTEMPT_COLUMNS = "id, quiz_id, user_id, score, max_score, percent, passed, started_at, submitted_at"
+# layout_id -> layout; layouts are immutable, so entries only age out to bound memory
+quiz_layout_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
 
 class QuizService:
     @staticmethod
     def supabase_client():
         return get_client()
 
+    @staticmethod
+    def _sort_questions(quiz: dict) -> dict:
+        """Order questions and options by sort key (nested selects come back unordered)"""
+        for q in OrderingService.sort(quiz.get("questions")):
+            OrderingService.sort(q.get("options"))
+        return quiz
+
     @staticmethod
     def get_quizzes_by_course(course_id: str, published_only: bool = True) -> List[dict]:
         query = QuizService.supabase_client().table("quizzes").select("*, questions:quiz_questions(*, options:quiz_options(*))").eq("course_id", str(course_id))
@@ -25,13 +44,7 @@ class QuizService:
             return None
         
         quiz = result.data[0]
-        # Sort questions and options by position
-        if quiz.get("questions"):
-            quiz["questions"] = sorted(quiz["questions"], key=lambda x: x.get("position", 0))
-            for q in quiz["questions"]:
-                if q.get("options"):
-                    q["options"] = sorted(q["options"], key=lambda x: x.get("position", 0))
-        return quiz
+        return QuizService._sort_questions(quiz)
 
     @staticmethod
     def get_quizzes_admin(course_id: str) -> List[dict]:
@@ -72,13 +85,7 @@ class QuizService:
             return None
         
         quiz = result.data[0]
-        # Sort questions and options by position
-        if quiz.get("questions"):
-            quiz["questions"] = sorted(quiz["questions"], key=lambda x: x.get("position", 0))
-            for q in quiz["questions"]:
-                if q.get("options"):
-                    q["options"] = sorted(q["options"], key=lambda x: x.get("position", 0))
-        return quiz
+        return QuizService._sort_questions(quiz)
 
     @staticmethod
     def get_quiz_by_chapter(course_id: str, chapter_id: str, published_only: bool = True) -> Optional[dict]:
@@ -95,13 +102,7 @@ class QuizService:
             return None
         
         quiz = result.data[0]
-        # Sort questions and options by position
-        if quiz.get("questions"):
-            quiz["questions"] = sorted(quiz["questions"], key=lambda x: x.get("position", 0))
-            for q in quiz["questions"]:
-                if q.get("options"):
-                    q["options"] = sorted(q["options"], key=lambda x: x.get("position", 0))
-        return quiz
+        return QuizService._sort_questions(quiz)
 
     @staticmethod
     def create_quiz_draft_for_chapter(course_id: str, chapter_id: str, title: str) -> dict:
@@ -150,16 +151,28 @@ class QuizService:
         if updates.status is not None: meta["status"] = updates.status
         
         client = QuizService.supabase_client()
+        existing = QuizService.get_quiz_by_id(quiz_id) if updates.questions is not None or "passing_score_percent" in meta else None
+        key_changed = bool(existing) and meta.get("passing_score_percent", existing["passing_score_percent"]) != existing["passing_score_percent"]
         
         if meta:
             meta["updated_at"] = datetime.utcnow().isoformat()
             client.table("quizzes").update(meta).eq("id", str(quiz_id)).execute()
 
-        if updates.questions is not None:
+        key_changes = QuizService._answer_key_changes(existing, updates.questions) if updates.questions is not None and existing else None
+        if key_changes is not None:
+            # Same questions and options in the same order, at most a fixed answer key:
+            # update the key in place so attempts keep pointing at them and can be regraded
+            QuizService._apply_answer_key_changes(key_changes)
+            key_changed = key_changed or bool(key_changes["points"] or key_changes["is_correct"])
+        elif updates.questions is not None:
+            # Attempts of the old questions can no longer be regraded against the new ones
+            key_changed = False
             # Delete existing questions (cascade will handle options)
             client.table("quiz_questions").delete().eq("quiz_id", str(quiz_id)).execute()
             
-            for q_idx, q_data in enumerate(updates.questions):
+            # Rows are appended in insertion order, so insert them in position order
+            questions = sorted(updates.questions, key=lambda q: q.position)
+            for q_idx, q_data in enumerate(questions):
                 new_q_payload = {
                     "quiz_id": str(quiz_id),
                     "prompt": q_data.prompt,
@@ -173,7 +186,7 @@ class QuizService:
                 q_id = q_result.data[0]["id"]
                 
                 options_payload = []
-                for o_data in q_data.options:
+                for o_data in sorted(q_data.options, key=lambda o: o.position):
                     options_payload.append({
                         "question_id": q_id,
                         "content": o_data.content,
@@ -185,9 +198,51 @@ class QuizService:
                 if options_payload:
                     client.table("quiz_options").insert(options_payload).execute()
 
+        if key_changed:
+            from app.services.regrade_service import RegradeService
+
+            RegradeService.start(quiz_id)
 
         return QuizService.get_quiz_by_id(quiz_id)
 
+    @staticmethod
+    def _answer_key_changes(existing: dict, questions: list) -> Optional[dict]:
+        """
+        Answer key edits between the stored quiz and an update payload:
+        {"points": {question_id: points}, "is_correct": {option_id: bool}}.
+        Returns None unless the payload has the same prompts, options and images
+        in the same order, so ids are only ever matched to the content they hold.
+        """
+        current = existing.get("questions") or []
+        ordered = sorted(questions, key=lambda q: q.position)
+        if len(current) != len(ordered):
+            return None
+        changes = {"points": {}, "is_correct": {}}
+        for q, q_data in zip(current, ordered):
+            options = q.get("options") or []
+            new_options = sorted(q_data.options, key=lambda o: o.position)
+            if (q["prompt"], q.get("image_url")) != (q_data.prompt, q_data.image_url) or len(options) != len(new_options):
+                return None
+            if q.get("points", 1) != q_data.points:
+                changes["points"][q["id"]] = q_data.points
+            for o, o_data in zip(options, new_options):
+                if (o["content"], o.get("image_url")) != (o_data.content, o_data.image_url):
+                    return None
+                if bool(o["is_correct"]) != bool(o_data.is_correct):
+                    changes["is_correct"][o["id"]] = bool(o_data.is_correct)
+        return changes
+
+    @staticmethod
+    def _apply_answer_key_changes(changes: dict):
+        """Write points / is_correct only, one update per distinct value (positions and sort keys stay as they are)"""
+        client = QuizService.supabase_client()
+        for table, column in (("quiz_questions", "points"), ("quiz_options", "is_correct")):
+            by_value = {}
+            for row_id, value in changes[column].items():
+                by_value.setdefault(value, []).append(row_id)
+            for value, ids in by_value.items():
+                client.table(table).update({column: value}).in_("id", ids).execute()
+
     @staticmethod
     def submit_attempt(quiz_id: str, user_id: str, attempt_data: any) -> dict:
         quiz = QuizService.get_quiz_by_id(quiz_id)
@@ -199,27 +254,7 @@ class QuizService:
         total_points = sum(q.get("points", 1) for q in quiz["questions"])
         earned_score = 0
         
-        client = QuizService.supabase_client()
-        
-        # Create attempt record
-        attempt_payload = {
-            "quiz_id": str(quiz_id),
-            "user_id": user_id,
-            "score": 0,
-            "max_score": total_points,
-            "percent": 0,
-            "passed": False,
-            "started_at": datetime.utcnow().isoformat(),
-            "submitted_at": datetime.utcnow().isoformat()
-        }
-        att_result = client.table("quiz_attempts").insert(attempt_payload).execute()
-        if not att_result.data:
-            raise HTTPException(status_code=500, detail="Failed to create attempt")
-        
-        attempt_id = att_result.data[0]["id"]
-        answers_payload = []
         graded_answers = []
-
         for ans in attempt_data.answers:
             q_id = str(ans.question_id)
             if q_id not in questions_map: continue
@@ -231,62 +266,180 @@ class QuizService:
             points = q.get("points", 1) if is_correct else 0
             earned_score += points
             
-            ans_record = {
-                "attempt_id": attempt_id,
+            graded_answers.append({
                 "question_id": q_id,
                 "selected_option_id": str(ans.selected_option_id),
                 "is_correct": is_correct,
                 "earned_points": points
-            }
-            answers_payload.append(ans_record)
-            graded_answers.append(ans_record)
+            })
 
-        if answers_payload:
-            client.table("quiz_attempt_answers").insert(answers_payload).execute()
-
-        # Update attempt score
         percent = int((earned_score / total_points * 100)) if total_points > 0 else 0
-        final_update = {
+        now = datetime.utcnow().isoformat()
+        attempt_payload = {
+            "quiz_id": str(quiz_id),
+            "user_id": user_id,
             "score": earned_score,
+            "max_score": total_points,
             "percent": percent,
-            "passed": percent >= quiz.get("passing_score_percent", 70)
+            "passed": percent >= quiz.get("passing_score_percent", 70),
+            "started_at": now,
+            "submitted_at": now
         }
-        client.table("quiz_attempts").update(final_update).eq("id", attempt_id).execute()
+
+        # Compact storage: the answers travel on the attempt row, one insert per submission
+        compact = None
+        if settings.quiz_answer_storage == "compact":
+            layout = attempt_answers.build_layout(quiz)
+            compact = attempt_answers.encode(layout, graded_answers)
+            if compact:
+                QuizService._save_layout(layout)
+                attempt_payload.update(compact)
+
+        client = QuizService.supabase_client()
+        att_result = client.table("quiz_attempts").insert(attempt_payload).execute()
+        if not att_result.data:
+            raise HTTPException(status_code=500, detail="Failed to create attempt")
         
+        attempt_id = att_result.data[0]["id"]
+        for ans in graded_answers:
+            ans["attempt_id"] = attempt_id
+
+        if graded_answers and not compact:
+            # submitted_at is the partition key: answers land in their attempt's month
+            client.table("quiz_attempt_answers").insert(
+                [{**ans, "submitted_at": attempt_payload["submitted_at"]} for ans in graded_answers]
+            ).execute()
+
         # Return summary
         return {
             "id": attempt_id,
             "score": earned_score,
             "max_score": total_points,
             "percent": percent,
-            "passed": final_update["passed"],
+            "passed": attempt_payload["passed"],
             "answers": graded_answers
         }
 
     @staticmethod
-    def get_user_attempts(quiz_id: str, user_id: str) -> List[dict]:
-        result = QuizService.supabase_client().table("quiz_attempts").select("*, answers:quiz_attempt_answers(*)").eq("quiz_id", str(quiz_id)).eq("user_id", user_id).order("submitted_at", desc=True).execute()
-        return result.data
+    def _save_layout(layout: dict):
+        """Store a quiz layout once; every later attempt at the same quiz version reuses it"""
+        if quiz_layout_cache.get(layout["id"]) is not None:
+            return
+        QuizService.supabase_client().table("quiz_answer_layouts").upsert(
+            layout, on_conflict="id", ignore_duplicates=True
+        ).execute()
+        quiz_layout_cache.set(layout["id"], layout)
+
+    @staticmethod
+    def _get_layouts(layout_ids: List[str]) -> dict:
+        layouts = {}
+        missing = []
+        for layout_id in dict.fromkeys(layout_ids):
+            layout = quiz_layout_cache.get(layout_id)
+            if layout is None:
+                missing.append(layout_id)
+            else:
+                layouts[layout_id] = layout
+        if missing:
+            rows = QuizService.supabase_client().table("quiz_answer_layouts").select(
+                "id, quiz_id, question_ids, option_ids, points"
+            ).in_("id", missing).execute().data or []
+            for row in rows:
+                quiz_layout_cache.set(row["id"], row)
+                layouts[row["id"]] = row
+        return layouts
+
+    @staticmethod
+    def _decode_answers(attempts: List[dict]) -> List[dict]:
+        """Rebuild answers for compactly stored attempts; row-stored ones pass through"""
+        layouts = QuizService._get_layouts([a["layout_id"] for a in attempts if a.get("layout_id")])
+        for attempt in attempts:
+            layout_id = attempt.pop("layout_id", None)
+            answer_options = attempt.pop("answer_options", None)
+            correct_bits = attempt.pop("correct_bits", None)
+            if layout_id and layout_id in layouts:
+                attempt["answers"] = attempt_answers.decode(layouts[layout_id], answer_options, correct_bits or "")
+            elif attempt.get("answers") is None:
+                attempt["answers"] = []
+        return attempts
+
+    @staticmethod
+    def _window(query, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        """Bound a quiz_attempts query by submitted_at so only the matching monthly partitions are scanned"""
+        if since:
+            query = query.gte("submitted_at", since.isoformat())
+        if until:
+            query = query.lt("submitted_at", until.isoformat())
+        return query
+
+    @staticmethod
+    def get_user_attempts(quiz_id: str, user_id: str, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None) -> List[dict]:
+        query = QuizService.supabase_client().table("quiz_attempts").select(
+            f"{ATTEMPT_COLUMNS}, layout_id, answer_options, correct_bits, answers:quiz_attempt_answers(*)"
+        ).eq("quiz_id", str(quiz_id)).eq("user_id", user_id)
+        result = QuizService._window(query, since, until).order("submitted_at", desc=True).execute()
+        return QuizService._decode_answers(result.data or [])
+
+    @staticmethod
+    def _user_all_attempts_query(user_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        query = QuizService.supabase_client().table("quiz_attempts").select(f"{ATTEMPT_COLUMNS}, quiz:quizzes(title)").eq("user_id", user_id)
+        return QuizService._window(query, since, until).order("submitted_at", desc=True).order("id")
 
     @staticmethod
-    def get_user_all_attempts(user_id: str) -> List[dict]:
+    def get_user_all_attempts(user_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[dict]:
         """Get all quiz attempts for a user with quiz titles"""
-        result = QuizService.supabase_client().table("quiz_attempts").select("*, quiz:quizzes(title)").eq("user_id", user_id).order("submitted_at", desc=True).execute()
+        result = QuizService._user_all_attempts_query(user_id, since, until).execute()
         return result.data
 
     @staticmethod
-    def get_quiz_analytics(quiz_id: str) -> List[dict]:
+    def iter_user_all_attempts(user_id: str, since: Optional[datetime] = None,
+                               until: Optional[datetime] = None) -> Iterator[List[dict]]:
+        """get_user_all_attempts in pages, for streaming long histories"""
+        return iter_pages(lambda: QuizService._user_all_attempts_query(user_id, since, until), settings.stream_page_size)
+
+    @staticmethod
+    def _quiz_analytics_query(quiz_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        query = QuizService.supabase_client().table("quiz_attempts").select(ATTEMPT_COLUMNS).eq("quiz_id", str(quiz_id))
+        return QuizService._window(query, since, until).order("submitted_at", desc=True).order("id")
+
+    @staticmethod
+    def get_quiz_analytics(quiz_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[dict]:
         """Get all attempts for a quiz (Removed join with user table due to missing table)"""
+        # Return attempts directly as user table is not available for joining
+        attempts_result = QuizService._quiz_analytics_query(quiz_id, since, until).execute()
+        return attempts_result.data or []
+
+    @staticmethod
+    def iter_quiz_analytics(quiz_id: str, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None) -> Iterator[List[dict]]:
+        """get_quiz_analytics in pages, for streaming quizzes with many attempts"""
+        return iter_pages(lambda: QuizService._quiz_analytics_query(quiz_id, since, until), settings.stream_page_size)
+
+    @staticmethod
+    def get_quiz_rollups(quiz_id: str) -> dict:
+        """Monthly attempt and per-question aggregates kept for months past attempt retention"""
         client = QuizService.supabase_client()
-        
-        # Fetch all attempts for the specific quiz
-        attempts_result = client.table("quiz_attempts").select("*").eq("quiz_id", str(quiz_id)).order("submitted_at", desc=True).execute()
-        attempts = attempts_result.data
-        if not attempts:
-            return []
+        months = (
+            client.table("quiz_attempt_rollups")
+            .select("quiz_id, month, attempts, passed, learners, score_total, percent_total")
+            .eq("quiz_id", str(quiz_id)).order("month").execute().data or []
+        )
+        questions = client.table("quiz_question_rollups").select("*").eq("quiz_id", str(quiz_id)).order("month").execute().data or []
+        return {"quiz_id": str(quiz_id), "months": months, "questions": questions}
 
-        # Return attempts directly as user table is not available for joining
-        return attempts
+    @staticmethod
+    def maintain_attempt_partitions(drop_archived: bool = False) -> dict:
+        """Create upcoming monthly partitions, then roll up and detach months past retention"""
+        client = QuizService.supabase_client()
+        created = client.rpc(
+            "ensure_quiz_attempt_partitions", {"months_ahead": settings.quiz_attempt_partitions_ahead}
+        ).execute().data
+        archived = client.rpc(
+            "archive_quiz_attempt_partitions",
+            {"keep_months": settings.quiz_attempt_retention_months, "drop_archived": drop_archived},
+        ).execute().data
+        return {"created_partitions": created or 0, "archived_months": archived or []}
 
     @staticmethod
     def delete_quiz(quiz_id: str) -> bool:
@@ -0,0 +1,357 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+from itertools import repeat
+from operator import itemgetter
+import time
+import numpy as np
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.services import attempt_answers
+from app.services.database_service import iter_pages
+from app.services.quiz_service import QuizService
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+# Option code of a question without a correct option; never equal to a real or unknown (-1) code
+NO_CORRECT_OPTION = -2
+
+
+class AnswerKey:
+    """The current quiz as arrays: points and correct option code per question index"""
+
+    def __init__(self, quiz: dict):
+        questions = quiz.get("questions") or []
+        self.question_index = {str(q["id"]): i for i, q in enumerate(questions)}
+        self.option_code: Dict[str, int] = {}
+        self.points = np.array([q.get("points", 1) for q in questions], dtype=np.int64)
+        self.correct = np.full(len(questions), NO_CORRECT_OPTION, dtype=np.int64)
+        for i, q in enumerate(questions):
+            for option in q.get("options") or []:
+                self.option_code[str(option["id"])] = len(self.option_code)
+            # Same rule as submit_attempt: the first option flagged correct
+            correct = next((o for o in q.get("options") or [] if o["is_correct"]), None)
+            if correct:
+                self.correct[i] = self.option_code[str(correct["id"])]
+        self.max_score = int(self.points.sum())
+        self.passing_score_percent = quiz.get("passing_score_percent", 70)
+
+
+class Gradebook:
+    """
+    Every answer of a quiz's attempts in columnar form (attempt, question,
+    selected option as integer codes), so grading against an AnswerKey is a
+    handful of array operations instead of a Python loop per answer. Row-stored
+    and compact attempts feed the same arrays.
+    """
+
+    def __init__(self, key: AnswerKey):
+        self.key = key
+        self.attempts: List[dict] = []
+        # Row-stored answers: ids for the write-back, graded columns as array chunks per page
+        self._row_ids: List[tuple] = []
+        self._row_columns: Dict[str, List[np.ndarray]] = {
+            name: [] for name in ("attempt", "question", "option", "is_correct", "earned_points")
+        }
+        # layout_id -> (layout, [attempt index], [answer_options], [correct_bits])
+        self._compact: Dict[str, tuple] = {}
+
+    def add_attempts(self, attempts: List[dict], layouts: dict):
+        for attempt in attempts:
+            index = len(self.attempts)
+            self.attempts.append(attempt)
+            layout = layouts.get(attempt.get("layout_id"))
+            if layout is not None:
+                group = self._compact.setdefault(attempt["layout_id"], (layout, [], [], []))
+                group[1].append(index)
+                group[2].append(attempt["answer_options"])
+                group[3].append(attempt.get("correct_bits") or "")
+
+    def row_stored_ids(self) -> List[str]:
+        return [a["id"] for a in self.attempts if not a.get("layout_id")]
+
+    def add_answer_rows(self, rows: List[dict], attempt_index: Dict[str, int]):
+        key, count = self.key, len(rows)
+
+        def column(name, lookup=None):
+            values = map(itemgetter(name), rows)
+            # dict.get over the whole column (unknown ids become -1) keeps the per-row work in C
+            return map(lookup, values, repeat(-1)) if lookup else values
+
+        columns = self._row_columns
+        columns["attempt"].append(np.fromiter(map(attempt_index.__getitem__, column("attempt_id")), dtype=np.int64, count=count))
+        columns["question"].append(np.fromiter(column("question_id", key.question_index.get), dtype=np.int64, count=count))
+        columns["option"].append(np.fromiter(column("selected_option_id", key.option_code.get), dtype=np.int64, count=count))
+        columns["is_correct"].append(np.fromiter(column("is_correct"), dtype=bool, count=count))
+        columns["earned_points"].append(np.fromiter(column("earned_points"), dtype=np.int64, count=count))
+        self._row_ids.extend(zip(column("id"), column("submitted_at")))
+
+    @property
+    def answer_count(self) -> int:
+        compact = sum(int((np.asarray(g[2]) >= 0).sum()) for g in self._compact.values() if g[2])
+        return len(self._row_ids) + compact
+
+    def answer_update(self, result: dict, index: int) -> dict:
+        """apply_quiz_regrade() payload for row-stored answer `index`"""
+        answer_id, submitted_at = self._row_ids[index]
+        return {
+            "id": answer_id,
+            "submitted_at": submitted_at,
+            "is_correct": bool(result["answer_correct"][index]),
+            "earned_points": int(result["answer_earned"][index]),
+        }
+
+    def _compact_columns(self, layout: dict, options: np.ndarray):
+        """Long-format (row, col, question index, option code) for one layout's option-index matrix"""
+        key = self.key
+        question_index = np.array([key.question_index.get(str(q), -1) for q in layout["question_ids"]], dtype=np.int64)
+        width = max((len(o) for o in layout["option_ids"]), default=0) or 1
+        codes = np.full((len(question_index), width), -1, dtype=np.int64)
+        for j, option_ids in enumerate(layout["option_ids"]):
+            codes[j, :len(option_ids)] = [key.option_code.get(str(o), -1) for o in option_ids]
+        rows, cols = np.nonzero(options >= 0)
+        return rows, cols, question_index[cols], codes[cols, options[rows, cols]]
+
+    def _score(self, question_index: np.ndarray, option_code: np.ndarray):
+        """Correctness and points per answer; unknown questions (-1) earn nothing"""
+        known = question_index >= 0
+        if not len(self.key.points):
+            return known, known, np.zeros(len(known), dtype=np.int64)
+        q = np.where(known, question_index, 0)
+        correct = known & (option_code == self.key.correct[q])
+        return known, correct, np.where(correct, self.key.points[q], 0)
+
+    def grade(self) -> dict:
+        """
+        Recompute every attempt in one pass. Returns the per-attempt arrays plus
+        what changed: {"score", "percent", "passed", "matched", "changed",
+        "correct_bits" (new bit strings of changed compact attempts),
+        "layouts" / "layout_ids" (re-pointed layouts when points changed),
+        "answers" (indexes of changed row-stored answers, see answer_update())}.
+        """
+        key = self.key
+        n = len(self.attempts)
+        score = np.zeros(n, dtype=np.float64)
+        matched = np.zeros(n, dtype=np.float64)
+        bits_changed = np.zeros(n, dtype=bool)
+        new_bits: Dict[int, str] = {}
+        new_layouts: Dict[str, dict] = {}
+        new_layout_ids: Dict[int, str] = {}
+
+        # Compact attempts: one option-index matrix per layout
+        for layout, indexes, options, old_bits in self._compact.values():
+            width = len(layout["question_ids"])
+            attempt_ids = np.asarray(indexes, dtype=np.int64)
+            options = np.asarray(options, dtype=np.int64).reshape(len(indexes), width)
+            rows, cols, question_index, option_code = self._compact_columns(layout, options)
+            known, correct, earned = self._score(question_index, option_code)
+            score += np.bincount(attempt_ids[rows], weights=earned, minlength=n)
+            matched += np.bincount(attempt_ids[rows], weights=known, minlength=n)
+
+            bits = np.zeros(options.shape, dtype=np.uint8)
+            bits[rows[correct], cols[correct]] = 1
+            old = np.frombuffer("".join(b.ljust(width, "0")[:width] for b in old_bits).encode(), dtype=np.uint8)
+            differs = ((old.reshape(options.shape) - ord("0")) != bits).any(axis=1) if width else np.zeros(len(indexes), bool)
+            bits_changed[attempt_ids] = differs
+            # Bit strings as fixed-width byte rows, only for attempts whose bits moved
+            text = (bits[differs] + ord("0")).view(f"S{width}").ravel() if width else []
+            for index, value in zip(attempt_ids[differs], text):
+                new_bits[int(index)] = value.decode()
+
+            # decode() takes earned points from the layout, so new points need a new layout
+            layout_question_index = np.array([key.question_index.get(str(q), -1) for q in layout["question_ids"]], dtype=np.int64)
+            points = np.where(layout_question_index >= 0, key.points[np.maximum(layout_question_index, 0)], layout["points"]) \
+                if width else np.zeros(0, dtype=np.int64)
+            if width and (points != np.asarray(layout["points"])).any():
+                points = [int(p) for p in points]
+                replacement = {
+                    **layout,
+                    "id": attempt_answers.layout_id(layout["question_ids"], layout["option_ids"], points),
+                    "points": points,
+                }
+                new_layouts[replacement["id"]] = replacement
+                bits_changed[attempt_ids] = True
+                for index in attempt_ids:
+                    new_layout_ids[int(index)] = replacement["id"]
+
+        # Row-stored answers
+        columns = {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+                   for name, chunks in self._row_columns.items()}
+        row_attempt = columns["attempt"]
+        known, answer_correct, answer_earned = self._score(columns["question"], columns["option"])
+        score += np.bincount(row_attempt, weights=answer_earned, minlength=n)
+        matched += np.bincount(row_attempt, weights=known, minlength=n)
+        # Answers to questions no longer in the quiz keep their stored grade
+        moved = np.flatnonzero(known & (
+            (answer_correct != columns["is_correct"].astype(bool)) | (answer_earned != columns["earned_points"])
+        ))
+
+        score = score.astype(np.int64)
+        matched = matched > 0
+        # Same arithmetic as submit_attempt: int(score / max_score * 100)
+        if key.max_score > 0:
+            percent = (score / key.max_score * 100).astype(np.int64)
+        else:
+            percent = np.zeros(n, dtype=np.int64)
+        passed = percent >= key.passing_score_percent
+
+        old_score = np.fromiter((a["score"] for a in self.attempts), dtype=np.int64, count=n)
+        old_max = np.fromiter((a["max_score"] for a in self.attempts), dtype=np.int64, count=n)
+        old_percent = np.fromiter((a["percent"] for a in self.attempts), dtype=np.int64, count=n)
+        old_passed = np.fromiter((bool(a["passed"]) for a in self.attempts), dtype=bool, count=n)
+        answers_changed = np.zeros(n, dtype=bool)
+        answers_changed[row_attempt[moved]] = True
+        changed = matched & (
+            (score != old_score) | (old_max != key.max_score) | (percent != old_percent)
+            | (passed != old_passed) | bits_changed | answers_changed
+        )
+
+        return {
+            "score": score,
+            "percent": percent,
+            "passed": passed,
+            "matched": matched,
+            "changed": changed,
+            "correct_bits": new_bits,
+            "layouts": new_layouts,
+            "layout_ids": new_layout_ids,
+            "answers": moved,
+            "answer_attempt": row_attempt,
+            "answer_correct": answer_correct,
+            "answer_earned": answer_earned,
+        }
+
+
+class RegradeService:
+    """
+    Regrade every attempt of a quiz after its answer key changed (a fixed
+    is_correct flag, new points or passing score). Runs as the 'quiz.regrade'
+    background job; progress is kept in quiz_regrade_runs.
+    """
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def start(quiz_id: str) -> dict:
+        """Record a queued run and enqueue the job that performs it"""
+        from app.services.job_queue import JobQueue
+
+        run = RegradeService.supabase_client().table("quiz_regrade_runs").insert({"quiz_id": str(quiz_id)}).execute().data[0]
+        JobQueue.enqueue("quiz.regrade", {"quiz_id": str(quiz_id), "run_id": run["id"]})
+        return run
+
+    @staticmethod
+    def get_run(quiz_id: str, run_id: Optional[str] = None) -> dict:
+        query = RegradeService.supabase_client().table("quiz_regrade_runs").select("*").eq("quiz_id", str(quiz_id))
+        if run_id:
+            query = query.eq("id", str(run_id))
+        rows = query.order("created_at", desc=True).limit(1).execute().data
+        if not rows:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Regrade run not found")
+        return rows[0]
+
+    @staticmethod
+    def _progress(run_id: Optional[str], **fields):
+        if run_id:
+            RegradeService.supabase_client().table("quiz_regrade_runs").update(fields).eq("id", run_id).execute()
+
+    @staticmethod
+    def load(quiz_id: str, key: AnswerKey) -> Gradebook:
+        """Read every attempt of the quiz (and the answer rows of row-stored ones) into a Gradebook"""
+        client = RegradeService.supabase_client()
+        book = Gradebook(key)
+        pages = iter_pages(
+            lambda: client.table("quiz_attempts")
+            .select("id, submitted_at, score, max_score, percent, passed, layout_id, answer_options, correct_bits")
+            .eq("quiz_id", str(quiz_id))
+            .order("submitted_at")
+            .order("id"),
+            settings.regrade_page_size,
+        )
+        for page in pages:
+            layouts = QuizService._get_layouts([a["layout_id"] for a in page if a.get("layout_id")])
+            book.add_attempts(page, layouts)
+
+        attempt_index = {a["id"]: i for i, a in enumerate(book.attempts)}
+        row_stored = book.row_stored_ids()
+        # Small id chunks keep the in.(...) filter well inside URL limits
+        for start in range(0, len(row_stored), 100):
+            chunk = row_stored[start:start + 100]
+            for page in iter_pages(
+                lambda: client.table("quiz_attempt_answers")
+                .select("id, attempt_id, submitted_at, question_id, selected_option_id, is_correct, earned_points")
+                .in_("attempt_id", chunk)
+                .order("id"),
+                settings.regrade_page_size,
+            ):
+                book.add_answer_rows(page, attempt_index)
+        return book
+
+    @staticmethod
+    def run(quiz_id: str, run_id: Optional[str] = None) -> dict:
+        """Load, grade in one vectorized pass, and write back changed attempts in batches"""
+        timings = {}
+        started = time.perf_counter()
+        RegradeService._progress(run_id, status="loading", started_at=datetime.utcnow().isoformat())
+        try:
+            quiz = QuizService.get_quiz_by_id(quiz_id)
+            if not quiz:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+            key = AnswerKey(quiz)
+            book = RegradeService.load(quiz_id, key)
+            timings["load"] = round(time.perf_counter() - started, 3)
+
+            RegradeService._progress(run_id, status="grading", total_attempts=len(book.attempts), total_answers=book.answer_count)
+            mark = time.perf_counter()
+            result = book.grade()
+            timings["grade"] = round(time.perf_counter() - mark, 3)
+
+            changed = np.flatnonzero(result["changed"])
+            changed_answers = result["answers"]
+            changed_answer_attempt = result["answer_attempt"][changed_answers]
+            report = {
+                "total_attempts": len(book.attempts),
+                "total_answers": book.answer_count,
+                "unmatched_attempts": int((~result["matched"]).sum()),
+                "changed_attempts": len(changed),
+                "changed_answers": len(result["answers"]),
+            }
+            RegradeService._progress(run_id, status="writing", written_attempts=0, **report)
+
+            mark = time.perf_counter()
+            for layout in result["layouts"].values():
+                QuizService._save_layout(layout)
+            client = RegradeService.supabase_client()
+            written = 0
+            for start in range(0, len(changed), settings.regrade_batch_size):
+                batch = changed[start:start + settings.regrade_batch_size]
+                attempts = [
+                    {
+                        "id": book.attempts[i]["id"],
+                        "submitted_at": book.attempts[i]["submitted_at"],
+                        "score": int(result["score"][i]),
+                        "max_score": key.max_score,
+                        "percent": int(result["percent"][i]),
+                        "passed": bool(result["passed"][i]),
+                        "correct_bits": result["correct_bits"].get(int(i)),
+                        "layout_id": result["layout_ids"].get(int(i)),
+                    }
+                    for i in batch
+                ]
+                answers = [
+                    book.answer_update(result, i)
+                    for i in changed_answers[np.isin(changed_answer_attempt, batch)]
+                ]
+                client.rpc("apply_quiz_regrade", {"attempts": attempts, "answers": answers}).execute()
+                written += len(batch)
+                RegradeService._progress(run_id, written_attempts=written)
+            timings["write"] = round(time.perf_counter() - mark, 3)
+
+            RegradeService._progress(run_id, status="done", timings=timings, finished_at=datetime.utcnow().isoformat())
+            print(f"Regraded quiz {quiz_id}: {report}")
+            return {**report, "written_attempts": written, "timings": timings}
+        except Exception as e:
+            RegradeService._progress(run_id, status="failed", error=str(e)[:2000], finished_at=datetime.utcnow().isoformat())
+            raise
@@ -0,0 +1,269 @@
+from typing import List, Optional, Tuple
+from collections import defaultdict
+import math
+import re
+import threading
+from app.config import get_settings
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+SEARCH_KINDS = ["course", "chapter", "lesson"]
+
+# Same A/B/C/D weighting as the Postgres tsvector columns (ts_rank defaults)
+FIELD_WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+TOKEN_RE = re.compile(r"\w+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "what", "with",
+}
+
+
+def _normalize(token: str) -> str:
+    token = token.lower()
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+
+def _terms(text: str) -> List[str]:
+    return [_normalize(t) for t in TOKEN_RE.findall(text or "") if t.lower() not in STOP_WORDS]
+
+
+def _headline(text: str, terms: set, max_words: int = 30) -> str:
+    """Short fragment around the first match with matched words wrapped in <b></b>"""
+    words = (text or "").split()
+    matched = [_normalize(w.strip(".,;:!?()[]\"'")) in terms for w in words]
+    start = max(0, (matched.index(True) if True in matched else 0) - max_words // 3)
+    return " ".join(
+        f"<b>{w}</b>" if hit else w
+        for w, hit in zip(words[start:start + max_words], matched[start:start + max_words])
+    )
+
+
+class InMemorySearchIndex:
+    """Inverted index with the same query/result shape as the search_content() SQL function"""
+
+    def __init__(self):
+        self._docs = {}
+        self._postings = defaultdict(dict)  # term -> {(kind, id): weighted term frequency}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def add(self, kind: str, doc_id: str, course_id: str, chapter_id: Optional[str],
+            title: str, slug: str, fields: dict, body: str = ""):
+        key = (kind, str(doc_id))
+        with self._lock:
+            self._remove_key(key)
+            scores = defaultdict(float)
+            for weight, text in fields.items():
+                for term in _terms(text):
+                    scores[term] += FIELD_WEIGHTS[weight]
+            for term, score in scores.items():
+                self._postings[term][key] = score
+            self._docs[key] = {
+                "kind": kind,
+                "id": str(doc_id),
+                "course_id": str(course_id),
+                "chapter_id": str(chapter_id) if chapter_id else None,
+                "title": title or "",
+                "slug": slug or "",
+                "body": body or "",
+                "terms": list(scores),
+            }
+
+    def remove(self, kind: str, doc_id: str):
+        """Remove a document and, like ON DELETE CASCADE, everything below it"""
+        doc_id = str(doc_id)
+        with self._lock:
+            keys = [(kind, doc_id)]
+            if kind == "course":
+                keys += [k for k, d in self._docs.items() if d["course_id"] == doc_id and k[0] != "course"]
+            elif kind == "chapter":
+                keys += [k for k, d in self._docs.items() if d["chapter_id"] == doc_id and k[0] == "lesson"]
+            for key in keys:
+                self._remove_key(key)
+
+    def get(self, kind: str, doc_id: str) -> Optional[dict]:
+        return self._docs.get((kind, str(doc_id)))
+
+    def search(self, query: str, kinds: List[str], skip: int, limit: int) -> Tuple[int, List[dict]]:
+        terms = _terms(query)
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            candidates = set.intersection(*(set(p) for p in postings)) if postings else set()
+            total_docs = max(len(self._docs), 1)
+            hits = []
+            for key in candidates:
+                if key[0] not in kinds:
+                    continue
+                rank = sum(p[key] * math.log(1 + total_docs / len(p)) for p in postings)
+                hits.append((rank, key))
+            hits.sort(key=lambda h: (-h[0], self._docs[h[1]]["title"]))
+
+            term_set = set(terms)
+            results = []
+            for rank, key in hits[skip:skip + limit]:
+                doc = self._docs[key]
+                results.append({
+                    "kind": doc["kind"],
+                    "id": doc["id"],
+                    "course_id": doc["course_id"],
+                    "chapter_id": doc["chapter_id"],
+                    "title": doc["title"],
+                    "slug": doc["slug"],
+                    "rank": round(rank, 6),
+                    "headline": _headline(f"{doc['title']} {doc['body']}", term_set),
+                })
+            return len(hits), results
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self.loaded = False
+
+    def _remove_key(self, key):
+        doc = self._docs.pop(key, None)
+        if not doc:
+            return
+        for term in doc["terms"]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[term]
+
+
+search_index = InMemorySearchIndex()
+
+
+class SearchService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def use_memory_index() -> bool:
+        return settings.search_backend == "memory"
+
+    @staticmethod
+    def search(query: str, kinds: List[str], skip: int = 0, limit: int = 20) -> dict:
+        if SearchService.use_memory_index():
+            SearchService._ensure_loaded()
+            total, results = search_index.search(query, kinds, skip, limit)
+        else:
+            rows = SearchService._search_content(query, kinds, skip, limit)
+            if not rows and skip > 0:
+                # Past the last page: the rows carry total_count, so fetch the first one for it
+                first = SearchService._search_content(query, kinds, 0, 1)
+                total = first[0]["total_count"] if first else 0
+            else:
+                total = rows[0]["total_count"] if rows else 0
+            results = rows
+
+        return {"query": query, "total": total, "skip": skip, "limit": limit, "results": results}
+
+    @staticmethod
+    def _search_content(query: str, kinds: List[str], skip: int, limit: int) -> List[dict]:
+        return SearchService.supabase_client().rpc("search_content", {
+            "search_query": query,
+            "result_limit": limit,
+            "result_offset": skip,
+            "kinds": kinds,
+        }).execute().data or []
+
+    # --- Incremental maintenance ---
+    # Postgres keeps its generated tsvector columns current on every write, so
+    # these only touch the in-process index (and only once it has been built).
+
+    @staticmethod
+    def index_course(course: dict):
+        if not SearchService.use_memory_index() or not search_index.loaded:
+            return
+        search_index.add(
+            "course", course["id"], course["id"], None, course.get("title"), course.get("slug"),
+            {"A": course.get("title"), "B": course.get("small_description"), "C": course.get("description")},
+            body=course.get("description") or course.get("small_description") or "",
+        )
+
+    @staticmethod
+    def index_chapter(chapter: dict):
+        if not SearchService.use_memory_index() or not search_index.loaded:
+            return
+        search_index.add(
+            "chapter", chapter["id"], chapter["course_id"], chapter["id"],
+            chapter.get("title"), chapter.get("slug"), {"A": chapter.get("title")},
+        )
+
+    @staticmethod
+    def index_outline(course: dict) -> dict:
+        """Index a course with its nested chapters and lessons"""
+        SearchService.index_course(course)
+        for chapter in course.get("chapters") or []:
+            SearchService.index_chapter(chapter)
+            for lesson in chapter.get("lessons") or []:
+                SearchService.index_lesson(lesson)
+        return course
+
+    @staticmethod
+    def index_lesson(lesson: dict):
+        if not SearchService.use_memory_index() or not search_index.loaded:
+            return
+        existing = search_index.get("lesson", lesson["id"]) or {}
+        chapter = search_index.get("chapter", lesson.get("chapter_id")) or {}
+        course_id = chapter.get("course_id") or existing.get("course_id")
+        if not course_id:
+            return
+        content_text = lesson["content_text"] if "content_text" in lesson else existing.get("body", "")
+        search_index.add(
+            "lesson", lesson["id"], course_id, lesson.get("chapter_id") or existing.get("chapter_id"),
+            lesson.get("title") or existing.get("title"), lesson.get("slug") or existing.get("slug"),
+            {"A": lesson.get("title") or existing.get("title"), "B": lesson.get("label"), "D": content_text},
+            body=content_text,
+        )
+
+    @staticmethod
+    def remove(kind: str, doc_id: str):
+        if SearchService.use_memory_index() and search_index.loaded:
+            search_index.remove(kind, str(doc_id))
+
+    @staticmethod
+    def _ensure_loaded(page_size: int = 1000):
+        """Build the in-process index from the database on first use"""
+        if search_index.loaded:
+            return
+        client = SearchService.supabase_client()
+
+        def fetch_all(table: str, columns: str) -> List[dict]:
+            rows, start = [], 0
+            while True:
+                page = client.table(table).select(columns).range(start, start + page_size - 1).execute().data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+                start += page_size
+
+        # Fetch everything before touching the index: a failed page leaves it unloaded
+        # (retried on the next search) rather than half-built and marked complete
+        courses = fetch_all("courses", "id, title, slug, description, small_description")
+        chapters = fetch_all("chapters", "id, course_id, title, slug")
+        lessons = fetch_all("lessons", "id, chapter_id, title, slug, label, content_text")
+
+        search_index.clear()
+        try:
+            # index_* only write to a loaded index
+            search_index.loaded = True
+            for course in courses:
+                SearchService.index_course(course)
+            for chapter in chapters:
+                SearchService.index_chapter(chapter)
+            for lesson in lessons:
+                SearchService.index_lesson(lesson)
+        except Exception:
+            search_index.clear()
+            raise
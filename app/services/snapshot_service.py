@@ -0,0 +1,121 @@
+from typing import List, Optional
+import hashlib
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from app.config import get_settings
+from app.schemas import CourseWithChapters
+from app.schemas.quiz import QuizUser
+from app.services.cache_service import TTLCache
+from app.services.ordering_service import OrderingService
+from app.services.quiz_service import QuizService
+from app.services.storage_service import storage_service
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+SNAPSHOT_BUCKET = "course-snapshots"
+SNAPSHOT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# "slug:<slug>" / "id:<course_id>" -> published snapshot pointer (or None)
+snapshot_pointer_cache = TTLCache(maxsize=4096, ttl=settings.snapshot_pointer_ttl_seconds)
+# snapshot path -> JSON bytes; paths are content-hashed so entries never go stale
+snapshot_body_cache = TTLCache(maxsize=256, ttl=3600)
+
+_quiz_list = TypeAdapter(List[QuizUser])
+
+
+class SnapshotService:
+    """
+    Published course trees rendered once per publish into content-hashed JSON
+    objects, so public reads are served from storage instead of the database.
+    """
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def _store(course_id: str, part: str, body: bytes) -> dict:
+        digest = hashlib.sha256(body).hexdigest()
+        path = f"courses/{course_id}/{part}-{digest}.json"
+        if storage_service.head_sync(SNAPSHOT_BUCKET, path) is None:
+            storage_service.put_sync(
+                SNAPSHOT_BUCKET, path, body, content_type="application/json", cache_control=SNAPSHOT_CACHE_CONTROL,
+            )
+        return {"path": path, "etag": digest, "size": len(body)}
+
+    @staticmethod
+    def build(course: dict, published_at: str, version: str) -> Optional[dict]:
+        """
+        Render a course outline (as CourseWithChapters) and its published
+        quizzes (as QuizUser, without answers) and point the course at them.
+        The pointer is only written while the course's publish_version is still
+        version, so a slower build for an older publish never overwrites a newer
+        pointer; it returns None instead.
+        """
+        course_id = course["id"]
+        for chapter in OrderingService.sort(course.get("chapters")):
+            OrderingService.sort(chapter.get("lessons"))
+            for lesson in chapter.get("lessons") or []:
+                lesson["fileKey"] = lesson.get("mdx_path")
+        quizzes = [QuizService._sort_questions(q) for q in QuizService.get_quizzes_by_course(course_id, published_only=True)]
+
+        pointer = {
+            "published_at": published_at,
+            "version": version,
+            "course": SnapshotService._store(
+                course_id, "course", CourseWithChapters.model_validate(course).model_dump_json().encode()
+            ),
+            "quizzes": SnapshotService._store(
+                course_id, "quizzes", _quiz_list.dump_json(_quiz_list.validate_python(quizzes))
+            ),
+        }
+        result = (
+            SnapshotService.supabase_client().table("courses")
+            .update({"snapshot": pointer})
+            .eq("id", str(course_id))
+            .eq("publish_version", str(version))
+            .execute()
+        )
+        if not result.data:
+            print(f"Snapshot of course {course_id} for publish {version} superseded, pointer left as is")
+            return None
+        SnapshotService.invalidate(course_id, course.get("slug"))
+        return pointer
+
+    @staticmethod
+    def get_pointer(course_id: Optional[str] = None, slug: Optional[str] = None) -> dict:
+        """Snapshot pointer of a published course, from cache when warm"""
+        key = f"id:{course_id}" if course_id else f"slug:{slug}"
+        sentinel = object()
+        pointer = snapshot_pointer_cache.get(key, sentinel)
+        if pointer is sentinel:
+            query = SnapshotService.supabase_client().table("courses").select("id, slug, status, snapshot")
+            query = query.eq("id", str(course_id)) if course_id else query.eq("slug", slug)
+            result = query.limit(1).execute()
+            row = result.data[0] if result.data else None
+            pointer = row["snapshot"] if row and row.get("status") == "Published" and row.get("snapshot") else None
+            snapshot_pointer_cache.set(key, pointer)
+
+        if not pointer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No published snapshot for this course",
+            )
+        return pointer
+
+    @staticmethod
+    def read(path: str) -> bytes:
+        return snapshot_body_cache.get_or_set(path, lambda: storage_service.get_sync(SNAPSHOT_BUCKET, path))
+
+    @staticmethod
+    def public_url(path: str) -> str:
+        return storage_service.public_url(SNAPSHOT_BUCKET, path)
+
+    @staticmethod
+    def invalidate(course_id: Optional[str] = None, slug: Optional[str] = None):
+        """Forget cached pointers after a course is republished, unpublished, renamed or deleted"""
+        if course_id:
+            snapshot_pointer_cache.delete(f"id:{course_id}")
+        if slug:
+            snapshot_pointer_cache.delete(f"slug:{slug}")
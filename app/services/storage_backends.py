@@ -0,0 +1,643 @@
+from typing import AsyncIterable, AsyncIterator, List, Optional, Union
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qs, quote, urlparse
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import threading
+import weakref
+
+DELETE_BATCH_SIZE = 1000  # S3 DeleteObjects and Supabase remove both cap at 1000 keys
+LIST_PAGE_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 parts must be >= 5MB (except the last)
+
+Body = Union[bytes, AsyncIterable[bytes]]
+
+
+class StorageObjectNotFound(Exception):
+    def __init__(self, bucket: str, path: str):
+        super().__init__(f"Object '{path}' not found in bucket '{bucket}'")
+        self.bucket = bucket
+        self.path = path
+
+
+def _normalize_path(path: str) -> str:
+    """Reject absolute paths and parent references so keys can't escape their bucket"""
+    normalized = posixpath.normpath(path.lstrip("/"))
+    if normalized in ("", ".") or normalized.startswith("..") or "/../" in f"/{normalized}/":
+        raise ValueError(f"Invalid object path '{path}'")
+    return normalized
+
+
+def _range_header(offset: int, length: Optional[int]) -> Optional[str]:
+    if not offset and length is None:
+        return None
+    if length is None:
+        return f"bytes={offset}-"
+    return f"bytes={offset}-{offset + length - 1}"
+
+
+def _etag(value: Optional[str]) -> Optional[str]:
+    return value.strip('"') if value else value
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return parsedate_to_datetime(str(value))
+
+
+async def _chunks(body: Body) -> AsyncIterator[bytes]:
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        yield bytes(body)
+        return
+    async for chunk in body:
+        if chunk:
+            yield chunk
+
+
+class StorageBackend:
+    """
+    Async object storage interface. Every network/disk call holds a slot of a
+    per-backend semaphore, so max_concurrency bounds in-flight requests no
+    matter how many coroutines fan out (batch deletes, copies, bundle fetches).
+
+    Ranges use offset/length; length=None reads to the end of the object.
+    """
+
+    name = "base"
+
+    def __init__(self, max_concurrency: int = 16):
+        self.max_concurrency = max_concurrency
+        # asyncio primitives are bound to the loop that first uses them
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def put(self, bucket: str, path: str, body: Body, content_type: Optional[str] = None,
+                  cache_control: Optional[str] = None) -> dict:
+        """Create or replace an object; body may be bytes or an async iterator of chunks"""
+        raise NotImplementedError
+
+    async def get(self, bucket: str, path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        parts = [chunk async for chunk in self.stream(bucket, path, offset, length)]
+        return b"".join(parts)
+
+    def stream(self, bucket: str, path: str, offset: int = 0, length: Optional[int] = None,
+               chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def head(self, bucket: str, path: str) -> Optional[dict]:
+        """{"path", "size", "etag", "content_type", "cache_control", "last_modified"} or None"""
+        raise NotImplementedError
+
+    async def delete_many(self, bucket: str, paths: List[str]) -> int:
+        unique = list(dict.fromkeys(p for p in paths if p))
+        batches = [unique[i:i + DELETE_BATCH_SIZE] for i in range(0, len(unique), DELETE_BATCH_SIZE)]
+        deleted = await asyncio.gather(*(self._delete_batch(bucket, batch) for batch in batches))
+        return sum(deleted)
+
+    async def _delete_batch(self, bucket: str, paths: List[str]) -> int:
+        raise NotImplementedError
+
+    def list_pages(self, bucket: str, prefix: str = "") -> AsyncIterator[List[dict]]:
+        """Pages of {"key", "size", "last_modified"} for every object under prefix (recursive)"""
+        raise NotImplementedError
+
+    async def list(self, bucket: str, prefix: str = "") -> AsyncIterator[dict]:
+        async for page in self.list_pages(bucket, prefix):
+            for item in page:
+                yield item
+
+    async def copy(self, bucket: str, source: str, destination: str) -> None:
+        """Server-side copy within a bucket"""
+        raise NotImplementedError
+
+    def public_url(self, bucket: str, path: str) -> str:
+        raise NotImplementedError
+
+    async def signed_url(self, bucket: str, path: str, expires_in: int) -> str:
+        raise NotImplementedError
+
+    async def signed_upload_url(self, bucket: str, path: str, content_type: Optional[str] = None,
+                                expires_in: int = 7200) -> dict:
+        """{"url", "token"} for a direct client upload"""
+        raise NotImplementedError(f"{self.name} storage does not support direct uploads")
+
+    async def aclose(self):
+        pass
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """Supabase Storage over its REST API with a pooled async HTTP client"""
+
+    name = "supabase"
+
+    def __init__(self, url: str, key: str, max_concurrency: int = 16, timeout: float = 60):
+        super().__init__(max_concurrency)
+        self.base_url = f"{url.rstrip('/')}/storage/v1"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self.timeout = timeout
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+            )
+        return client
+
+    @staticmethod
+    def _object_url(bucket: str, path: str) -> str:
+        return f"/object/{bucket}/{quote(_normalize_path(path))}"
+
+    @staticmethod
+    def _raise_for_status(response, bucket: str, path: str):
+        # Storage reports missing objects as 400 with statusCode 404 in the body
+        if response.status_code == 404 or (response.status_code == 400 and b"not_found" in response.content.lower()):
+            raise StorageObjectNotFound(bucket, path)
+        response.raise_for_status()
+
+    async def put(self, bucket, path, body, content_type=None, cache_control=None):
+        headers = {"x-upsert": "true", "content-type": content_type or "application/octet-stream"}
+        max_age = re.search(r"max-age=(\d+)", cache_control or "")
+        if max_age:
+            # Storage takes seconds here and serves "max-age=<seconds>" itself
+            headers["cache-control"] = max_age.group(1)
+        content = bytes(body) if isinstance(body, (bytes, bytearray, memoryview)) else _chunks(body)
+        async with self.limit():
+            response = await self._client().post(self._object_url(bucket, path), content=content, headers=headers)
+        self._raise_for_status(response, bucket, path)
+        return await self.head(bucket, path)
+
+    async def stream(self, bucket, path, offset=0, length=None, chunk_size=CHUNK_SIZE):
+        headers = {}
+        range_header = _range_header(offset, length)
+        if range_header:
+            headers["range"] = range_header
+        async with self.limit():
+            async with self._client().stream("GET", self._object_url(bucket, path), headers=headers) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._raise_for_status(response, bucket, path)
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+
+    async def head(self, bucket, path):
+        async with self.limit():
+            response = await self._client().head(self._object_url(bucket, path))
+        if response.status_code in (400, 404):
+            return None
+        response.raise_for_status()
+        return {
+            "path": path,
+            "size": int(response.headers.get("content-length") or 0),
+            "etag": _etag(response.headers.get("etag")),
+            "content_type": response.headers.get("content-type"),
+            "cache_control": response.headers.get("cache-control"),
+            "last_modified": _timestamp(response.headers.get("last-modified")),
+        }
+
+    async def _delete_batch(self, bucket, paths):
+        async with self.limit():
+            response = await self._client().request("DELETE", f"/object/{bucket}", json={"prefixes": paths})
+        response.raise_for_status()
+        return len(response.json() or [])
+
+    async def list_pages(self, bucket, prefix=""):
+        # The list endpoint is per folder: walk folders (entries without an id)
+        folders = [prefix.rstrip("/")]
+        while folders:
+            folder = folders.pop()
+            offset = 0
+            while True:
+                async with self.limit():
+                    response = await self._client().post(f"/object/list/{bucket}", json={
+                        "prefix": folder,
+                        "limit": LIST_PAGE_SIZE,
+                        "offset": offset,
+                        "sortBy": {"column": "name", "order": "asc"},
+                    })
+                response.raise_for_status()
+                items = response.json() or []
+                page = []
+                for item in items:
+                    key = f"{folder}/{item['name']}" if folder else item["name"]
+                    if item.get("id") is None:
+                        folders.append(key)
+                        continue
+                    metadata = item.get("metadata") or {}
+                    page.append({
+                        "key": key,
+                        "size": int(metadata.get("size") or 0),
+                        "content_type": metadata.get("mimetype"),
+                        "etag": _etag(metadata.get("eTag")),
+                        "last_modified": _timestamp(item.get("updated_at") or item.get("created_at")),
+                    })
+                if page:
+                    yield page
+                if len(items) < LIST_PAGE_SIZE:
+                    break
+                offset += LIST_PAGE_SIZE
+
+    async def copy(self, bucket, source, destination):
+        async with self.limit():
+            response = await self._client().post("/object/copy", json={
+                "bucketId": bucket,
+                "sourceKey": _normalize_path(source),
+                "destinationKey": _normalize_path(destination),
+            })
+        self._raise_for_status(response, bucket, source)
+
+    def public_url(self, bucket, path):
+        return f"{self.base_url}/object/public/{bucket}/{quote(_normalize_path(path))}"
+
+    async def signed_url(self, bucket, path, expires_in):
+        async with self.limit():
+            response = await self._client().post(
+                f"/object/sign/{bucket}/{quote(_normalize_path(path))}", json={"expiresIn": expires_in},
+            )
+        self._raise_for_status(response, bucket, path)
+        data = response.json()
+        return f"{self.base_url}{data.get('signedURL') or data.get('signedUrl')}"
+
+    async def signed_upload_url(self, bucket, path, content_type=None, expires_in=7200):
+        # Supabase fixes the lifetime of signed upload URLs at two hours
+        async with self.limit():
+            response = await self._client().post(f"/object/upload/sign/{bucket}/{quote(_normalize_path(path))}")
+        response.raise_for_status()
+        url = f"{self.base_url}{response.json()['url']}"
+        return {"url": url, "token": parse_qs(urlparse(url).query).get("token", [""])[0]}
+
+    async def aclose(self):
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3-compatible storage (Cloudflare R2, MinIO, AWS). boto3 is synchronous, so
+    calls run on worker threads; the client is created on first use.
+    """
+
+    name = "s3"
+
+    def __init__(self, endpoint: str = "", access_key_id: str = "", secret_access_key: str = "",
+                 region: str = "auto", max_concurrency: int = 16, client=None):
+        super().__init__(max_concurrency)
+        self.endpoint = endpoint
+        self._credentials = (access_key_id, secret_access_key, region)
+        self._s3 = client
+        self._lock = threading.Lock()
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            with self._lock:
+                if self._s3 is None:
+                    import boto3
+                    from botocore.client import Config
+
+                    access_key_id, secret_access_key, region = self._credentials
+                    self._s3 = boto3.client(
+                        "s3",
+                        endpoint_url=self.endpoint or None,
+                        aws_access_key_id=access_key_id,
+                        aws_secret_access_key=secret_access_key,
+                        config=Config(signature_version="s3v4", max_pool_connections=self.max_concurrency),
+                        region_name=region or "auto",
+                    )
+        return self._s3
+
+    async def _call(self, method: str, **kwargs):
+        async with self.limit():
+            return await asyncio.to_thread(getattr(self.s3, method), **kwargs)
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    async def put(self, bucket, path, body, content_type=None, cache_control=None):
+        key = _normalize_path(path)
+        extra = {"ContentType": content_type or "application/octet-stream"}
+        if cache_control:
+            extra["CacheControl"] = cache_control
+
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            await self._call("put_object", Bucket=bucket, Key=key, Body=bytes(body), **extra)
+            return await self.head(bucket, key)
+
+        # Stream in multipart chunks so large bodies are never held in memory at once
+        buffer, upload_id, parts = bytearray(), None, []
+        try:
+            async for chunk in _chunks(body):
+                buffer.extend(chunk)
+                if len(buffer) < MULTIPART_PART_SIZE:
+                    continue
+                if upload_id is None:
+                    upload = await self._call("create_multipart_upload", Bucket=bucket, Key=key, **extra)
+                    upload_id = upload["UploadId"]
+                part = await self._call("upload_part", Bucket=bucket, Key=key, UploadId=upload_id,
+                                        PartNumber=len(parts) + 1, Body=bytes(buffer))
+                parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+                buffer.clear()
+
+            if upload_id is None:
+                await self._call("put_object", Bucket=bucket, Key=key, Body=bytes(buffer), **extra)
+            else:
+                if buffer:
+                    part = await self._call("upload_part", Bucket=bucket, Key=key, UploadId=upload_id,
+                                            PartNumber=len(parts) + 1, Body=bytes(buffer))
+                    parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+                await self._call("complete_multipart_upload", Bucket=bucket, Key=key, UploadId=upload_id,
+                                 MultipartUpload={"Parts": parts})
+        except BaseException:
+            if upload_id is not None:
+                await self._call("abort_multipart_upload", Bucket=bucket, Key=key, UploadId=upload_id)
+            raise
+        return await self.head(bucket, key)
+
+    async def stream(self, bucket, path, offset=0, length=None, chunk_size=CHUNK_SIZE):
+        from botocore.exceptions import ClientError
+
+        kwargs = {"Bucket": bucket, "Key": _normalize_path(path)}
+        range_header = _range_header(offset, length)
+        if range_header:
+            kwargs["Range"] = range_header
+        async with self.limit():
+            try:
+                response = await asyncio.to_thread(self.s3.get_object, **kwargs)
+            except ClientError as e:
+                if self._is_not_found(e):
+                    raise StorageObjectNotFound(bucket, path)
+                raise
+            stream = response["Body"]
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(stream.read, chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                stream.close()
+
+    async def head(self, bucket, path):
+        from botocore.exceptions import ClientError
+
+        try:
+            response = await self._call("head_object", Bucket=bucket, Key=_normalize_path(path))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return {
+            "path": path,
+            "size": response["ContentLength"],
+            "etag": _etag(response.get("ETag")),
+            "content_type": response.get("ContentType"),
+            "cache_control": response.get("CacheControl"),
+            "last_modified": response.get("LastModified"),
+        }
+
+    async def _delete_batch(self, bucket, paths):
+        response = await self._call(
+            "delete_objects",
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in paths], "Quiet": True},
+        )
+        errors = response.get("Errors") or []
+        if errors:
+            print(f"Error deleting {len(errors)} objects from {bucket}: {errors[0]}")
+        return len(paths) - len(errors)
+
+    async def list_pages(self, bucket, prefix=""):
+        kwargs = {"Bucket": bucket, "Prefix": prefix}
+        while True:
+            response = await self._call("list_objects_v2", **kwargs)
+            page = [
+                {
+                    "key": obj["Key"],
+                    "size": obj["Size"],
+                    "etag": _etag(obj.get("ETag")),
+                    "last_modified": obj["LastModified"],
+                }
+                for obj in response.get("Contents", [])
+            ]
+            if page:
+                yield page
+            if not response.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    async def copy(self, bucket, source, destination):
+        from botocore.exceptions import ClientError
+
+        try:
+            await self._call(
+                "copy_object",
+                Bucket=bucket,
+                Key=_normalize_path(destination),
+                CopySource={"Bucket": bucket, "Key": _normalize_path(source)},
+            )
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise StorageObjectNotFound(bucket, source)
+            raise
+
+    def public_url(self, bucket, path):
+        return f"{self.endpoint.rstrip('/')}/{bucket}/{quote(_normalize_path(path))}"
+
+    async def signed_url(self, bucket, path, expires_in):
+        return self.s3.generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": _normalize_path(path)}, ExpiresIn=expires_in,
+        )
+
+    async def signed_upload_url(self, bucket, path, content_type=None, expires_in=7200):
+        params = {"Bucket": bucket, "Key": _normalize_path(path)}
+        if content_type:
+            params["ContentType"] = content_type
+        url = self.s3.generate_presigned_url("put_object", Params=params, ExpiresIn=expires_in)
+        return {"url": url, "token": ""}
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Filesystem storage for local development, tests and benchmarks.
+    Objects live at <root>/<bucket>/<path>; content type, cache control and
+    ETag are kept in a JSON sidecar under <root>/.meta.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, max_concurrency: int = 16):
+        super().__init__(max_concurrency)
+        self.root = os.path.abspath(root)
+
+    def _file(self, bucket: str, path: str) -> str:
+        return os.path.join(self.root, bucket, *_normalize_path(path).split("/"))
+
+    def _meta_file(self, bucket: str, path: str) -> str:
+        return os.path.join(self.root, ".meta", bucket, *_normalize_path(path).split("/")) + ".json"
+
+    def _read_meta(self, bucket: str, path: str) -> dict:
+        try:
+            with open(self._meta_file(bucket, path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, bucket: str, path: str, meta: dict):
+        meta_file = self._meta_file(bucket, path)
+        os.makedirs(os.path.dirname(meta_file), exist_ok=True)
+        with open(meta_file, "w") as f:
+            json.dump(meta, f)
+
+    def _stat(self, bucket: str, path: str) -> Optional[dict]:
+        try:
+            stat = os.stat(self._file(bucket, path))
+        except FileNotFoundError:
+            return None
+        meta = self._read_meta(bucket, path)
+        if "etag" not in meta:
+            with open(self._file(bucket, path), "rb") as f:
+                meta["etag"] = hashlib.md5(f.read()).hexdigest()
+        return {
+            "path": path,
+            "size": stat.st_size,
+            "etag": meta["etag"],
+            "content_type": meta.get("content_type"),
+            "cache_control": meta.get("cache_control"),
+            "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        }
+
+    async def put(self, bucket, path, body, content_type=None, cache_control=None):
+        target = self._file(bucket, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.part"
+        digest = hashlib.md5()
+        async with self.limit():
+            with open(temp, "wb") as f:
+                try:
+                    async for chunk in _chunks(body):
+                        digest.update(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+                except BaseException:
+                    f.close()
+                    os.remove(temp)
+                    raise
+            os.replace(temp, target)  # Readers never see a partial object
+            await asyncio.to_thread(self._write_meta, bucket, path, {
+                "content_type": content_type or "application/octet-stream",
+                "cache_control": cache_control,
+                "etag": digest.hexdigest(),
+            })
+        return await self.head(bucket, path)
+
+    async def stream(self, bucket, path, offset=0, length=None, chunk_size=CHUNK_SIZE):
+        async with self.limit():
+            try:
+                f = open(self._file(bucket, path), "rb")
+            except FileNotFoundError:
+                raise StorageObjectNotFound(bucket, path)
+            with f:
+                f.seek(offset)
+                remaining = length
+                while remaining is None or remaining > 0:
+                    size = chunk_size if remaining is None else min(chunk_size, remaining)
+                    chunk = await asyncio.to_thread(f.read, size)
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+    async def head(self, bucket, path):
+        async with self.limit():
+            return await asyncio.to_thread(self._stat, bucket, path)
+
+    def _delete_files(self, bucket: str, paths: List[str]) -> int:
+        deleted = 0
+        for path in paths:
+            try:
+                os.remove(self._file(bucket, path))
+                deleted += 1
+            except FileNotFoundError:
+                continue
+            try:
+                os.remove(self._meta_file(bucket, path))
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    async def _delete_batch(self, bucket, paths):
+        async with self.limit():
+            return await asyncio.to_thread(self._delete_files, bucket, paths)
+
+    def _walk(self, bucket: str, prefix: str) -> List[dict]:
+        bucket_root = os.path.join(self.root, bucket)
+        items = []
+        for directory, _, files in os.walk(bucket_root):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                full = os.path.join(directory, name)
+                key = os.path.relpath(full, bucket_root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                stat = os.stat(full)
+                items.append({
+                    "key": key,
+                    "size": stat.st_size,
+                    "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                })
+        return sorted(items, key=lambda item: item["key"])
+
+    async def list_pages(self, bucket, prefix=""):
+        async with self.limit():
+            items = await asyncio.to_thread(self._walk, bucket, prefix)
+        for start in range(0, len(items), LIST_PAGE_SIZE):
+            yield items[start:start + LIST_PAGE_SIZE]
+
+    def _copy_file(self, bucket: str, source: str, destination: str):
+        target = self._file(bucket, destination)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            shutil.copyfile(self._file(bucket, source), target)
+        except FileNotFoundError:
+            raise StorageObjectNotFound(bucket, source)
+        meta = self._read_meta(bucket, source)
+        if meta:
+            self._write_meta(bucket, destination, meta)
+
+    async def copy(self, bucket, source, destination):
+        async with self.limit():
+            await asyncio.to_thread(self._copy_file, bucket, source, destination)
+
+    def public_url(self, bucket, path):
+        return f"file://{quote(self._file(bucket, path))}"
+
+    async def signed_url(self, bucket, path, expires_in):
+        return self.public_url(bucket, path)
@@ -0,0 +1,144 @@
+from typing import Dict, Iterator, List, Optional, Set
+from datetime import datetime, timedelta, timezone
+import re
+import time
+from app.config import get_settings
+from app.supabase_client import get_client
+from app.services.storage_service import parse_storage_url, storage_service
+
+settings = get_settings()
+
+GC_BUCKETS = ["lesson-content", "lesson-images", "quiz-media", "course-snapshots"]
+SAMPLE_SIZE = 20
+
+# Responsive variants of one image live (and die) together under images/<sha256>/
+HASHED_IMAGE_RE = re.compile(r"^(images/[0-9a-f]{64})/")
+
+
+def object_group(key: str) -> str:
+    match = HASHED_IMAGE_RE.match(key)
+    return match.group(1) if match else key
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class StorageBucket:
+    """Listing/deletion view of one logical bucket on whichever backend it is configured for"""
+
+    def __init__(self, name: str, service=None):
+        self.name = name
+        self.service = service or storage_service
+
+    def list_objects(self) -> Iterator[dict]:
+        for page in self.service.iter_pages_sync(self.name):
+            yield from page
+
+    def delete(self, keys: List[str]) -> int:
+        return self.service.delete_many_sync(self.name, keys)
+
+
+class StorageGCService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def load_references() -> dict:
+        """One query for every referenced object, grouped per bucket"""
+        refs = StorageGCService.supabase_client().rpc("storage_references", {}).execute().data or {}
+
+        referenced: Dict[str, Set[str]] = {}
+        for path in refs.get("lesson_content", []):
+            referenced.setdefault("lesson-content", set()).add(object_group(path))
+        for path in refs.get("snapshots", []):
+            referenced.setdefault("course-snapshots", set()).add(path)
+        for url in refs.get("urls", []):
+            parsed = parse_storage_url(url)
+            if parsed:
+                referenced.setdefault(parsed[0], set()).add(object_group(parsed[1]))
+        for key in refs.get("keys", []):
+            referenced.setdefault(settings.r2_bucket_name, set()).add(object_group(key))
+
+        return {"referenced": referenced, "unanalyzed_lessons": refs.get("unanalyzed_lessons", 0)}
+
+    @staticmethod
+    def collect(bucket, referenced: Set[str], dry_run: bool = True,
+                min_age_seconds: Optional[int] = None, now: Optional[datetime] = None) -> dict:
+        """Diff a bucket listing against the referenced set and (unless dry_run) delete orphans"""
+        if min_age_seconds is None:
+            min_age_seconds = settings.storage_gc_min_age_hours * 3600
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=min_age_seconds)
+
+        report = {
+            "bucket": bucket.name,
+            "dry_run": dry_run,
+            "scanned": 0,
+            "referenced": 0,
+            "skipped_recent": 0,
+            "orphaned": 0,
+            "orphaned_bytes": 0,
+            "deleted": 0,
+            "sample": [],
+        }
+
+        started = time.perf_counter()
+        orphans = []
+        for obj in bucket.list_objects():
+            report["scanned"] += 1
+            if object_group(obj["key"]) in referenced:
+                report["referenced"] += 1
+                continue
+            modified = _parse_timestamp(obj.get("last_modified"))
+            if modified is not None and modified > cutoff:
+                report["skipped_recent"] += 1
+                continue
+            orphans.append(obj["key"])
+            report["orphaned_bytes"] += obj.get("size") or 0
+            if len(report["sample"]) < SAMPLE_SIZE:
+                report["sample"].append(obj["key"])
+        list_seconds = time.perf_counter() - started
+        report["orphaned"] = len(orphans)
+
+        delete_seconds = 0.0
+        if orphans and not dry_run:
+            started = time.perf_counter()
+            report["deleted"] = bucket.delete(orphans)
+            delete_seconds = time.perf_counter() - started
+
+        report["list_seconds"] = round(list_seconds, 3)
+        report["delete_seconds"] = round(delete_seconds, 3)
+        report["listed_per_second"] = round(report["scanned"] / list_seconds) if list_seconds else None
+        report["deleted_per_second"] = round(report["deleted"] / delete_seconds) if delete_seconds else None
+        return report
+
+    @staticmethod
+    def run(buckets: Optional[List[str]] = None, dry_run: bool = True, include_r2: bool = False) -> dict:
+        refs = StorageGCService.load_references()
+        targets = [StorageBucket(name) for name in (buckets or GC_BUCKETS)]
+        if include_r2 and settings.r2_bucket_name:
+            targets.append(StorageBucket(settings.r2_bucket_name))
+
+        reports = []
+        for bucket in targets:
+            if bucket.name == "lesson-images" and refs["unanalyzed_lessons"] and not dry_run:
+                # Their MDX image references are unknown, so nothing here is provably orphaned
+                reports.append({
+                    "bucket": bucket.name,
+                    "skipped": f"{refs['unanalyzed_lessons']} lessons have MDX that was never analysed",
+                })
+                continue
+            reports.append(StorageGCService.collect(bucket, refs["referenced"].get(bucket.name, set()), dry_run))
+
+        return {
+            "dry_run": dry_run,
+            "orphaned": sum(r.get("orphaned", 0) for r in reports),
+            "orphaned_bytes": sum(r.get("orphaned_bytes", 0) for r in reports),
+            "deleted": sum(r.get("deleted", 0) for r in reports),
+            "buckets": reports,
+        }
@@ -0,0 +1,207 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+import asyncio
+import re
+import threading
+from app.config import get_settings
+from app.services.storage_backends import (
+    LocalStorageBackend,
+    S3StorageBackend,
+    StorageBackend,
+    SupabaseStorageBackend,
+)
+
+settings = get_settings()
+
+STORAGE_URL_RE = re.compile(r"/storage/v1/object/(?:public|sign|authenticated)/([^/]+)/(.+)$")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="storage-io", daemon=True).start()
+    return _loop
+
+
+def run_sync(awaitable):
+    """
+    Run a storage coroutine from synchronous code (threadpool route handlers,
+    the job worker). All sync callers share one I/O loop, so they also share
+    its connection pools and concurrency limits.
+    """
+    return asyncio.run_coroutine_threadsafe(awaitable, _background_loop()).result()
+
+
+def parse_bucket_map(value: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """'lesson-content=s3:learnify-content,quiz-media=local' -> {bucket: (backend, target bucket)}"""
+    mapping = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        bucket, target = (part.strip() for part in entry.split("=", 1))
+        backend, _, target_bucket = target.partition(":")
+        mapping[bucket] = (backend, target_bucket or None)
+    return mapping
+
+
+def parse_storage_url(url: str) -> Optional[Tuple[str, str]]:
+    """(bucket, path) for a Supabase public/signed object URL, None for anything else"""
+    match = STORAGE_URL_RE.search(urlparse(url or "").path)
+    if not match:
+        return None
+    return match.group(1), unquote(match.group(2))
+
+
+class StorageService:
+    """
+    Routes each logical bucket (lesson-content, lesson-images, quiz-media, ...)
+    to a configured backend and the bucket name it has there.
+    """
+
+    def __init__(self, default_backend: str = None, bucket_map: str = None):
+        self.default_backend = default_backend or settings.storage_backend
+        self.bucket_map = parse_bucket_map(settings.storage_buckets if bucket_map is None else bucket_map)
+        self._backends: Dict[str, StorageBackend] = {}
+        self._lock = threading.Lock()
+
+    def _create_backend(self, name: str) -> StorageBackend:
+        if name == "supabase":
+            return SupabaseStorageBackend(settings.supabase_url, settings.supabase_key, settings.storage_max_concurrency)
+        if name == "s3":
+            return S3StorageBackend(
+                endpoint=settings.r2_endpoint,
+                access_key_id=settings.r2_access_key_id,
+                secret_access_key=settings.r2_secret_access_key,
+                region=settings.aws_region or "auto",
+                max_concurrency=settings.storage_max_concurrency,
+            )
+        if name == "local":
+            return LocalStorageBackend(settings.storage_local_root, settings.storage_max_concurrency)
+        raise ValueError(f"Unknown storage backend '{name}'")
+
+    def register(self, name: str, backend: StorageBackend):
+        """Install a backend instance (tests and benchmarks inject local/mock backends)"""
+        with self._lock:
+            self._backends[name] = backend
+
+    def backend(self, name: str) -> StorageBackend:
+        with self._lock:
+            if name not in self._backends:
+                self._backends[name] = self._create_backend(name)
+            return self._backends[name]
+
+    def resolve(self, bucket: str) -> Tuple[StorageBackend, str]:
+        """Backend and physical bucket name for a logical bucket"""
+        backend_name, target = self.bucket_map.get(bucket, (None, None))
+        if backend_name is None and settings.r2_bucket_name and bucket == settings.r2_bucket_name:
+            backend_name = "s3"  # Course file_key objects live in the R2 bucket
+        return self.backend(backend_name or self.default_backend), target or bucket
+
+    # --- Async interface (awaited directly from async routes) ---
+
+    async def put(self, bucket: str, path: str, body, content_type: Optional[str] = None,
+                  cache_control: Optional[str] = None) -> dict:
+        backend, target = self.resolve(bucket)
+        return await backend.put(target, path, body, content_type=content_type, cache_control=cache_control)
+
+    async def get(self, bucket: str, path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        backend, target = self.resolve(bucket)
+        return await backend.get(target, path, offset, length)
+
+    def stream(self, bucket: str, path: str, offset: int = 0, length: Optional[int] = None):
+        backend, target = self.resolve(bucket)
+        return backend.stream(target, path, offset, length)
+
+    async def head(self, bucket: str, path: str) -> Optional[dict]:
+        backend, target = self.resolve(bucket)
+        return await backend.head(target, path)
+
+    async def delete_many(self, bucket: str, paths: List[str]) -> int:
+        if not paths:
+            return 0
+        backend, target = self.resolve(bucket)
+        return await backend.delete_many(target, paths)
+
+    async def list(self, bucket: str, prefix: str = "") -> List[dict]:
+        backend, target = self.resolve(bucket)
+        return [item async for item in backend.list(target, prefix)]
+
+    async def copy(self, bucket: str, source: str, destination: str):
+        backend, target = self.resolve(bucket)
+        await backend.copy(target, source, destination)
+
+    async def copy_many(self, bucket: str, pairs: List[Tuple[str, str]]) -> List[str]:
+        """
+        Server-side (source, destination) copies issued concurrently, bounded by
+        the backend's concurrency limit. Returns the sources that failed.
+        """
+        if not pairs:
+            return []
+        backend, target = self.resolve(bucket)
+        results = await asyncio.gather(
+            *(backend.copy(target, source, destination) for source, destination in pairs),
+            return_exceptions=True,
+        )
+        failed = []
+        for (source, _), result in zip(pairs, results):
+            if isinstance(result, Exception):
+                print(f"Copy of {bucket}/{source} failed: {result}")
+                failed.append(source)
+        return failed
+
+    async def signed_url(self, bucket: str, path: str, expires_in: int) -> str:
+        backend, target = self.resolve(bucket)
+        return await backend.signed_url(target, path, expires_in)
+
+    async def signed_upload_url(self, bucket: str, path: str, content_type: Optional[str] = None) -> dict:
+        backend, target = self.resolve(bucket)
+        return await backend.signed_upload_url(target, path, content_type=content_type)
+
+    def public_url(self, bucket: str, path: str) -> str:
+        backend, target = self.resolve(bucket)
+        return backend.public_url(target, path)
+
+    # --- Sync helpers for threadpool routes, services and the job worker ---
+
+    def get_sync(self, bucket: str, path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        return run_sync(self.get(bucket, path, offset, length))
+
+    def put_sync(self, bucket: str, path: str, body: bytes, content_type: Optional[str] = None,
+                 cache_control: Optional[str] = None) -> dict:
+        return run_sync(self.put(bucket, path, body, content_type=content_type, cache_control=cache_control))
+
+    def head_sync(self, bucket: str, path: str) -> Optional[dict]:
+        return run_sync(self.head(bucket, path))
+
+    def delete_many_sync(self, bucket: str, paths: List[str]) -> int:
+        return run_sync(self.delete_many(bucket, paths))
+
+    def list_sync(self, bucket: str, prefix: str = "") -> List[dict]:
+        return run_sync(self.list(bucket, prefix))
+
+    def iter_pages_sync(self, bucket: str, prefix: str = "") -> Iterator[List[dict]]:
+        """Page-at-a-time listing for scans too large to hold in memory"""
+        backend, target = self.resolve(bucket)
+        pages = backend.list_pages(target, prefix)
+        while True:
+            try:
+                yield run_sync(pages.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def copy_many_sync(self, bucket: str, pairs: List[Tuple[str, str]]) -> List[str]:
+        return run_sync(self.copy_many(bucket, pairs))
+
+    def signed_url_sync(self, bucket: str, path: str, expires_in: int) -> str:
+        return run_sync(self.signed_url(bucket, path, expires_in))
+
+    def signed_upload_url_sync(self, bucket: str, path: str, content_type: Optional[str] = None) -> dict:
+        return run_sync(self.signed_upload_url(bucket, path, content_type))
+
+
+storage_service = StorageService()
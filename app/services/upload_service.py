@@ -0,0 +1,207 @@
+from typing import Optional
+import posixpath
+import uuid
+from fastapi import HTTPException, status
+from app.supabase_client import get_client
+from app.services.content_url_service import ContentURLService
+from app.services.image_service import ImageService
+from app.services.lesson_bundle_service import LessonBundleService
+from app.services.mdx_service import MdxService
+from app.services.search_service import SearchService
+from app.services.storage_service import storage_service
+from app.services.job_queue import JobQueue
+
+# Signed upload URLs are valid for two hours (fixed server-side by Supabase)
+SIGNED_UPLOAD_EXPIRES_IN = 2 * 60 * 60
+
+IMAGE_CONTENT_TYPES = ["image/png", "image/jpeg", "image/jpg", "image/webp", "image/gif", "image/svg+xml"]
+
+# Per-kind constraints for direct-to-storage uploads
+UPLOAD_RULES = {
+    "lesson-content": {
+        "bucket": "lesson-content",
+        "content_types": ["text/markdown", "text/mdx", "text/x-markdown"],
+        "extensions": [".mdx"],
+        "max_size": 2 * 1024 * 1024,  # 2MB
+    },
+    "lesson-image": {
+        "bucket": "lesson-images",
+        "content_types": IMAGE_CONTENT_TYPES,
+        "extensions": [".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"],
+        "max_size": 10 * 1024 * 1024,  # 10MB
+    },
+    "quiz-image": {
+        "bucket": "quiz-media",
+        "content_types": IMAGE_CONTENT_TYPES,
+        "extensions": [".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"],
+        "max_size": 5 * 1024 * 1024,  # 5MB
+    },
+}
+
+
+def _safe_filename(filename: str) -> str:
+    return "".join([c if c.isalnum() or c in "._-" else "_" for c in filename])
+
+
+class UploadService:
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def build_path(kind: str, owner_id: str, filename: str) -> str:
+        """Generate a fresh object path scoped to the owning lesson/quiz"""
+        ext = posixpath.splitext(filename)[1].lower()
+        if kind == "lesson-content":
+            # Versioned path so direct uploads never overwrite the live document
+            return f"{owner_id}/{uuid.uuid4().hex}{ext}"
+        if kind == "lesson-image":
+            return f"{owner_id}/{uuid.uuid4().hex[:8]}_{_safe_filename(filename)}"
+        return f"quiz-media/{owner_id}/{uuid.uuid4()}{ext}"
+
+    @staticmethod
+    def owner_prefix(kind: str, owner_id: str) -> str:
+        if kind == "quiz-image":
+            return f"quiz-media/{owner_id}/"
+        return f"{owner_id}/"
+
+    @staticmethod
+    def create_presigned_upload(request) -> dict:
+        """Validate the declared file and issue a signed upload URL for it"""
+        rules = UPLOAD_RULES[request.kind]
+
+        ext = posixpath.splitext(request.filename)[1].lower()
+        if ext not in rules["extensions"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file extension. Allowed: {', '.join(rules['extensions'])}",
+            )
+        if request.content_type not in rules["content_types"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type. Allowed: {', '.join(rules['content_types'])}",
+            )
+        if request.size > rules["max_size"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size: {rules['max_size'] // (1024*1024)}MB",
+            )
+
+        UploadService._ensure_owner_exists(request.kind, str(request.owner_id))
+
+        path = UploadService.build_path(request.kind, str(request.owner_id), request.filename)
+        try:
+            signed = storage_service.signed_upload_url_sync(rules["bucket"], path, request.content_type)
+        except NotImplementedError as e:
+            # e.g. STORAGE_BACKEND=local: the multipart /upload-* routes still work
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail=f"{e}; use the multipart upload endpoints instead",
+            )
+        except Exception as e:
+            print(f"Signed upload URL error: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to create upload URL: {str(e)}")
+
+        return {
+            "kind": request.kind,
+            "bucket": rules["bucket"],
+            "path": path,
+            "upload_url": signed["url"],
+            "token": signed["token"],
+            "content_type": request.content_type,
+            "max_size": rules["max_size"],
+            "expires_in": SIGNED_UPLOAD_EXPIRES_IN,
+        }
+
+    @staticmethod
+    def complete_upload(request) -> dict:
+        """Verify a finished direct upload and record its metadata"""
+        rules = UPLOAD_RULES[request.kind]
+        owner_id = str(request.owner_id)
+
+        if not request.path.startswith(UploadService.owner_prefix(request.kind, owner_id)) or ".." in request.path:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload path does not belong to this owner",
+            )
+
+        metadata = UploadService.stat_object(rules["bucket"], request.path)
+        if metadata is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Uploaded object '{request.path}' not found",
+            )
+
+        size = int(metadata.get("size") or 0)
+        content_type = (metadata.get("content_type") or "").split(";")[0]
+        if size > rules["max_size"] or content_type not in rules["content_types"]:
+            # Reject and drop anything that slipped past the declared constraints
+            JobQueue.enqueue("storage.delete", {"bucket": rules["bucket"], "paths": [request.path]})
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file violates size or content-type constraints",
+            )
+
+        response = {
+            "kind": request.kind,
+            "bucket": rules["bucket"],
+            "path": request.path,
+            "size": size,
+            "content_type": content_type,
+        }
+
+        if request.kind == "lesson-content":
+            # The superseded document is removed by the lessons update trigger
+            UploadService._record_lesson_content(owner_id, request.path)
+            response["file_key"] = request.path
+        else:
+            # Replace the raw upload with hashed, responsive WebP variants
+            image = ImageService.process_stored(rules["bucket"], request.path, content_type)
+            response.update({
+                "path": image["path"],
+                "url": image["url"],
+                "size": image["size"],
+                "content_type": image["content_type"],
+                "hash": image["hash"],
+                "variants": image["variants"],
+            })
+
+        return response
+
+    @staticmethod
+    def stat_object(bucket_name: str, path: str) -> Optional[dict]:
+        """Return storage metadata (size, content_type, etag) for an object or None"""
+        return storage_service.head_sync(bucket_name, path)
+
+    @staticmethod
+    def _ensure_owner_exists(kind: str, owner_id: str):
+        table = "quizzes" if kind == "quiz-image" else "lessons"
+        result = UploadService.supabase_client().table(table).select("id").eq("id", owner_id).execute()
+        if not result.data:
+            label = "Quiz" if kind == "quiz-image" else "Lesson"
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{label} with id '{owner_id}' not found",
+            )
+
+    @staticmethod
+    def _record_lesson_content(lesson_id: str, mdx_path: str) -> Optional[str]:
+        """Point the lesson at its new content and return the previous mdx_path"""
+        client = UploadService.supabase_client()
+        existing = client.table("lessons").select("mdx_path, content_hash, slug").eq("id", lesson_id).execute()
+        if not existing.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Lesson with id '{lesson_id}' not found",
+            )
+
+        content = storage_service.get_sync(UPLOAD_RULES["lesson-content"]["bucket"], mdx_path)
+        update_data = {"mdx_path": mdx_path, **MdxService.outline_update(content, existing.data[0].get("content_hash"))}
+        client.table("lessons").update(update_data).eq("id", lesson_id).execute()
+        if "content_text" in update_data:
+            SearchService.index_lesson({"id": lesson_id, "content_text": update_data["content_text"]})
+
+        previous = existing.data[0].get("mdx_path")
+        ContentURLService.invalidate(lesson_id=lesson_id, mdx_path=previous)
+        LessonBundleService.invalidate(slug=existing.data[0].get("slug"))
+        return previous
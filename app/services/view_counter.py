@@ -0,0 +1,227 @@
+from collections import Counter
+from typing import Optional
+import glob
+import os
+import threading
+import time
+import uuid
+from app.config import get_settings
+from app.supabase_client import get_client
+
+settings = get_settings()
+
+
+def _is_uuid(value: str) -> bool:
+    # A torn or corrupted spool line must not poison every later flush
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+class ViewCounter:
+    """
+    Write-behind lesson view counts. Views are buffered per lesson and
+    flushed as one increment_lesson_views() call with aggregated counts.
+
+    Buffers:
+      memory - a Counter, flushed by a daemon thread every
+               view_flush_interval_seconds (long-running deployments)
+      file   - an append-only spool file (one lesson id per line) that outlives
+               a frozen serverless instance; flushed after a request once the
+               interval has passed, and by /cron/views
+
+    Bounded loss: a flush is due after view_flush_interval_seconds or
+    view_flush_max_pending views, whichever comes first, so a crash loses at
+    most that window of views per instance (nothing in file mode unless the
+    instance's disk is discarded too). A failed flush keeps its counts for
+    the next attempt, and stop() flushes what is left on shutdown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._pending_events = 0
+        self._oldest_pending: Optional[float] = None
+        self._last_flush_at: Optional[float] = None
+        self._last_flush_seconds: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._flushed_views = 0
+        self._flushes = 0
+        self._failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def supabase_client():
+        return get_client()
+
+    @staticmethod
+    def mode() -> str:
+        mode = settings.view_buffer_mode
+        if mode == "auto":
+            return "file" if os.environ.get("VERCEL") else "memory"
+        return mode
+
+    # --- Recording ---
+
+    def record(self, lesson_id: str) -> bool:
+        """Buffer one view; returns True when a flush is due"""
+        now = time.time()
+        if self.mode() == "file":
+            # O_APPEND writes of one short line are atomic, so concurrent requests never interleave
+            fd = os.open(settings.view_spool_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, f"{lesson_id}\n".encode())
+            finally:
+                os.close(fd)
+            with self._lock:
+                self._pending_events += 1
+                self._oldest_pending = self._oldest_pending or now
+        else:
+            with self._lock:
+                self._pending[lesson_id] += 1
+                self._pending_events += 1
+                self._oldest_pending = self._oldest_pending or now
+
+        due = self._due(now)
+        if due and self._thread is not None:
+            self._wake.set()
+            return False
+        return due
+
+    def _due(self, now: float) -> bool:
+        with self._lock:
+            if not self._pending_events:
+                return False
+            if self._pending_events >= settings.view_flush_max_pending:
+                return True
+            return now - self._oldest_pending >= settings.view_flush_interval_seconds
+
+    # --- Flushing ---
+
+    def _take_memory(self) -> Counter:
+        with self._lock:
+            taken, self._pending = self._pending, Counter()
+            self._pending_events = 0
+            self._oldest_pending = None
+        return taken
+
+    def _take_spool(self) -> tuple:
+        """Move the spool aside (atomic rename) and aggregate every unflushed batch file"""
+        path = settings.view_spool_path
+        with self._lock:
+            if os.path.exists(path):
+                os.replace(path, f"{path}.{time.time_ns()}.flushing")
+            self._pending_events = 0
+            self._oldest_pending = None
+
+        batches = sorted(glob.glob(f"{glob.escape(path)}.*.flushing"))
+        counts: Counter = Counter()
+        for batch in batches:
+            with open(batch) as f:
+                counts.update(line.strip() for line in f if _is_uuid(line.strip()))
+        return counts, batches
+
+    def flush(self) -> dict:
+        """Apply buffered views in one batched statement; concurrent calls skip instead of waiting"""
+        if not self._flush_lock.acquire(blocking=False):
+            return {"status": "busy", "flushed": 0}
+        try:
+            started = time.time()
+            lag = self.flush_lag()
+            batches = []
+            if self.mode() == "file":
+                counts, batches = self._take_spool()
+                counts.update(self._take_memory())
+            else:
+                counts = self._take_memory()
+            if not counts:
+                return {"status": "ok", "flushed": 0, "lessons": 0}
+
+            increments = [{"id": lesson_id, "count": count} for lesson_id, count in counts.items()]
+            try:
+                updated = self.supabase_client().rpc("increment_lesson_views", {"increments": increments}).execute().data
+            except Exception as e:
+                # Keep the counts (spool batches stay on disk) for the next attempt
+                print(f"View counter flush failed: {e}")
+                if not batches:
+                    with self._lock:
+                        self._pending.update(counts)
+                        self._pending_events += sum(counts.values())
+                        self._oldest_pending = started - lag
+                else:
+                    with self._lock:
+                        self._oldest_pending = min(self._oldest_pending or started, started - lag)
+                self._failures += 1
+                self._last_error = str(e)
+                return {"status": "failed", "flushed": 0, "error": str(e)}
+
+            for batch in batches:
+                os.remove(batch)
+            total = sum(counts.values())
+            self._flushes += 1
+            self._flushed_views += total
+            self._last_flush_at = time.time()
+            self._last_flush_seconds = round(self._last_flush_at - started, 4)
+            self._last_error = None
+            return {"status": "ok", "flushed": total, "lessons": len(counts), "updated": updated or 0}
+        finally:
+            self._flush_lock.release()
+
+    # --- Metrics ---
+
+    def flush_lag(self) -> float:
+        """Age in seconds of the oldest view not yet written to the database"""
+        with self._lock:
+            return round(time.time() - self._oldest_pending, 3) if self._oldest_pending else 0.0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            pending_events = self._pending_events
+            pending_lessons = len(self._pending)
+        return {
+            "mode": self.mode(),
+            "pending_views": pending_events,
+            "pending_lessons": pending_lessons,
+            "flush_lag_seconds": self.flush_lag(),
+            "last_flush_at": self._last_flush_at,
+            "last_flush_seconds": self._last_flush_seconds,
+            "flushes": self._flushes,
+            "flushed_views": self._flushed_views,
+            "flush_failures": self._failures,
+            "last_error": self._last_error,
+            "max_loss_window_seconds": settings.view_flush_interval_seconds,
+            "max_loss_views": settings.view_flush_max_pending,
+        }
+
+    # --- Background flusher (memory mode) ---
+
+    def start(self):
+        if self._thread is None and self.mode() == "memory":
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(settings.view_flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"View counter error: {e}")
+
+
+view_counter = ViewCounter()
@@ -0,0 +1,88 @@
+"""
+Learning event ingestion throughput for one instance.
+
+    python -m benchmarks.events_benchmark --batch 100 --batches 500
+
+Posts synthetic batches to POST /api/events through the ASGI app (in-process,
+so no network) with the database call stubbed out, then times the flush that
+turns the buffer into ingest_learning_events() payloads. Reports events per
+second for the request path and for the flush.
+"""
+import argparse
+import json
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.event_service import EventBuffer, event_buffer, settings
+
+KINDS = ("open", "scroll", "video", "time")
+
+
+class StubClient:
+    """Stands in for supabase: records the size of each ingest payload"""
+
+    def __init__(self):
+        self.rows = 0
+        self.payload_bytes = 0
+
+    def rpc(self, name, params):
+        self.rows += len(params["events"])
+        # The supabase client JSON-encodes params; count that cost too
+        self.payload_bytes += len(json.dumps(params))
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": None})()
+
+
+def build_batch(size: int, lessons: list) -> dict:
+    now = int(time.time() * 1000)
+    return {
+        "user_id": f"user-{uuid.uuid4().hex[:8]}",
+        "course_id": str(uuid.uuid4()),
+        "session_id": uuid.uuid4().hex,
+        "events": [
+            {"k": KINDS[i % 4], "l": lessons[i % len(lessons)], "t": now - i * 250, "v": None if i % 4 == 0 else float(i % 100)}
+            for i in range(size)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=100, help="Events per request")
+    parser.add_argument("--batches", type=int, default=500)
+    args = parser.parse_args()
+
+    stub = StubClient()
+    EventBuffer.supabase_client = staticmethod(lambda: stub)
+    settings.event_buffer_max = args.batch * args.batches + 1
+    settings.event_flush_max_pending = settings.event_buffer_max  # Time the flush separately
+
+    lessons = [str(uuid.uuid4()) for _ in range(50)]
+    bodies = [json.dumps(build_batch(args.batch, lessons)) for _ in range(args.batches)]
+    client = TestClient(app)  # Not a context manager: no startup, so no flusher thread
+    headers = {"content-type": "application/json"}
+
+    started = time.perf_counter()
+    for body in bodies:
+        response = client.post("/api/events", content=body, headers=headers)
+        assert response.status_code == 202, response.text
+    ingest = time.perf_counter() - started
+    total = args.batch * args.batches
+    print(f"POST /api/events  {args.batches} requests x {args.batch} events")
+    print(f"  {ingest / args.batches * 1000:8.3f} ms/request  {total / ingest:12,.0f} events/s")
+
+    started = time.perf_counter()
+    report = event_buffer.flush()
+    flush = time.perf_counter() - started
+    assert report["flushed"] == total and stub.rows == total
+    print(f"flush             {total} events in {-(-total // settings.event_flush_batch_size)} ingest calls")
+    print(f"  {flush * 1000:8.1f} ms          {total / flush:12,.0f} events/s  {stub.payload_bytes / total:.0f} bytes/event")
+
+
+if __name__ == "__main__":
+    main()
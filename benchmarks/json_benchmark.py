@@ -0,0 +1,128 @@
+"""
+Response serialization cost for a large course tree and its quizzes.
+
+    python -m benchmarks.json_benchmark --lessons 200 --iterations 50
+
+Builds a synthetic course outline shaped like the PostgREST result of
+GET /api/courses/{id} (plus the published quizzes of that course) and
+compares FastAPI's default response_model handling with the
+settings.json_fast_path modes served by app.services.fast_json.
+"""
+from datetime import datetime, timezone
+from typing import List
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas import CourseWithChapters
+from app.schemas.quiz import QuizUser
+from app.services import fast_json
+
+CHAPTER_SIZE = 20
+
+
+def build_course(lessons: int) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    course_id = str(uuid.uuid4())
+    chapters = []
+    for c in range(max(1, lessons // CHAPTER_SIZE)):
+        chapter_id = str(uuid.uuid4())
+        chapters.append({
+            "id": chapter_id, "course_id": course_id, "title": f"Chapter {c}", "slug": f"chapter-{c}",
+            "position": c, "sort_key": f"a{c:04d}", "status": "Published", "created_at": now, "updated_at": now,
+            "lessons": [
+                {
+                    "id": str(uuid.uuid4()), "chapter_id": chapter_id, "title": f"Lesson {c}.{i}",
+                    "slug": f"lesson-{c}-{i}", "label": "Theory", "type": "Theory", "author_name": "Author",
+                    "published_at": "2024-01-01", "position": i, "sort_key": f"a{i:04d}", "status": "Published",
+                    "mdx_path": f"{uuid.uuid4()}.mdx", "search_vector": "'lesson':1 'theory':2",
+                    "created_at": now, "updated_at": now,
+                }
+                for i in range(CHAPTER_SIZE)
+            ],
+        })
+    return {
+        "id": course_id, "title": "Benchmark course", "slug": "benchmark-course", "description": "x" * 500,
+        "small_description": "Benchmark", "cover_image": "https://example.com/cover.png", "status": "Published",
+        "file_key": None, "published_at": now, "created_at": now, "updated_at": now, "chapters": chapters,
+    }
+
+
+def build_quizzes(course: dict) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()), "course_id": course["id"], "chapter_id": chapter["id"],
+            "title": f"Quiz {chapter['slug']}", "description": None, "passing_score_percent": 70,
+            "status": "Published", "published_at": course["published_at"],
+            "created_at": course["created_at"], "updated_at": course["updated_at"],
+            "questions": [
+                {
+                    "id": str(uuid.uuid4()), "prompt": f"Question {q}", "position": q, "points": 1,
+                    "image_url": None, "sort_key": f"a{q:04d}",
+                    "options": [
+                        {
+                            "id": str(uuid.uuid4()), "content": f"Option {o}", "position": o,
+                            "image_url": None, "is_correct": o == 0, "sort_key": f"a{o:04d}",
+                        }
+                        for o in range(4)
+                    ],
+                }
+                for q in range(10)
+            ],
+        }
+        for chapter in course["chapters"]
+    ]
+
+
+async def baseline(response_type, data) -> bytes:
+    """What FastAPI does for a route returning a dict with response_model=response_type"""
+    field = create_response_field(name="response", type_=response_type)
+    content = await serialize_response(field=field, response_content=data, is_coroutine=False)
+    return JSONResponse(content).body
+
+
+def measure(label: str, render, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        body = render()
+    elapsed = (time.perf_counter() - started) / iterations
+    print(f"{label:<22} {elapsed * 1000:8.2f} ms/response  {len(body):>9} bytes")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lessons", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    course = build_course(args.lessons)
+    quizzes = build_quizzes(course)
+    print(f"outline: {len(course['chapters'])} chapters, {args.lessons} lessons; quizzes: {len(quizzes)}")
+
+    loop = asyncio.new_event_loop()
+    cases = (("CourseWithChapters", CourseWithChapters, course), ("List[QuizUser]", List[QuizUser], quizzes))
+    for name, response_type, data in cases:
+        print(f"\n{name}")
+        runs = {"default": lambda: loop.run_until_complete(baseline(response_type, data))}
+        for mode in ("validate", "project"):
+            runs[mode] = lambda mode=mode: fast_json.respond(response_type, data, mode=mode).body
+        base = None
+        for label, render in runs.items():
+            elapsed = measure(label, render, args.iterations)
+            base = base or elapsed
+            if label != "default":
+                print(f"{'':<22} {base / elapsed:8.1f}x faster than default")
+    loop.close()
+
+    projected = fast_json.project(List[QuizUser], quizzes)
+    assert all("is_correct" not in o for q in projected for qq in q["questions"] for o in qq["options"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Quiz regrade throughput after an answer key change.
+
+    python -m benchmarks.regrade_benchmark --answers 1000000 --questions 40
+
+Builds a quiz and enough synthetic attempts to reach --answers answer rows
+(--compact-share of the attempts in the compact format, the rest as
+quiz_attempt_answers rows), flips one question's correct option, then runs
+RegradeService.run with the database stubbed out: attempts come from memory
+and apply_quiz_regrade() payloads are only JSON-encoded. For comparison it
+also regrades the same answers with a per-answer Python loop, the way
+submit_attempt grades a single attempt.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from app.services import attempt_answers
+from app.services.quiz_service import QuizService
+from app.services.regrade_service import AnswerKey, Gradebook, RegradeService
+
+
+class StubClient:
+    """Stands in for supabase: records the apply_quiz_regrade payloads"""
+
+    def __init__(self):
+        self.calls = 0
+        self.attempts = 0
+        self.answers = 0
+        self.payload_bytes = 0
+
+    def rpc(self, name, params):
+        self.calls += 1
+        self.attempts += len(params["attempts"])
+        self.answers += len(params["answers"])
+        self.payload_bytes += len(json.dumps(params))
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": None})()
+
+
+def build_quiz(questions: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "passing_score_percent": 70,
+        "questions": [
+            {
+                "id": str(uuid.uuid4()),
+                "points": 1 + i % 3,
+                "options": [{"id": str(uuid.uuid4()), "is_correct": j == 0} for j in range(4)],
+            }
+            for i in range(questions)
+        ],
+    }
+
+
+def grade(quiz: dict, answers: list) -> tuple:
+    """submit_attempt's grading of one attempt"""
+    points = {q["id"]: q["points"] for q in quiz["questions"]}
+    correct = {q["id"]: next((o["id"] for o in q["options"] if o["is_correct"]), None) for q in quiz["questions"]}
+    max_score = sum(points.values())
+    score = 0
+    for answer in answers:
+        if answer["selected_option_id"] == correct.get(answer["question_id"]):
+            score += points[answer["question_id"]]
+    percent = int(score / max_score * 100) if max_score > 0 else 0
+    return score, percent, percent >= quiz["passing_score_percent"]
+
+
+def build_attempts(quiz: dict, count: int, compact_share: float):
+    """Attempts graded against the quiz as it is now, plus the answer rows of the row-stored ones"""
+    layout = attempt_answers.build_layout(quiz)
+    rng = random.Random(7)
+    attempts, rows = [], []
+    for n in range(count):
+        answers = []
+        for q in quiz["questions"]:
+            option = q["options"][0 if rng.random() < 0.7 else rng.randrange(1, 4)]
+            answers.append({"question_id": q["id"], "selected_option_id": option["id"], "is_correct": option["is_correct"]})
+        score, percent, passed = grade(quiz, answers)
+        attempt = {
+            "id": str(uuid.uuid4()),
+            "submitted_at": f"2026-{1 + n % 12:02d}-01T00:00:00+00:00",
+            "score": score, "max_score": sum(q["points"] for q in quiz["questions"]),
+            "percent": percent, "passed": passed, "layout_id": None,
+        }
+        if n < count * compact_share:
+            attempt.update(attempt_answers.encode(layout, answers))
+        else:
+            points = {q["id"]: q["points"] for q in quiz["questions"]}
+            rows.extend(
+                {"id": str(uuid.uuid4()), "attempt_id": attempt["id"], "submitted_at": attempt["submitted_at"],
+                 "earned_points": points[a["question_id"]] if a["is_correct"] else 0, **a}
+                for a in answers
+            )
+        attempts.append(attempt)
+    return layout, attempts, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=1_000_000, help="Answer rows across all attempts")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--compact-share", type=float, default=0.5, help="Share of attempts stored compactly")
+    args = parser.parse_args()
+
+    quiz = build_quiz(args.questions)
+    count = args.answers // args.questions
+    started = time.perf_counter()
+    layout, attempts, rows = build_attempts(quiz, count, args.compact_share)
+    print(f"built {count:,} attempts x {args.questions} questions ({len(rows):,} answer rows) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    # The fix: the second option of every fifth question was the correct one
+    for q in quiz["questions"][::5]:
+        q["options"][0]["is_correct"], q["options"][1]["is_correct"] = False, True
+
+    stub = StubClient()
+    QuizService.get_quiz_by_id = staticmethod(lambda quiz_id: quiz)
+    QuizService._get_layouts = staticmethod(lambda ids: {layout["id"]: layout})
+    RegradeService.supabase_client = staticmethod(lambda: stub)
+
+    def load(quiz_id, key):
+        book = Gradebook(key)
+        book.add_attempts(attempts, {layout["id"]: layout})
+        book.add_answer_rows(rows, {a["id"]: i for i, a in enumerate(attempts)})
+        return book
+
+    RegradeService.load = staticmethod(load)
+    started = time.perf_counter()
+    report = RegradeService.run(quiz["id"])
+    total = time.perf_counter() - started
+    timings = report["timings"]
+    print(f"vectorized regrade  {report['total_answers']:,} answers")
+    print(f"  arrays {timings['load']:6.2f}s  grade {timings['grade']:6.2f}s  write {timings['write']:6.2f}s  "
+          f"total {total:6.2f}s  {report['total_answers'] / total:12,.0f} answers/s")
+    print(f"  {report['changed_attempts']:,} attempts / {report['changed_answers']:,} answer rows changed, "
+          f"{stub.calls} apply_quiz_regrade calls, {stub.payload_bytes / max(stub.calls, 1) / 1024:.0f} KB/call")
+
+    # Baseline: decode every attempt to answer dicts and grade it one by one
+    row_answers = {}
+    for row in rows:
+        row_answers.setdefault(row["attempt_id"], []).append(row)
+    started = time.perf_counter()
+    looped = []
+    for attempt in attempts:
+        if attempt["layout_id"]:
+            answers = attempt_answers.decode(layout, attempt["answer_options"], attempt["correct_bits"])
+        else:
+            answers = row_answers[attempt["id"]]
+        looped.append(grade(quiz, answers))
+    loop = time.perf_counter() - started
+    print("python loop regrade")
+    print(f"  grade {loop:6.2f}s  {report['total_answers'] / loop:12,.0f} answers/s  "
+          f"({loop / (timings['load'] + timings['grade']):.1f}x the vectorized arrays + grade)")
+
+    # Both ways agree
+    result = load(quiz["id"], AnswerKey(quiz)).grade()
+    assert result["score"].tolist() == [score for score, _, _ in looped]
+    assert result["passed"].tolist() == [passed for _, _, passed in looped]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+-- Migration: Durable outbox for background jobs (storage cleanup and other slow side effects)
+-- Run this in Supabase SQL Editor
+
+-- 1. Outbox table, drained by the API worker thread or the /cron/jobs endpoint
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, running, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS background_jobs_ready_idx
+ON background_jobs (run_after)
+WHERE status IN ('pending', 'running');
+
+-- 2. Claim a batch of due jobs. SKIP LOCKED lets several workers drain concurrently;
+--    the lease makes jobs of a crashed worker claimable again once it expires.
+CREATE OR REPLACE FUNCTION claim_background_jobs(batch_size INTEGER, lease_seconds INTEGER DEFAULT 300)
+RETURNS SETOF background_jobs
+LANGUAGE sql
+AS $$
+    UPDATE background_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_until = NOW() + make_interval(secs => lease_seconds),
+        updated_at = NOW()
+    WHERE j.id IN (
+        SELECT id FROM background_jobs
+        WHERE (status = 'pending' AND run_after <= NOW())
+           OR (status = 'running' AND locked_until < NOW())
+        ORDER BY run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$;
+
+-- 3. Storage cleanup is enqueued in the same transaction as the delete/update,
+--    including rows removed by ON DELETE CASCADE from courses and chapters.
+CREATE OR REPLACE FUNCTION enqueue_lesson_storage_cleanup()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO background_jobs (kind, payload)
+        SELECT 'storage.delete', jsonb_build_object('bucket', 'lesson-content', 'paths', jsonb_agg(mdx_path))
+        FROM old_rows WHERE mdx_path IS NOT NULL
+        HAVING count(*) > 0;
+
+        -- Images (hashed or in legacy per-lesson folders) may still be referenced by
+        -- course clones, so they are left to the storage GC once nothing uses them
+    ELSE
+        -- Content replaced by a new version: drop the superseded object
+        INSERT INTO background_jobs (kind, payload)
+        SELECT 'storage.delete', jsonb_build_object('bucket', 'lesson-content', 'paths', jsonb_agg(o.mdx_path))
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.mdx_path IS NOT NULL AND o.mdx_path IS DISTINCT FROM n.mdx_path
+        HAVING count(*) > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS lessons_storage_cleanup_delete ON lessons;
+CREATE TRIGGER lessons_storage_cleanup_delete
+AFTER DELETE ON lessons
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION enqueue_lesson_storage_cleanup();
+
+DROP TRIGGER IF EXISTS lessons_storage_cleanup_update ON lessons;
+CREATE TRIGGER lessons_storage_cleanup_update
+AFTER UPDATE ON lessons
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION enqueue_lesson_storage_cleanup();
+
+-- Quiz images are left to the storage GC for the same reason (clones share them);
+-- earlier versions of this migration deleted the per-quiz upload folder here
+DROP TRIGGER IF EXISTS quizzes_storage_cleanup_delete ON quizzes;
+DROP FUNCTION IF EXISTS enqueue_quiz_storage_cleanup();
+
+-- Verify the migration
+SELECT tgname FROM pg_trigger WHERE tgname LIKE '%storage_cleanup%';
@@ -0,0 +1,79 @@
+-- Migration: Bulk create chapters and lessons with per-item results
+-- Run this in Supabase SQL Editor
+-- Each call validates parents and slugs for the whole batch and inserts every valid
+-- item with one statement, in request order (so sort keys follow the list). Items that
+-- fail are reported with their index instead of failing the batch.
+-- Result: [{"index", "id", "slug", "error"}] where error is NULL,
+-- 'parent_not_found' or 'duplicate_slug'.
+
+CREATE OR REPLACE FUNCTION bulk_create_chapters(items JSONB)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    WITH input AS MATERIALIZED (
+        SELECT x.*, gen_random_uuid() AS new_id
+        FROM ROWS FROM (
+            jsonb_to_recordset(items) AS (course_id UUID, title TEXT, slug TEXT, position INTEGER, status TEXT)
+        ) WITH ORDINALITY AS x(course_id, title, slug, position, status, idx)
+    ),
+    inserted AS (
+        INSERT INTO chapters (id, course_id, title, slug, position, status)
+        SELECT i.new_id, i.course_id, i.title, i.slug, coalesce(i.position, 0), coalesce(i.status, 'Draft')
+        FROM input i
+        WHERE EXISTS (SELECT 1 FROM courses c WHERE c.id = i.course_id)
+        ORDER BY i.idx
+        ON CONFLICT (course_id, slug) DO NOTHING
+        RETURNING id
+    )
+    SELECT coalesce(jsonb_agg(jsonb_build_object(
+        'index', i.idx - 1,
+        'id', CASE WHEN ins.id IS NOT NULL THEN i.new_id END,
+        'slug', i.slug,
+        'error', CASE
+            WHEN ins.id IS NOT NULL THEN NULL
+            WHEN NOT EXISTS (SELECT 1 FROM courses c WHERE c.id = i.course_id) THEN 'parent_not_found'
+            ELSE 'duplicate_slug'
+        END
+    ) ORDER BY i.idx), '[]'::jsonb)
+    FROM input i LEFT JOIN inserted ins ON ins.id = i.new_id;
+$$;
+
+CREATE OR REPLACE FUNCTION bulk_create_lessons(items JSONB)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    WITH input AS MATERIALIZED (
+        SELECT x.*, gen_random_uuid() AS new_id
+        FROM ROWS FROM (
+            jsonb_to_recordset(items) AS (chapter_id UUID, title TEXT, slug TEXT, label TEXT, type TEXT,
+                                          author_name TEXT, published_at DATE, position INTEGER,
+                                          status TEXT, mdx_path TEXT)
+        ) WITH ORDINALITY AS x(chapter_id, title, slug, label, type, author_name, published_at,
+                               position, status, mdx_path, idx)
+    ),
+    inserted AS (
+        INSERT INTO lessons (id, chapter_id, title, slug, label, type, author_name, published_at,
+                             position, status, mdx_path)
+        SELECT i.new_id, i.chapter_id, i.title, i.slug, i.label, i.type, i.author_name, i.published_at,
+               coalesce(i.position, 0), coalesce(i.status, 'Draft'), i.mdx_path
+        FROM input i
+        WHERE EXISTS (SELECT 1 FROM chapters ch WHERE ch.id = i.chapter_id)
+        ORDER BY i.idx
+        ON CONFLICT (slug) DO NOTHING
+        RETURNING id
+    )
+    SELECT coalesce(jsonb_agg(jsonb_build_object(
+        'index', i.idx - 1,
+        'id', CASE WHEN ins.id IS NOT NULL THEN i.new_id END,
+        'slug', i.slug,
+        'error', CASE
+            WHEN ins.id IS NOT NULL THEN NULL
+            WHEN NOT EXISTS (SELECT 1 FROM chapters ch WHERE ch.id = i.chapter_id) THEN 'parent_not_found'
+            ELSE 'duplicate_slug'
+        END
+    ) ORDER BY i.idx), '[]'::jsonb)
+    FROM input i LEFT JOIN inserted ins ON ins.id = i.new_id;
+$$;
+
+-- Verify the migration
+SELECT proname FROM pg_proc WHERE proname IN ('bulk_create_chapters', 'bulk_create_lessons');
@@ -0,0 +1,112 @@
+-- Migration: Compact (columnar) storage of quiz attempt answers
+-- Run this in Supabase SQL Editor
+-- Instead of one quiz_attempt_answers row per question, an attempt stores
+--   answer_options  SMALLINT[]   selected option index per question (-1 = unanswered)
+--   correct_bits    BIT VARYING  bit i set when question i was answered correctly
+-- against a shared, immutable layout (question ids, option ids and points in
+-- the order the indices refer to). Every attempt at the same version of a quiz
+-- shares one layout row, so a submission is a single row insert and history
+-- reads carry two short arrays instead of N answer rows. The API decodes them
+-- back to the existing {question_id, selected_option_id, is_correct,
+-- earned_points} shape.
+--
+-- Migration path: run this file, deploy (reads decode both formats and new
+-- attempts are written compactly unless QUIZ_ANSWER_STORAGE=rows), then
+-- convert old attempts in batches until it returns 0:
+--   SELECT compact_quiz_attempt_answers(1000);
+
+-- 1. Layouts. id = md5 of the canonical layout text, so the API and this file
+-- derive the same id for the same layout and inserts are idempotent. No
+-- foreign keys to questions/options: history survives quiz edits.
+CREATE TABLE IF NOT EXISTS quiz_answer_layouts (
+    id UUID PRIMARY KEY,
+    quiz_id UUID NOT NULL REFERENCES quizzes(id) ON DELETE CASCADE,
+    question_ids UUID[] NOT NULL,
+    option_ids JSONB NOT NULL,  -- [[option uuid, ...] per question], in index order
+    points INTEGER[] NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS quiz_answer_layouts_quiz_idx ON quiz_answer_layouts (quiz_id);
+
+-- 2. Compact columns on the attempt row
+ALTER TABLE quiz_attempts ADD COLUMN IF NOT EXISTS layout_id UUID NULL REFERENCES quiz_answer_layouts(id);
+ALTER TABLE quiz_attempts ADD COLUMN IF NOT EXISTS answer_options SMALLINT[] NULL;
+ALTER TABLE quiz_attempts ADD COLUMN IF NOT EXISTS correct_bits BIT VARYING NULL;
+
+-- 3. Convert row-stored attempts. Each attempt gets a layout of the questions it
+-- answered (in sort_key order); its answer rows are deleted once encoded.
+-- Attempts the arrays cannot represent (a question answered twice, or an option
+-- from another question) keep their rows; reads handle both formats.
+-- Returns the number of attempts converted; call until it returns 0.
+CREATE OR REPLACE FUNCTION compact_quiz_attempt_answers(batch_size INTEGER DEFAULT 1000)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    converted INTEGER;
+BEGIN
+    CREATE TEMP TABLE compact_batch ON COMMIT DROP AS
+    SELECT a.id AS attempt_id, a.quiz_id
+    FROM quiz_attempts a
+    WHERE a.layout_id IS NULL
+      AND EXISTS (SELECT 1 FROM quiz_attempt_answers x WHERE x.attempt_id = a.id)
+      AND NOT EXISTS (
+          SELECT 1
+          FROM quiz_attempt_answers x
+          LEFT JOIN quiz_options o ON o.id = x.selected_option_id AND o.question_id = x.question_id
+          WHERE x.attempt_id = a.id
+          GROUP BY x.question_id
+          HAVING count(*) > 1 OR bool_or(o.id IS NULL)
+      )
+    ORDER BY a.id
+    LIMIT batch_size
+    FOR UPDATE OF a SKIP LOCKED;
+
+    -- One entry per answered question, with the question's options in order
+    CREATE TEMP TABLE compact_answers ON COMMIT DROP AS
+    SELECT b.attempt_id, b.quiz_id, q.id AS question_id, q.points,
+           row_number() OVER (PARTITION BY b.attempt_id ORDER BY q.sort_key, q.id) AS question_index,
+           x.selected_option_id, x.is_correct,
+           opts.option_ids
+    FROM compact_batch b
+    JOIN quiz_attempt_answers x ON x.attempt_id = b.attempt_id
+    JOIN quiz_questions q ON q.id = x.question_id
+    CROSS JOIN LATERAL (
+        SELECT array_agg(o.id ORDER BY o.sort_key, o.id) AS option_ids
+        FROM quiz_options o WHERE o.question_id = q.id
+    ) opts;
+
+    CREATE TEMP TABLE compact_encoded ON COMMIT DROP AS
+    SELECT attempt_id, quiz_id,
+           md5(string_agg(question_id::text || ':' || points || ':' || array_to_string(option_ids, ','), ';'
+                          ORDER BY question_index))::uuid AS layout_id,
+           array_agg(question_id ORDER BY question_index) AS question_ids,
+           jsonb_agg(to_jsonb(option_ids) ORDER BY question_index) AS option_ids,
+           array_agg(points ORDER BY question_index) AS points,
+           array_agg((array_position(option_ids, selected_option_id) - 1)::smallint
+                     ORDER BY question_index) AS answer_options,
+           string_agg(CASE WHEN is_correct THEN '1' ELSE '0' END, '' ORDER BY question_index)::varbit AS correct_bits
+    FROM compact_answers
+    GROUP BY attempt_id, quiz_id;
+
+    INSERT INTO quiz_answer_layouts (id, quiz_id, question_ids, option_ids, points)
+    SELECT DISTINCT ON (layout_id) layout_id, quiz_id, question_ids, option_ids, points
+    FROM compact_encoded
+    ON CONFLICT (id) DO NOTHING;
+
+    UPDATE quiz_attempts a
+    SET layout_id = e.layout_id, answer_options = e.answer_options, correct_bits = e.correct_bits
+    FROM compact_encoded e
+    WHERE a.id = e.attempt_id;
+    GET DIAGNOSTICS converted = ROW_COUNT;
+
+    DELETE FROM quiz_attempt_answers x USING compact_encoded e WHERE x.attempt_id = e.attempt_id;
+
+    RETURN converted;
+END;
+$$;
+
+-- Verify the migration
+SELECT count(*) FILTER (WHERE layout_id IS NOT NULL) AS compact_attempts,
+       count(*) FILTER (WHERE layout_id IS NULL) AS row_attempts
+FROM quiz_attempts;
@@ -0,0 +1,126 @@
+-- Migration: Deep-clone a course (chapters, lessons, quizzes, questions, options) in one transaction
+-- Run this in Supabase SQL Editor
+-- Every level is copied with a single INSERT ... SELECT through old->new id maps, so the
+-- cost is one round trip regardless of course size. The copy starts as a Draft.
+-- Lesson MDX files are copied by the API afterwards; the function returns the
+-- source lesson and source/destination pair of each (the API deletes the clone
+-- again if a copy fails). Images (hashed or in legacy lesson/quiz folders) are
+-- shared, not copied: deleting the source no longer removes them, and the storage
+-- GC only drops objects that no lesson outline or quiz image_url references.
+
+CREATE OR REPLACE FUNCTION clone_course(
+    source_id UUID,
+    new_title TEXT DEFAULT NULL,
+    new_slug TEXT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    source courses%ROWTYPE;
+    target_id UUID := gen_random_uuid();
+    target_slug TEXT := new_slug;
+    lesson_suffix TEXT;
+    attempt INTEGER := 1;
+    counts JSONB;
+    files JSONB;
+BEGIN
+    SELECT * INTO source FROM courses WHERE id = source_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Course % not found', source_id USING ERRCODE = 'P0002';
+    END IF;
+
+    -- Course slugs are unique: "<slug>-copy", then "<slug>-copy-2", ...
+    IF target_slug IS NULL THEN
+        LOOP
+            target_slug := source.slug || '-copy' || CASE WHEN attempt > 1 THEN '-' || attempt ELSE '' END;
+            EXIT WHEN NOT EXISTS (SELECT 1 FROM courses WHERE slug = target_slug);
+            attempt := attempt + 1;
+        END LOOP;
+        lesson_suffix := substr(target_slug, length(source.slug) + 2);
+    ELSE
+        lesson_suffix := target_slug;
+    END IF;
+
+    INSERT INTO courses (id, title, slug, description, small_description, cover_image, status, file_key)
+    VALUES (
+        target_id, coalesce(new_title, source.title || ' (Copy)'), target_slug,
+        source.description, source.small_description, source.cover_image, 'Draft', source.file_key
+    );
+
+    -- old id -> new id maps (dropped at commit)
+    DROP TABLE IF EXISTS clone_chapter_map, clone_lesson_map, clone_quiz_map, clone_question_map;
+
+    CREATE TEMP TABLE clone_chapter_map ON COMMIT DROP AS
+    SELECT id AS old_id, gen_random_uuid() AS new_id FROM chapters WHERE course_id = source_id;
+
+    CREATE TEMP TABLE clone_lesson_map ON COMMIT DROP AS
+    SELECT l.id AS old_id, gen_random_uuid() AS new_id
+    FROM lessons l JOIN clone_chapter_map m ON m.old_id = l.chapter_id;
+
+    CREATE TEMP TABLE clone_quiz_map ON COMMIT DROP AS
+    SELECT id AS old_id, gen_random_uuid() AS new_id FROM quizzes WHERE course_id = source_id;
+
+    CREATE TEMP TABLE clone_question_map ON COMMIT DROP AS
+    SELECT q.id AS old_id, gen_random_uuid() AS new_id
+    FROM quiz_questions q JOIN clone_quiz_map m ON m.old_id = q.quiz_id;
+
+    -- Chapter slugs are unique per course, so they carry over unchanged
+    INSERT INTO chapters (id, course_id, title, slug, position, sort_key, status)
+    SELECT m.new_id, target_id, c.title, c.slug, c.position, c.sort_key, 'Draft'
+    FROM chapters c JOIN clone_chapter_map m ON m.old_id = c.id;
+
+    -- Lesson slugs are globally unique: "<slug>-<suffix>", falling back to a short id on collision
+    INSERT INTO lessons (
+        id, chapter_id, title, slug, label, type, author_name, published_at, position, sort_key,
+        status, mdx_path, video_key, thumbnail_key, views, content_hash, content_outline, content_text
+    )
+    SELECT
+        lm.new_id, cm.new_id, l.title,
+        CASE WHEN EXISTS (SELECT 1 FROM lessons o WHERE o.slug = l.slug || '-' || lesson_suffix)
+             THEN l.slug || '-' || lesson_suffix || '-' || left(lm.new_id::text, 8)
+             ELSE l.slug || '-' || lesson_suffix
+        END,
+        l.label, l.type, l.author_name, l.published_at, l.position, l.sort_key,
+        'Draft', CASE WHEN l.mdx_path IS NOT NULL THEN lm.new_id || '.mdx' END,
+        l.video_key, l.thumbnail_key, 0, l.content_hash, l.content_outline, l.content_text
+    FROM lessons l
+    JOIN clone_lesson_map lm ON lm.old_id = l.id
+    JOIN clone_chapter_map cm ON cm.old_id = l.chapter_id;
+
+    INSERT INTO quizzes (id, course_id, chapter_id, title, description, status, passing_score_percent)
+    SELECT m.new_id, target_id, cm.new_id, q.title, q.description, 'Draft', q.passing_score_percent
+    FROM quizzes q
+    JOIN clone_quiz_map m ON m.old_id = q.id
+    LEFT JOIN clone_chapter_map cm ON cm.old_id = q.chapter_id;
+
+    INSERT INTO quiz_questions (id, quiz_id, position, sort_key, prompt, points, image_url)
+    SELECT m.new_id, qm.new_id, q.position, q.sort_key, q.prompt, q.points, q.image_url
+    FROM quiz_questions q
+    JOIN clone_question_map m ON m.old_id = q.id
+    JOIN clone_quiz_map qm ON qm.old_id = q.quiz_id;
+
+    INSERT INTO quiz_options (question_id, position, sort_key, content, is_correct, image_url)
+    SELECT m.new_id, o.position, o.sort_key, o.content, o.is_correct, o.image_url
+    FROM quiz_options o JOIN clone_question_map m ON m.old_id = o.question_id;
+
+    SELECT coalesce(jsonb_agg(jsonb_build_object(
+        'lesson_id', l.id, 'source', l.mdx_path, 'destination', m.new_id || '.mdx'
+    )), '[]'::jsonb)
+    INTO files
+    FROM lessons l JOIN clone_lesson_map m ON m.old_id = l.id
+    WHERE l.mdx_path IS NOT NULL;
+
+    SELECT jsonb_build_object(
+        'chapters', (SELECT count(*) FROM clone_chapter_map),
+        'lessons', (SELECT count(*) FROM clone_lesson_map),
+        'quizzes', (SELECT count(*) FROM clone_quiz_map),
+        'questions', (SELECT count(*) FROM clone_question_map)
+    ) INTO counts;
+
+    RETURN jsonb_build_object('course_id', target_id, 'slug', target_slug, 'counts', counts, 'files', files);
+END;
+$$;
+
+-- Verify the migration
+SELECT proname FROM pg_proc WHERE proname = 'clone_course';
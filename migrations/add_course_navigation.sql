@@ -0,0 +1,147 @@
+-- Migration: Precomputed per-course navigation index
+-- Run this in Supabase SQL Editor
+-- course_nav_index holds every lesson of a course flattened in reading order (chapter
+-- sort key, then lesson sort key) with its 1-based ordinal, plus chapter boundaries.
+-- Statement-level triggers rebuild the affected courses once per statement whenever
+-- lessons or chapters are created, deleted, moved or reordered, so prev/next and
+-- progress positions never need the whole tree at read time.
+
+-- 1. One row per course
+CREATE TABLE IF NOT EXISTS course_nav_index (
+    course_id UUID PRIMARY KEY REFERENCES courses(id) ON DELETE CASCADE,
+    -- [{"id", "slug", "title", "first_ordinal", "lesson_count"}]
+    chapters JSONB NOT NULL DEFAULT '[]'::jsonb,
+    -- [{"id", "chapter_id", "slug", "title", "type", "status", "ordinal"}]
+    lessons JSONB NOT NULL DEFAULT '[]'::jsonb,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- 2. Rebuild the index of the given courses (missing courses are skipped)
+CREATE OR REPLACE FUNCTION rebuild_course_nav(target_ids UUID[])
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH ordered AS MATERIALIZED (
+        SELECT l.id, l.chapter_id, l.slug, l.title, l.type, l.status, ch.course_id,
+               row_number() OVER (
+                   PARTITION BY ch.course_id
+                   ORDER BY ch.sort_key, ch.id, l.sort_key, l.id
+               ) AS ordinal
+        FROM lessons l JOIN chapters ch ON ch.id = l.chapter_id
+        WHERE ch.course_id = ANY(target_ids)
+    ),
+    upserted AS (
+        INSERT INTO course_nav_index AS nav (course_id, chapters, lessons, updated_at)
+        SELECT c.id,
+            (
+                SELECT coalesce(jsonb_agg(jsonb_build_object(
+                    'id', ch.id, 'slug', ch.slug, 'title', ch.title,
+                    'first_ordinal', (SELECT min(o.ordinal) FROM ordered o WHERE o.chapter_id = ch.id),
+                    'lesson_count', (SELECT count(*) FROM ordered o WHERE o.chapter_id = ch.id)
+                ) ORDER BY ch.sort_key, ch.id), '[]'::jsonb)
+                FROM chapters ch WHERE ch.course_id = c.id
+            ),
+            (
+                SELECT coalesce(jsonb_agg(jsonb_build_object(
+                    'id', o.id, 'chapter_id', o.chapter_id, 'slug', o.slug, 'title', o.title,
+                    'type', o.type, 'status', o.status, 'ordinal', o.ordinal
+                ) ORDER BY o.ordinal), '[]'::jsonb)
+                FROM ordered o WHERE o.course_id = c.id
+            ),
+            now()
+        FROM courses c
+        WHERE c.id = ANY(target_ids)
+        ON CONFLICT (course_id) DO UPDATE
+        SET chapters = EXCLUDED.chapters, lessons = EXCLUDED.lessons,
+            version = nav.version + 1, updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM upserted;
+$$;
+
+-- 3. Lessons: rebuild the courses of inserted/deleted rows, and of updated rows whose
+-- position, chapter or navigation fields changed (other updates are ignored)
+CREATE OR REPLACE FUNCTION lessons_refresh_course_nav()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM rebuild_course_nav(ARRAY(
+            SELECT DISTINCT ch.course_id FROM new_rows n JOIN chapters ch ON ch.id = n.chapter_id
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM rebuild_course_nav(ARRAY(
+            SELECT DISTINCT ch.course_id FROM old_rows o JOIN chapters ch ON ch.id = o.chapter_id
+        ));
+    ELSE
+        PERFORM rebuild_course_nav(ARRAY(
+            SELECT DISTINCT ch.course_id
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            JOIN chapters ch ON ch.id IN (n.chapter_id, o.chapter_id)
+            WHERE (n.chapter_id, n.sort_key, n.position, n.slug, n.title, n.type, n.status)
+                IS DISTINCT FROM (o.chapter_id, o.sort_key, o.position, o.slug, o.title, o.type, o.status)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS lessons_course_nav_insert ON lessons;
+CREATE TRIGGER lessons_course_nav_insert AFTER INSERT ON lessons
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION lessons_refresh_course_nav();
+
+DROP TRIGGER IF EXISTS lessons_course_nav_update ON lessons;
+CREATE TRIGGER lessons_course_nav_update AFTER UPDATE ON lessons
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION lessons_refresh_course_nav();
+
+DROP TRIGGER IF EXISTS lessons_course_nav_delete ON lessons;
+CREATE TRIGGER lessons_course_nav_delete AFTER DELETE ON lessons
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION lessons_refresh_course_nav();
+
+-- 4. Chapters: same for chapter boundaries (deleting a chapter also removes its lessons)
+CREATE OR REPLACE FUNCTION chapters_refresh_course_nav()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM rebuild_course_nav(ARRAY(SELECT DISTINCT course_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM rebuild_course_nav(ARRAY(SELECT DISTINCT course_id FROM old_rows));
+    ELSE
+        PERFORM rebuild_course_nav(ARRAY(
+            SELECT DISTINCT unnest(ARRAY[n.course_id, o.course_id])
+            FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE (n.course_id, n.sort_key, n.position, n.slug, n.title)
+                IS DISTINCT FROM (o.course_id, o.sort_key, o.position, o.slug, o.title)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chapters_course_nav_insert ON chapters;
+CREATE TRIGGER chapters_course_nav_insert AFTER INSERT ON chapters
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION chapters_refresh_course_nav();
+
+DROP TRIGGER IF EXISTS chapters_course_nav_update ON chapters;
+CREATE TRIGGER chapters_course_nav_update AFTER UPDATE ON chapters
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION chapters_refresh_course_nav();
+
+DROP TRIGGER IF EXISTS chapters_course_nav_delete ON chapters;
+CREATE TRIGGER chapters_course_nav_delete AFTER DELETE ON chapters
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION chapters_refresh_course_nav();
+
+-- 5. Backfill existing courses
+SELECT rebuild_course_nav(ARRAY(SELECT id FROM courses));
+
+-- Verify the migration
+SELECT course_id, jsonb_array_length(lessons) AS lessons, version FROM course_nav_index LIMIT 5;
@@ -0,0 +1,99 @@
+-- Migration: Publish a whole course (chapters, lessons, quizzes) in one transaction
+-- Run this in Supabase SQL Editor
+-- Readers never see a half-published tree: validation and every status change happen
+-- in a single statement batch under a row lock on the course. The same transaction
+-- enqueues one 'course.published' job, which rebuilds derived representations.
+
+-- 1. When the course was last published, and an id for that publish. Work derived
+-- from one publish (snapshots) is only stored while publish_version still matches.
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS published_at TIMESTAMP WITH TIME ZONE NULL;
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS publish_version UUID NULL;
+
+-- 2. Problems that block publishing: [{"kind", "id", "title", "problem"}]
+CREATE OR REPLACE FUNCTION course_publish_problems(target_id UUID)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT coalesce(jsonb_agg(p), '[]'::jsonb) FROM (
+        SELECT 'course' AS kind, c.id, c.title, 'Course has no chapters' AS problem
+        FROM courses c
+        WHERE c.id = target_id AND NOT EXISTS (SELECT 1 FROM chapters ch WHERE ch.course_id = c.id)
+        UNION ALL
+        SELECT 'chapter', ch.id, ch.title, 'Chapter has no lessons'
+        FROM chapters ch
+        WHERE ch.course_id = target_id AND NOT EXISTS (SELECT 1 FROM lessons l WHERE l.chapter_id = ch.id)
+        UNION ALL
+        SELECT 'lesson', l.id, l.title, 'Theory lesson has no content'
+        FROM lessons l JOIN chapters ch ON ch.id = l.chapter_id
+        WHERE ch.course_id = target_id AND l.type = 'Theory' AND l.mdx_path IS NULL
+        UNION ALL
+        SELECT 'quiz', q.id, q.title, 'Quiz has no questions'
+        FROM quizzes q
+        WHERE q.course_id = target_id AND q.status <> 'Archived'
+          AND NOT EXISTS (SELECT 1 FROM quiz_questions qq WHERE qq.quiz_id = q.id)
+        UNION ALL
+        SELECT 'question', qq.id, qq.prompt, 'Question needs at least two options and one correct answer'
+        FROM quiz_questions qq JOIN quizzes q ON q.id = qq.quiz_id
+        WHERE q.course_id = target_id AND q.status <> 'Archived'
+          AND (
+              (SELECT count(*) FROM quiz_options o WHERE o.question_id = qq.id) < 2
+              OR NOT EXISTS (SELECT 1 FROM quiz_options o WHERE o.question_id = qq.id AND o.is_correct)
+          )
+    ) p;
+$$;
+
+-- 3. Validate and publish; returns {"published", "problems", "published_at", "version", "counts"}
+CREATE OR REPLACE FUNCTION publish_course(target_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    problems JSONB;
+    stamp TIMESTAMP WITH TIME ZONE := now();
+    version UUID := gen_random_uuid();
+    chapter_count INTEGER;
+    lesson_count INTEGER;
+    quiz_count INTEGER;
+BEGIN
+    -- Serialise concurrent publishes/edits of the same course
+    PERFORM 1 FROM courses WHERE id = target_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Course % not found', target_id USING ERRCODE = 'P0002';
+    END IF;
+
+    problems := course_publish_problems(target_id);
+    IF jsonb_array_length(problems) > 0 THEN
+        RETURN jsonb_build_object('published', false, 'problems', problems);
+    END IF;
+
+    UPDATE chapters SET status = 'Published', updated_at = stamp
+    WHERE course_id = target_id;
+    GET DIAGNOSTICS chapter_count = ROW_COUNT;
+
+    UPDATE lessons l SET status = 'Published', published_at = coalesce(l.published_at, stamp::date), updated_at = stamp
+    FROM chapters ch
+    WHERE ch.id = l.chapter_id AND ch.course_id = target_id;
+    GET DIAGNOSTICS lesson_count = ROW_COUNT;
+
+    UPDATE quizzes SET status = 'Published', published_at = stamp, updated_at = stamp
+    WHERE course_id = target_id AND status <> 'Archived';
+    GET DIAGNOSTICS quiz_count = ROW_COUNT;
+
+    UPDATE courses SET status = 'Published', published_at = stamp, publish_version = version, updated_at = stamp
+    WHERE id = target_id;
+
+    INSERT INTO background_jobs (kind, payload)
+    VALUES ('course.published', jsonb_build_object('course_id', target_id, 'published_at', stamp, 'version', version));
+
+    RETURN jsonb_build_object(
+        'published', true,
+        'problems', '[]'::jsonb,
+        'published_at', stamp,
+        'version', version,
+        'counts', jsonb_build_object('chapters', chapter_count, 'lessons', lesson_count, 'quizzes', quiz_count)
+    );
+END;
+$$;
+
+-- Verify the migration
+SELECT proname FROM pg_proc WHERE proname IN ('course_publish_problems', 'publish_course');
@@ -0,0 +1,65 @@
+-- Migration: Immutable JSON snapshots of published course trees
+-- Run this in Supabase SQL Editor
+-- Publishing renders the course and its quizzes into content-hashed objects in the
+-- public 'course-snapshots' bucket; courses.snapshot points at the current pair.
+
+-- 1. Pointer: {"published_at", "version", "course": {"path", "etag", "size"}, "quizzes": {...}}
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS snapshot JSONB NULL;
+
+-- 2. Public bucket for the snapshot objects (Supabase Storage)
+DO $$
+BEGIN
+    IF to_regclass('storage.buckets') IS NOT NULL THEN
+        INSERT INTO storage.buckets (id, name, public)
+        VALUES ('course-snapshots', 'course-snapshots', true)
+        ON CONFLICT (id) DO NOTHING;
+    END IF;
+END;
+$$;
+
+-- 3. Keep current snapshots out of storage garbage collection
+CREATE OR REPLACE FUNCTION storage_references()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT jsonb_build_object(
+        -- Paths inside the lesson-content bucket
+        'lesson_content', (
+            SELECT coalesce(jsonb_agg(DISTINCT mdx_path), '[]'::jsonb)
+            FROM lessons WHERE mdx_path IS NOT NULL
+        ),
+        -- Public/signed storage URLs (lesson MDX images, quiz images, course covers)
+        'urls', (
+            SELECT coalesce(jsonb_agg(DISTINCT url), '[]'::jsonb)
+            FROM (
+                SELECT jsonb_array_elements_text(content_outline -> 'images') AS url
+                FROM lessons WHERE content_outline ? 'images'
+                UNION SELECT image_url FROM quiz_questions WHERE image_url IS NOT NULL
+                UNION SELECT image_url FROM quiz_options WHERE image_url IS NOT NULL
+                UNION SELECT cover_image FROM courses WHERE cover_image IS NOT NULL
+            ) refs
+        ),
+        -- Raw object keys (course file_key in the R2 bucket)
+        'keys', (
+            SELECT coalesce(jsonb_agg(DISTINCT file_key), '[]'::jsonb)
+            FROM courses WHERE file_key IS NOT NULL
+        ),
+        -- Paths inside the course-snapshots bucket
+        'snapshots', (
+            SELECT coalesce(jsonb_agg(path), '[]'::jsonb)
+            FROM (
+                SELECT snapshot -> 'course' ->> 'path' AS path FROM courses WHERE snapshot IS NOT NULL
+                UNION SELECT snapshot -> 'quizzes' ->> 'path' FROM courses WHERE snapshot IS NOT NULL
+            ) refs
+        ),
+        -- Lessons whose MDX image references are unknown (never analysed)
+        'unanalyzed_lessons', (
+            SELECT count(*) FROM lessons
+            WHERE mdx_path IS NOT NULL AND content_outline IS NULL
+        )
+    );
+$$;
+
+-- Verify the migration
+SELECT column_name, data_type FROM information_schema.columns
+WHERE table_name = 'courses' AND column_name = 'snapshot';
@@ -0,0 +1,437 @@
+-- Migration: Fractional (gap-based) ordering keys for chapters, lessons, quiz questions and options
+-- Run this in Supabase SQL Editor
+-- Siblings are ordered by sort_key (base-62 strings compared bytewise). Moving a row
+-- writes a key between its new neighbours, so a move touches exactly one row.
+-- The integer position column is kept for compatibility but nothing orders by it:
+-- the API reports each row's ordinal there, and /reorder and the rebalance job
+-- write the ordinals back.
+
+-- 1. Key generation
+-- A key strictly between lower_key and upper_key (NULL = open end). Keys never end in
+-- '0', so there is always room before any key; an all-'0' upper key is rejected.
+CREATE OR REPLACE FUNCTION ordering_key_between(lower_key TEXT, upper_key TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    a TEXT := coalesce(lower_key, '');
+    b TEXT := upper_key;
+    prefix TEXT := '';
+    n INTEGER;
+    digit_a INTEGER;
+    digit_b INTEGER;
+BEGIN
+    IF b IS NOT NULL AND a COLLATE "C" >= b COLLATE "C" THEN
+        RAISE EXCEPTION 'ordering key % is not below %', a, b USING ERRCODE = '22023';
+    END IF;
+    IF b IS NOT NULL AND rtrim(b, '0') = '' THEN
+        RAISE EXCEPTION 'no ordering key sorts below %', b USING ERRCODE = '22023';
+    END IF;
+
+    LOOP
+        IF b IS NOT NULL THEN
+            -- Carry over the shared prefix (a is implicitly padded with '0')
+            n := 0;
+            WHILE n < length(b) AND coalesce(nullif(substr(a, n + 1, 1), ''), '0') = substr(b, n + 1, 1) LOOP
+                n := n + 1;
+            END LOOP;
+            prefix := prefix || substr(b, 1, n);
+            a := substr(a, n + 1);
+            b := substr(b, n + 1);
+        END IF;
+
+        digit_a := CASE WHEN a = '' THEN 0 ELSE strpos(digits, substr(a, 1, 1)) - 1 END;
+
+        IF b IS NULL THEN
+            -- Appending: step the first digit up rather than halving the gap,
+            -- so runs of appends grow keys by one character per ~30-60 rows
+            IF a = '' AND lower_key IS NULL THEN
+                RETURN prefix || 'V';  -- Open on both sides: start mid-range
+            END IF;
+            IF digit_a < 61 THEN
+                RETURN prefix || substr(digits, digit_a + 2, 1);
+            END IF;
+        ELSE
+            digit_b := strpos(digits, substr(b, 1, 1)) - 1;
+            IF lower_key IS NULL AND digit_b > 1 THEN
+                -- Prepending: step down, the mirror image of appending
+                RETURN prefix || substr(digits, digit_b, 1);
+            END IF;
+            IF digit_b - digit_a > 1 THEN
+                RETURN prefix || substr(digits, (digit_a + digit_b) / 2 + 1, 1);
+            END IF;
+            IF length(b) > 1 THEN
+                RETURN prefix || substr(b, 1, 1);
+            END IF;
+        END IF;
+
+        -- Adjacent digits: keep a's digit and look for room after it
+        prefix := prefix || substr(digits, digit_a + 1, 1);
+        a := substr(a, 2);
+        b := NULL;
+    END LOOP;
+END;
+$$;
+
+-- Evenly spaced key for the idx-th (1-based) of total rows, leaving gaps on both ends
+CREATE OR REPLACE FUNCTION ordering_key_at(idx BIGINT, total BIGINT)
+RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz';
+    width INTEGER := 1;
+    value BIGINT;
+    key TEXT := '';
+BEGIN
+    -- About 62 free slots between neighbours
+    WHILE power(62::numeric, width) < (total + 1) * 62 LOOP
+        width := width + 1;
+    END LOOP;
+    value := (power(62::numeric, width) / (total + 1))::bigint * idx;
+    FOR i IN 1..width LOOP
+        key := substr(digits, (value % 62)::integer + 1, 1) || key;
+        value := value / 62;
+    END LOOP;
+    RETURN rtrim(key, '0');
+END;
+$$;
+
+-- Parent column of each ordered table
+CREATE OR REPLACE FUNCTION ordering_parent_column(table_name TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT CASE table_name
+        WHEN 'chapters' THEN 'course_id'
+        WHEN 'lessons' THEN 'chapter_id'
+        WHEN 'quiz_questions' THEN 'quiz_id'
+        WHEN 'quiz_options' THEN 'question_id'
+    END;
+$$;
+
+-- 2. Columns, backfilled from the current positions
+ALTER TABLE chapters ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+ALTER TABLE quiz_questions ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+ALTER TABLE quiz_options ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+
+UPDATE chapters t SET sort_key = ordering_key_at(r.idx, r.total)
+FROM (
+    SELECT id, row_number() OVER w AS idx, count(*) OVER (PARTITION BY course_id) AS total
+    FROM chapters WINDOW w AS (PARTITION BY course_id ORDER BY position, created_at, id)
+) r
+WHERE t.id = r.id AND t.sort_key IS NULL;
+
+UPDATE lessons t SET sort_key = ordering_key_at(r.idx, r.total)
+FROM (
+    SELECT id, row_number() OVER w AS idx, count(*) OVER (PARTITION BY chapter_id) AS total
+    FROM lessons WINDOW w AS (PARTITION BY chapter_id ORDER BY position, created_at, id)
+) r
+WHERE t.id = r.id AND t.sort_key IS NULL;
+
+UPDATE quiz_questions t SET sort_key = ordering_key_at(r.idx, r.total)
+FROM (
+    SELECT id, row_number() OVER w AS idx, count(*) OVER (PARTITION BY quiz_id) AS total
+    FROM quiz_questions WINDOW w AS (PARTITION BY quiz_id ORDER BY position, created_at, id)
+) r
+WHERE t.id = r.id AND t.sort_key IS NULL;
+
+UPDATE quiz_options t SET sort_key = ordering_key_at(r.idx, r.total)
+FROM (
+    SELECT id, row_number() OVER w AS idx, count(*) OVER (PARTITION BY question_id) AS total
+    FROM quiz_options WINDOW w AS (PARTITION BY question_id ORDER BY position, id)
+) r
+WHERE t.id = r.id AND t.sort_key IS NULL;
+
+CREATE INDEX IF NOT EXISTS chapters_course_sort_key_idx ON chapters (course_id, sort_key);
+CREATE INDEX IF NOT EXISTS lessons_chapter_sort_key_idx ON lessons (chapter_id, sort_key);
+CREATE INDEX IF NOT EXISTS quiz_questions_quiz_sort_key_idx ON quiz_questions (quiz_id, sort_key);
+CREATE INDEX IF NOT EXISTS quiz_options_question_sort_key_idx ON quiz_options (question_id, sort_key);
+
+-- Keys grow when one gap is split (or extended) repeatedly; past 10 characters the
+-- siblings are respaced by the background job worker
+CREATE OR REPLACE FUNCTION enqueue_ordering_rebalance(table_name TEXT, parent_id UUID, new_key TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO background_jobs (kind, payload)
+    SELECT 'ordering.rebalance', jsonb_build_object('table', table_name, 'parent_id', parent_id)
+    WHERE length(new_key) > 10 AND NOT EXISTS (
+        SELECT 1 FROM background_jobs
+        WHERE kind = 'ordering.rebalance' AND status = 'pending'
+          AND payload = jsonb_build_object('table', table_name, 'parent_id', parent_id)
+    );
+$$;
+
+-- 3. New rows are appended after their last sibling unless a key is supplied
+CREATE OR REPLACE FUNCTION assign_sort_key()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent_column TEXT := ordering_parent_column(TG_TABLE_NAME);
+    parent_id UUID := (to_jsonb(NEW) ->> parent_column)::uuid;
+    last_key TEXT;
+BEGIN
+    IF NEW.sort_key IS NULL THEN
+        -- Serialise concurrent appends to the same parent so keys stay unique
+        PERFORM pg_advisory_xact_lock(hashtext(TG_TABLE_NAME || ':' || parent_id::text));
+        EXECUTE format('SELECT max(sort_key) FROM %I WHERE %I = $1', TG_TABLE_NAME, parent_column)
+        INTO last_key USING parent_id;
+        NEW.sort_key := ordering_key_between(last_key, NULL);
+        PERFORM enqueue_ordering_rebalance(TG_TABLE_NAME, parent_id, NEW.sort_key);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chapters_assign_sort_key ON chapters;
+CREATE TRIGGER chapters_assign_sort_key BEFORE INSERT ON chapters
+FOR EACH ROW EXECUTE FUNCTION assign_sort_key();
+
+DROP TRIGGER IF EXISTS lessons_assign_sort_key ON lessons;
+CREATE TRIGGER lessons_assign_sort_key BEFORE INSERT ON lessons
+FOR EACH ROW EXECUTE FUNCTION assign_sort_key();
+
+DROP TRIGGER IF EXISTS quiz_questions_assign_sort_key ON quiz_questions;
+CREATE TRIGGER quiz_questions_assign_sort_key BEFORE INSERT ON quiz_questions
+FOR EACH ROW EXECUTE FUNCTION assign_sort_key();
+
+DROP TRIGGER IF EXISTS quiz_options_assign_sort_key ON quiz_options;
+CREATE TRIGGER quiz_options_assign_sort_key BEFORE INSERT ON quiz_options
+FOR EACH ROW EXECUTE FUNCTION assign_sort_key();
+
+ALTER TABLE chapters ALTER COLUMN sort_key SET NOT NULL;
+ALTER TABLE lessons ALTER COLUMN sort_key SET NOT NULL;
+ALTER TABLE quiz_questions ALTER COLUMN sort_key SET NOT NULL;
+ALTER TABLE quiz_options ALTER COLUMN sort_key SET NOT NULL;
+
+-- 4. Move one row before/after a sibling (or to the end of parent_id).
+--    Only lessons may change parent. Returns the row with position set to its new ordinal.
+CREATE OR REPLACE FUNCTION move_ordered_row(
+    table_name TEXT,
+    row_id UUID,
+    before_id UUID DEFAULT NULL,
+    after_id UUID DEFAULT NULL,
+    parent_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent_column TEXT := ordering_parent_column(table_name);
+    current_parent UUID;
+    target_parent UUID;
+    anchor_parent UUID;
+    anchor_key TEXT;
+    lower_key TEXT;
+    upper_key TEXT;
+    new_key TEXT;
+    moved JSONB;
+    ordinal BIGINT;
+BEGIN
+    IF parent_column IS NULL THEN
+        RAISE EXCEPTION 'table % is not ordered', table_name USING ERRCODE = '22023';
+    END IF;
+    IF before_id IS NOT NULL AND after_id IS NOT NULL THEN
+        RAISE EXCEPTION 'pass before_id or after_id, not both' USING ERRCODE = '22023';
+    END IF;
+
+    EXECUTE format('SELECT %I FROM %I WHERE id = $1', parent_column, table_name)
+    INTO current_parent USING row_id;
+    IF current_parent IS NULL THEN
+        RAISE EXCEPTION 'row % not found', row_id USING ERRCODE = 'P0002';
+    END IF;
+
+    IF coalesce(before_id, after_id) IS NOT NULL THEN
+        IF coalesce(before_id, after_id) = row_id THEN
+            RAISE EXCEPTION 'cannot move a row relative to itself' USING ERRCODE = '22023';
+        END IF;
+        EXECUTE format('SELECT %I, sort_key FROM %I WHERE id = $1', parent_column, table_name)
+        INTO anchor_parent, anchor_key USING coalesce(before_id, after_id);
+        IF anchor_parent IS NULL THEN
+            RAISE EXCEPTION 'sibling % not found', coalesce(before_id, after_id) USING ERRCODE = 'P0002';
+        END IF;
+        target_parent := anchor_parent;
+    ELSE
+        target_parent := coalesce(parent_id, current_parent);
+    END IF;
+
+    IF target_parent <> current_parent AND table_name <> 'lessons' THEN
+        RAISE EXCEPTION 'rows of % cannot change parent', table_name USING ERRCODE = '22023';
+    END IF;
+
+    -- Same lock as the insert trigger: one writer per sibling list at a time
+    PERFORM pg_advisory_xact_lock(hashtext(table_name || ':' || target_parent::text));
+
+    IF before_id IS NOT NULL THEN
+        upper_key := anchor_key;
+        EXECUTE format(
+            'SELECT max(sort_key) FROM %I WHERE %I = $1 AND sort_key < $2 AND id <> $3',
+            table_name, parent_column
+        ) INTO lower_key USING target_parent, anchor_key, row_id;
+    ELSIF after_id IS NOT NULL THEN
+        lower_key := anchor_key;
+        EXECUTE format(
+            'SELECT min(sort_key) FROM %I WHERE %I = $1 AND sort_key > $2 AND id <> $3',
+            table_name, parent_column
+        ) INTO upper_key USING target_parent, anchor_key, row_id;
+    ELSE
+        EXECUTE format('SELECT max(sort_key) FROM %I WHERE %I = $1 AND id <> $2', table_name, parent_column)
+        INTO lower_key USING target_parent, row_id;
+    END IF;
+
+    new_key := ordering_key_between(lower_key, upper_key);
+
+    EXECUTE format(
+        'UPDATE %I SET sort_key = $1, %I = $2 WHERE id = $3 RETURNING to_jsonb(%I.*)',
+        table_name, parent_column, table_name
+    ) INTO moved USING new_key, target_parent, row_id;
+
+    PERFORM enqueue_ordering_rebalance(table_name, target_parent, new_key);
+
+    EXECUTE format('SELECT count(*) + 1 FROM %I WHERE %I = $1 AND sort_key < $2', table_name, parent_column)
+    INTO ordinal USING target_parent, new_key;
+    RETURN moved || jsonb_build_object('position', ordinal);
+END;
+$$;
+
+-- 5. Respace every sibling of one parent evenly and store ordinals in position
+CREATE OR REPLACE FUNCTION rebalance_ordering(table_name TEXT, parent_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent_column TEXT := ordering_parent_column(table_name);
+    updated INTEGER;
+BEGIN
+    IF parent_column IS NULL THEN
+        RAISE EXCEPTION 'table % is not ordered', table_name USING ERRCODE = '22023';
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext(table_name || ':' || parent_id::text));
+
+    -- quiz_options has UNIQUE (question_id, position); move positions out of the way first
+    IF table_name = 'quiz_options' THEN
+        UPDATE quiz_options SET position = -position - 1 WHERE question_id = parent_id;
+    END IF;
+
+    EXECUTE format($sql$
+        UPDATE %1$I t SET sort_key = ordering_key_at(r.idx, r.total), position = r.idx
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY sort_key, id) AS idx, count(*) OVER () AS total
+            FROM %1$I WHERE %2$I = $1
+        ) r
+        WHERE t.id = r.id
+    $sql$, table_name, parent_column) USING parent_id;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- 6. Apply client-side positions (legacy /reorder) in one call. The listed rows may be
+--    a subset of their siblings: each takes the requested 1-based slot among all of
+--    them, the rest keep their relative order and their keys, and the listed rows get
+--    keys between their new untouched neighbours. position is renumbered for every
+--    sibling so it matches the order again.
+DROP FUNCTION IF EXISTS set_ordering(TEXT, UUID[]);
+CREATE OR REPLACE FUNCTION set_ordering(table_name TEXT, ids UUID[], positions INTEGER[])
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent_column TEXT := ordering_parent_column(table_name);
+    parent_ids UUID[];
+    found INTEGER;
+    listed UUID[];
+    listed_positions INTEGER[];
+    untouched UUID[];
+    untouched_keys TEXT[];
+    final_ids UUID[] := '{}';
+    new_ids UUID[] := '{}';
+    new_keys TEXT[] := '{}';
+    i INTEGER := 1;
+    u INTEGER := 1;
+    slot INTEGER;
+    last_key TEXT;
+    new_key TEXT;
+    longest TEXT := '';
+BEGIN
+    IF parent_column IS NULL THEN
+        RAISE EXCEPTION 'table % is not ordered', table_name USING ERRCODE = '22023';
+    END IF;
+    IF cardinality(ids) IS DISTINCT FROM cardinality(positions) THEN
+        RAISE EXCEPTION 'ids and positions differ in length' USING ERRCODE = '22023';
+    END IF;
+    IF cardinality(ids) = 0 THEN
+        RETURN 0;
+    END IF;
+    IF (SELECT count(DISTINCT x) FROM unnest(ids) x) <> cardinality(ids) THEN
+        RAISE EXCEPTION 'a row is listed more than once' USING ERRCODE = '22023';
+    END IF;
+
+    EXECUTE format('SELECT array_agg(DISTINCT %I), count(*) FROM %I WHERE id = ANY($1)', parent_column, table_name)
+    INTO parent_ids, found USING ids;
+    IF found <> cardinality(ids) THEN
+        RAISE EXCEPTION 'row not found' USING ERRCODE = 'P0002';
+    END IF;
+    IF cardinality(parent_ids) > 1 THEN
+        RAISE EXCEPTION 'rows of one reorder must share a parent' USING ERRCODE = '22023';
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext(table_name || ':' || parent_ids[1]::text));
+
+    -- Requested order (ties keep the order they were sent in) and the untouched siblings
+    SELECT array_agg(o.id ORDER BY p.position, o.idx), array_agg(p.position ORDER BY p.position, o.idx)
+    INTO listed, listed_positions
+    FROM unnest(ids) WITH ORDINALITY AS o(id, idx)
+    JOIN unnest(positions) WITH ORDINALITY AS p(position, idx) ON p.idx = o.idx;
+
+    EXECUTE format(
+        'SELECT coalesce(array_agg(id ORDER BY sort_key, id), ''{}''), coalesce(array_agg(sort_key ORDER BY sort_key, id), ''{}'')
+         FROM %I WHERE %I = $1 AND NOT (id = ANY($2))',
+        table_name, parent_column
+    ) INTO untouched, untouched_keys USING parent_ids[1], ids;
+
+    -- Fill the slots in turn: a listed row takes the slot once its position is reached
+    -- (or when no untouched sibling is left), otherwise the next untouched sibling does
+    FOR slot IN 1..cardinality(listed) + cardinality(untouched) LOOP
+        IF i <= cardinality(listed) AND (listed_positions[i] <= slot OR u > cardinality(untouched)) THEN
+            new_key := ordering_key_between(last_key, untouched_keys[u]);
+            new_ids := new_ids || listed[i];
+            new_keys := new_keys || new_key;
+            final_ids := final_ids || listed[i];
+            IF length(new_key) > length(longest) THEN
+                longest := new_key;
+            END IF;
+            i := i + 1;
+        ELSE
+            new_key := untouched_keys[u];
+            final_ids := final_ids || untouched[u];
+            u := u + 1;
+        END IF;
+        last_key := new_key;
+    END LOOP;
+
+    -- quiz_options has UNIQUE (question_id, position); move positions out of the way first
+    IF table_name = 'quiz_options' THEN
+        UPDATE quiz_options SET position = -position - 1 WHERE question_id = parent_ids[1];
+    END IF;
+
+    EXECUTE format($sql$
+        UPDATE %1$I t SET sort_key = coalesce(k.sort_key, t.sort_key), position = f.idx
+        FROM unnest($1) WITH ORDINALITY AS f(id, idx)
+        LEFT JOIN unnest($2, $3) AS k(id, sort_key) ON k.id = f.id
+        WHERE t.id = f.id
+    $sql$, table_name) USING final_ids, new_ids, new_keys;
+
+    PERFORM enqueue_ordering_rebalance(table_name, parent_ids[1], longest);
+    RETURN cardinality(new_ids);
+END;
+$$;
+
+-- Verify the migration
+SELECT ordering_key_between(NULL, NULL) AS first_key,
+       ordering_key_between('V', 'W') AS between_adjacent,
+       ordering_key_at(1, 3) AS first_of_three;
@@ -0,0 +1,89 @@
+-- Migration: Full-text search over courses, chapters, lessons and lesson MDX text
+-- Run this in Supabase SQL Editor
+
+-- 1. Plain text extracted from lesson MDX (written by the API on upload)
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS content_text TEXT NULL;
+
+-- 2. Weighted tsvector columns, kept up to date by Postgres on every insert/update
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(small_description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED;
+
+ALTER TABLE chapters ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+) STORED;
+
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(label, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content_text, '')), 'D')
+) STORED;
+
+-- 3. GIN indexes
+CREATE INDEX IF NOT EXISTS courses_search_vector_idx ON courses USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS chapters_search_vector_idx ON chapters USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS lessons_search_vector_idx ON lessons USING GIN (search_vector);
+
+-- 4. Ranked, paginated search. Headlines are only computed for the returned page.
+CREATE OR REPLACE FUNCTION search_content(
+    search_query TEXT,
+    result_limit INTEGER DEFAULT 20,
+    result_offset INTEGER DEFAULT 0,
+    kinds TEXT[] DEFAULT ARRAY['course', 'chapter', 'lesson']
+)
+RETURNS TABLE (
+    kind TEXT,
+    id UUID,
+    course_id UUID,
+    chapter_id UUID,
+    title TEXT,
+    slug TEXT,
+    rank REAL,
+    headline TEXT,
+    total_count BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', search_query) AS query
+    ),
+    hits AS (
+        SELECT 'course'::text AS kind, c.id, c.id AS course_id, NULL::uuid AS chapter_id,
+               c.title, c.slug, ts_rank(c.search_vector, q.query) AS rank,
+               coalesce(c.description, c.small_description, '') AS body
+        FROM courses c, q
+        WHERE 'course' = ANY(kinds) AND c.search_vector @@ q.query
+        UNION ALL
+        SELECT 'chapter', ch.id, ch.course_id, ch.id,
+               ch.title, ch.slug, ts_rank(ch.search_vector, q.query), ''
+        FROM chapters ch, q
+        WHERE 'chapter' = ANY(kinds) AND ch.search_vector @@ q.query
+        UNION ALL
+        SELECT 'lesson', l.id, ch.course_id, l.chapter_id,
+               l.title, l.slug, ts_rank(l.search_vector, q.query), coalesce(l.content_text, '')
+        FROM lessons l JOIN chapters ch ON ch.id = l.chapter_id, q
+        WHERE 'lesson' = ANY(kinds) AND l.search_vector @@ q.query
+    ),
+    page AS (
+        SELECT hits.*, count(*) OVER () AS total_count
+        FROM hits
+        ORDER BY rank DESC, title
+        LIMIT result_limit OFFSET result_offset
+    )
+    SELECT page.kind, page.id, page.course_id, page.chapter_id, page.title, page.slug, page.rank,
+           ts_headline('english', page.title || ' ' || page.body, q.query,
+                       'MaxFragments=1, MaxWords=30, MinWords=10'),
+           page.total_count
+    FROM page, q
+    ORDER BY page.rank DESC, page.title;
+$$;
+
+-- Verify the migration
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE column_name IN ('search_vector', 'content_text');
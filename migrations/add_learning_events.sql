@@ -0,0 +1,202 @@
+-- Migration: Learning event ingestion (lesson opens, scroll depth, video progress, time on lesson)
+-- Run this in Supabase SQL Editor
+-- API instances buffer validated events and append them in bulk with one
+-- ingest_learning_events() call per flush. The raw table is append-only and
+-- partitioned by day of arrival, so rollups read only recent partitions and old
+-- days are dropped whole. rollup_learning_events() folds new events into
+-- per-lesson/day and per-user/lesson aggregates past a watermark.
+
+-- 1. Raw events, one partition per day of received_at
+CREATE TABLE IF NOT EXISTS learning_events (
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    user_id TEXT NOT NULL,
+    lesson_id UUID NOT NULL,
+    course_id UUID NULL,
+    session_id TEXT NULL,
+    -- open | scroll (value = depth 0-100) | video (value = position, seconds) | time (value = seconds)
+    kind TEXT NOT NULL CHECK (kind IN ('open', 'scroll', 'video', 'time')),
+    value REAL NULL
+) PARTITION BY RANGE (received_at);
+
+CREATE TABLE IF NOT EXISTS learning_events_default PARTITION OF learning_events DEFAULT;
+CREATE INDEX IF NOT EXISTS learning_events_received_at_idx ON learning_events USING BRIN (received_at);
+
+-- Daily partitions from today to days_ahead; existing ones are left alone
+CREATE OR REPLACE FUNCTION ensure_learning_event_partitions(days_ahead INTEGER DEFAULT 7)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    day DATE;
+    created INTEGER := 0;
+BEGIN
+    FOR day IN SELECT generate_series(current_date, current_date + days_ahead, interval '1 day')::date LOOP
+        IF to_regclass('learning_events_p' || to_char(day, 'YYYYMMDD')) IS NULL THEN
+            BEGIN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF learning_events FOR VALUES FROM (%L) TO (%L)',
+                    'learning_events_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+                );
+                created := created + 1;
+            EXCEPTION WHEN others THEN
+                -- The default partition already holds rows for that day; they stay there
+                RAISE NOTICE 'Partition for % not created: %', day, SQLERRM;
+            END;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+SELECT ensure_learning_event_partitions(7);
+
+-- 2. Bulk append. events is the API's compact wire format plus the batch fields:
+-- [{"k": kind, "l": lesson id, "t": epoch ms, "v": value, "u": user id, "c": course id, "s": session id}]
+CREATE OR REPLACE FUNCTION ingest_learning_events(events JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH inserted AS (
+        INSERT INTO learning_events (occurred_at, user_id, lesson_id, course_id, session_id, kind, value)
+        SELECT to_timestamp(e.t / 1000.0), e.u, e.l, e.c, e.s, e.k, e.v
+        FROM jsonb_to_recordset(events) AS e(k TEXT, l UUID, t BIGINT, v REAL, u TEXT, c UUID, s TEXT)
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM inserted;
+$$;
+
+-- 3. Aggregates
+CREATE TABLE IF NOT EXISTS lesson_event_rollups (
+    lesson_id UUID NOT NULL,
+    day DATE NOT NULL,  -- Day the events occurred
+    opens BIGINT NOT NULL DEFAULT 0,
+    time_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    scroll_samples BIGINT NOT NULL DEFAULT 0,
+    scroll_total DOUBLE PRECISION NOT NULL DEFAULT 0,  -- scroll_total / scroll_samples = average depth
+    video_events BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (lesson_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS user_lesson_progress (
+    user_id TEXT NOT NULL,
+    lesson_id UUID NOT NULL,
+    course_id UUID NULL,
+    opens BIGINT NOT NULL DEFAULT 0,
+    time_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_scroll REAL NULL,
+    max_video_position REAL NULL,
+    first_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, lesson_id)
+);
+CREATE INDEX IF NOT EXISTS user_lesson_progress_lesson_idx ON user_lesson_progress (lesson_id);
+
+-- Everything received up to rolled_up_to has been folded into the aggregates
+CREATE TABLE IF NOT EXISTS learning_event_rollup_state (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    rolled_up_to TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT '-infinity'
+);
+INSERT INTO learning_event_rollup_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- 4. Fold events received since the watermark into the aggregates. settle_seconds
+-- keeps the window behind still-open ingest transactions (received_at is their
+-- start time). Returns {"from", "to", "events", "lessons", "users"}.
+CREATE OR REPLACE FUNCTION rollup_learning_events(settle_seconds INTEGER DEFAULT 30)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    from_ts TIMESTAMP WITH TIME ZONE;
+    to_ts TIMESTAMP WITH TIME ZONE := now() - make_interval(secs => settle_seconds);
+    event_count INTEGER;
+    lesson_rows INTEGER;
+    user_rows INTEGER;
+BEGIN
+    PERFORM ensure_learning_event_partitions(7);
+
+    -- One rollup at a time
+    SELECT rolled_up_to INTO from_ts FROM learning_event_rollup_state WHERE id = 1 FOR UPDATE;
+    IF to_ts <= from_ts THEN
+        RETURN jsonb_build_object('from', from_ts, 'to', from_ts, 'events', 0, 'lessons', 0, 'users', 0);
+    END IF;
+
+    CREATE TEMP TABLE rollup_batch ON COMMIT DROP AS
+    SELECT * FROM learning_events WHERE received_at > from_ts AND received_at <= to_ts;
+    GET DIAGNOSTICS event_count = ROW_COUNT;
+
+    INSERT INTO lesson_event_rollups AS r (lesson_id, day, opens, time_seconds, scroll_samples, scroll_total, video_events)
+    SELECT lesson_id, (occurred_at AT TIME ZONE 'UTC')::date,
+           count(*) FILTER (WHERE kind = 'open'),
+           coalesce(sum(value) FILTER (WHERE kind = 'time'), 0),
+           count(*) FILTER (WHERE kind = 'scroll' AND value IS NOT NULL),
+           coalesce(sum(value) FILTER (WHERE kind = 'scroll'), 0),
+           count(*) FILTER (WHERE kind = 'video')
+    FROM rollup_batch
+    GROUP BY 1, 2
+    ON CONFLICT (lesson_id, day) DO UPDATE SET
+        opens = r.opens + EXCLUDED.opens,
+        time_seconds = r.time_seconds + EXCLUDED.time_seconds,
+        scroll_samples = r.scroll_samples + EXCLUDED.scroll_samples,
+        scroll_total = r.scroll_total + EXCLUDED.scroll_total,
+        video_events = r.video_events + EXCLUDED.video_events;
+    GET DIAGNOSTICS lesson_rows = ROW_COUNT;
+
+    INSERT INTO user_lesson_progress AS p (user_id, lesson_id, course_id, opens, time_seconds, max_scroll,
+                                           max_video_position, first_seen_at, last_seen_at)
+    SELECT user_id, lesson_id, max(course_id::text)::uuid,
+           count(*) FILTER (WHERE kind = 'open'),
+           coalesce(sum(value) FILTER (WHERE kind = 'time'), 0),
+           max(value) FILTER (WHERE kind = 'scroll'),
+           max(value) FILTER (WHERE kind = 'video'),
+           min(occurred_at), max(occurred_at)
+    FROM rollup_batch
+    GROUP BY user_id, lesson_id
+    ON CONFLICT (user_id, lesson_id) DO UPDATE SET
+        course_id = coalesce(EXCLUDED.course_id, p.course_id),
+        opens = p.opens + EXCLUDED.opens,
+        time_seconds = p.time_seconds + EXCLUDED.time_seconds,
+        max_scroll = greatest(p.max_scroll, EXCLUDED.max_scroll),
+        max_video_position = greatest(p.max_video_position, EXCLUDED.max_video_position),
+        first_seen_at = least(p.first_seen_at, EXCLUDED.first_seen_at),
+        last_seen_at = greatest(p.last_seen_at, EXCLUDED.last_seen_at);
+    GET DIAGNOSTICS user_rows = ROW_COUNT;
+
+    UPDATE learning_event_rollup_state SET rolled_up_to = to_ts WHERE id = 1;
+
+    RETURN jsonb_build_object('from', from_ts, 'to', to_ts, 'events', event_count,
+                              'lessons', lesson_rows, 'users', user_rows);
+END;
+$$;
+
+-- 5. Retention: drop whole daily partitions older than keep_days that are already rolled up
+CREATE OR REPLACE FUNCTION prune_learning_event_partitions(keep_days INTEGER DEFAULT 30)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part RECORD;
+    cutoff DATE;
+    dropped INTEGER := 0;
+BEGIN
+    SELECT least(current_date - keep_days, (rolled_up_to AT TIME ZONE 'UTC')::date)
+    INTO cutoff FROM learning_event_rollup_state WHERE id = 1;
+
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'learning_events'::regclass AND c.relname ~ '^learning_events_p\d{8}$'
+    LOOP
+        -- Partition for day D holds [D, D + 1); it is prunable once D + 1 <= cutoff
+        IF to_date(substr(part.relname, 18), 'YYYYMMDD') + 1 <= cutoff THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+-- Verify the migration
+SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'learning_events'::regclass ORDER BY 1;
@@ -0,0 +1,13 @@
+-- Migration: Store pre-parsed MDX outline metadata on lessons
+-- Run this in Supabase SQL Editor
+
+-- 1. Hash of the document the outline was built from (re-analysis only when it changes)
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS content_hash TEXT NULL;
+
+-- 2. Headings, TOC, word count, reading time, image/link refs and code languages
+ALTER TABLE lessons ADD COLUMN IF NOT EXISTS content_outline JSONB NULL;
+
+-- Verify the migration
+SELECT column_name, data_type, is_nullable 
+FROM information_schema.columns 
+WHERE table_name = 'lessons' AND column_name IN ('content_hash', 'content_outline');
@@ -0,0 +1,32 @@
+-- Migration: Batched lesson view counter increments
+-- Run this in Supabase SQL Editor
+-- API instances buffer page views and flush them as one call per interval with
+-- the aggregated count per lesson, instead of one UPDATE per view.
+-- increments: [{"id": "<lesson uuid>", "count": 12}, ...]; unknown ids are ignored.
+
+CREATE OR REPLACE FUNCTION increment_lesson_views(increments JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH input AS (
+        SELECT i.id, sum(i.count)::integer AS count
+        FROM jsonb_to_recordset(increments) AS i(id UUID, count INTEGER)
+        GROUP BY i.id
+    ),
+    -- Lock in id order so concurrent flushes from several instances cannot deadlock
+    locked AS (
+        SELECT l.id FROM lessons l JOIN input ON input.id = l.id
+        ORDER BY l.id
+        FOR UPDATE OF l
+    ),
+    updated AS (
+        UPDATE lessons l SET views = coalesce(l.views, 0) + input.count
+        FROM input JOIN locked ON locked.id = input.id
+        WHERE l.id = input.id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated;
+$$;
+
+-- Verify the migration
+SELECT proname FROM pg_proc WHERE proname = 'increment_lesson_views';
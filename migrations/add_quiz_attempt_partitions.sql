@@ -0,0 +1,317 @@
+-- Migration: Monthly partitions for quiz_attempts / quiz_attempt_answers, with retention rollups
+-- Run this in Supabase SQL Editor (after add_compact_attempt_answers.sql)
+-- Both tables become RANGE partitioned by submitted_at, one partition per month
+-- (quiz_attempts_pYYYYMM / quiz_attempt_answers_pYYYYMM) plus a DEFAULT
+-- partition as a safety net (its rows are moved into monthly partitions the next
+-- time those are maintained). Answers carry their attempt's submitted_at so an
+-- attempt and its answers always share a month, and queries bounded by
+-- submitted_at only touch the matching partitions.
+--
+-- /cron/quiz-attempts calls ensure_quiz_attempt_partitions() to create upcoming
+-- months and archive_quiz_attempt_partitions() to roll months past retention
+-- into quiz_attempt_rollups / quiz_question_rollups and detach them.
+
+-- 1. Partition helpers
+CREATE OR REPLACE FUNCTION create_quiz_attempt_partition(month DATE)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    suffix TEXT := to_char(month, 'YYYYMM');
+BEGIN
+    IF to_regclass('quiz_attempts_p' || suffix) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF quiz_attempts FOR VALUES FROM (%L) TO (%L)',
+                   'quiz_attempts_p' || suffix, month, month + interval '1 month');
+    EXECUTE format('CREATE TABLE %I PARTITION OF quiz_attempt_answers FOR VALUES FROM (%L) TO (%L)',
+                   'quiz_attempt_answers_p' || suffix, month, month + interval '1 month');
+    RETURN TRUE;
+END;
+$$;
+
+-- Rows only land in the DEFAULT partitions when their month had no partition yet.
+-- A month cannot be attached while DEFAULT holds rows for it, so both DEFAULT
+-- partitions are detached, every month they cover gets its partition, the rows
+-- are routed again and empty DEFAULT partitions take their place.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION split_quiz_attempt_default_partitions()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month DATE;
+    fk RECORD;
+    created INTEGER := 0;
+BEGIN
+    IF to_regclass('quiz_attempts_default') IS NULL
+       OR NOT EXISTS (SELECT 1 FROM quiz_attempts_default) THEN
+        RETURN 0;
+    END IF;
+
+    -- Answers first, and without their foreign key, as when archiving a month
+    ALTER TABLE quiz_attempt_answers DETACH PARTITION quiz_attempt_answers_default;
+    FOR fk IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'quiz_attempt_answers_default'::regclass AND contype = 'f'
+          AND confrelid = 'quiz_attempts'::regclass
+    LOOP
+        EXECUTE format('ALTER TABLE quiz_attempt_answers_default DROP CONSTRAINT %I', fk.conname);
+    END LOOP;
+    ALTER TABLE quiz_attempts DETACH PARTITION quiz_attempts_default;
+    ALTER TABLE quiz_attempt_answers_default RENAME TO quiz_attempt_answers_default_split;
+    ALTER TABLE quiz_attempts_default RENAME TO quiz_attempts_default_split;
+
+    FOR month IN
+        SELECT DISTINCT date_trunc('month', submitted_at)::date FROM quiz_attempts_default_split
+        UNION
+        SELECT DISTINCT date_trunc('month', submitted_at)::date FROM quiz_attempt_answers_default_split
+    LOOP
+        IF create_quiz_attempt_partition(month) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+
+    INSERT INTO quiz_attempts SELECT * FROM quiz_attempts_default_split;
+    INSERT INTO quiz_attempt_answers SELECT * FROM quiz_attempt_answers_default_split;
+    DROP TABLE quiz_attempt_answers_default_split;
+    DROP TABLE quiz_attempts_default_split;
+
+    CREATE TABLE quiz_attempts_default PARTITION OF quiz_attempts DEFAULT;
+    CREATE TABLE quiz_attempt_answers_default PARTITION OF quiz_attempt_answers DEFAULT;
+    RETURN created;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ensure_quiz_attempt_partitions(months_ahead INTEGER DEFAULT 3, from_month DATE DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month DATE;
+    created INTEGER;
+BEGIN
+    created := split_quiz_attempt_default_partitions();
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', coalesce(from_month, current_date)),
+            date_trunc('month', current_date) + make_interval(months => months_ahead),
+            interval '1 month'
+        )::date
+    LOOP
+        IF create_quiz_attempt_partition(month) THEN
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- 2. Convert the existing tables (skipped when quiz_attempts is already partitioned)
+DO $$
+DECLARE
+    first_month DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'quiz_attempts'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE quiz_attempt_answers RENAME TO quiz_attempt_answers_unpartitioned;
+    ALTER TABLE quiz_attempts RENAME TO quiz_attempts_unpartitioned;
+
+    -- The primary key must include the partition key
+    CREATE TABLE quiz_attempts (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        quiz_id UUID NOT NULL REFERENCES quizzes(id) ON DELETE CASCADE,
+        user_id TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        max_score INTEGER NOT NULL,
+        percent INTEGER NOT NULL,
+        passed BOOLEAN NOT NULL,
+        started_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        submitted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        layout_id UUID NULL REFERENCES quiz_answer_layouts(id),
+        answer_options SMALLINT[] NULL,
+        correct_bits BIT VARYING NULL,
+        PRIMARY KEY (id, submitted_at)
+    ) PARTITION BY RANGE (submitted_at);
+
+    CREATE TABLE quiz_attempt_answers (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        attempt_id UUID NOT NULL,
+        submitted_at TIMESTAMP WITH TIME ZONE NOT NULL,  -- The attempt's, so both land in the same month
+        question_id UUID NOT NULL REFERENCES quiz_questions(id) ON DELETE CASCADE,
+        selected_option_id UUID NOT NULL REFERENCES quiz_options(id) ON DELETE CASCADE,
+        is_correct BOOLEAN NOT NULL,
+        earned_points INTEGER NOT NULL,
+        PRIMARY KEY (id, submitted_at),
+        FOREIGN KEY (attempt_id, submitted_at) REFERENCES quiz_attempts(id, submitted_at) ON DELETE CASCADE
+    ) PARTITION BY RANGE (submitted_at);
+
+    CREATE TABLE quiz_attempts_default PARTITION OF quiz_attempts DEFAULT;
+    CREATE TABLE quiz_attempt_answers_default PARTITION OF quiz_attempt_answers DEFAULT;
+
+    SELECT min(coalesce(submitted_at, started_at, now()))::date INTO first_month FROM quiz_attempts_unpartitioned;
+    PERFORM ensure_quiz_attempt_partitions(3, first_month);
+
+    INSERT INTO quiz_attempts (id, quiz_id, user_id, score, max_score, percent, passed, started_at, submitted_at,
+                               layout_id, answer_options, correct_bits)
+    SELECT id, quiz_id, user_id, score, max_score, percent, passed, started_at,
+           coalesce(submitted_at, started_at, now()), layout_id, answer_options, correct_bits
+    FROM quiz_attempts_unpartitioned;
+
+    INSERT INTO quiz_attempt_answers (id, attempt_id, submitted_at, question_id, selected_option_id, is_correct, earned_points)
+    SELECT x.id, x.attempt_id, a.submitted_at, x.question_id, x.selected_option_id, x.is_correct, x.earned_points
+    FROM quiz_attempt_answers_unpartitioned x
+    JOIN quiz_attempts a ON a.id = x.attempt_id;
+
+    DROP TABLE quiz_attempt_answers_unpartitioned;
+    DROP TABLE quiz_attempts_unpartitioned;
+END;
+$$;
+
+SELECT ensure_quiz_attempt_partitions(3);
+
+-- Created on the parents, so every partition gets them. History and analytics
+-- read newest first within a quiz or user; ordered partitions let a LIMIT stop early.
+CREATE INDEX IF NOT EXISTS quiz_attempts_quiz_submitted_idx ON quiz_attempts (quiz_id, submitted_at DESC);
+CREATE INDEX IF NOT EXISTS quiz_attempts_user_submitted_idx ON quiz_attempts (user_id, submitted_at DESC);
+CREATE INDEX IF NOT EXISTS quiz_attempt_answers_attempt_idx ON quiz_attempt_answers (attempt_id);
+CREATE INDEX IF NOT EXISTS quiz_attempt_answers_question_idx ON quiz_attempt_answers (question_id);
+
+-- 3. Aggregates that outlive the raw partitions. No foreign keys to questions:
+-- stats survive quiz edits.
+CREATE TABLE IF NOT EXISTS quiz_attempt_rollups (
+    quiz_id UUID NOT NULL REFERENCES quizzes(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    attempts BIGINT NOT NULL DEFAULT 0,
+    passed BIGINT NOT NULL DEFAULT 0,
+    learners BIGINT NOT NULL DEFAULT 0,  -- Distinct users that month, cardinality(learner_ids)
+    learner_ids TEXT[] NOT NULL DEFAULT '{}',  -- Kept so a month rolled up in parts is not double counted
+    score_total BIGINT NOT NULL DEFAULT 0,
+    percent_total BIGINT NOT NULL DEFAULT 0,  -- percent_total / attempts = average percent
+    PRIMARY KEY (quiz_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS quiz_question_rollups (
+    quiz_id UUID NOT NULL REFERENCES quizzes(id) ON DELETE CASCADE,
+    question_id UUID NOT NULL,
+    month DATE NOT NULL,
+    answered BIGINT NOT NULL DEFAULT 0,
+    correct BIGINT NOT NULL DEFAULT 0,
+    earned_points BIGINT NOT NULL DEFAULT 0,
+    option_counts JSONB NOT NULL DEFAULT '{}',  -- {"<option uuid>": times selected}
+    PRIMARY KEY (quiz_id, question_id, month)
+);
+
+-- 4. Retention: roll up, then detach (and optionally drop) months that ended more
+-- than keep_months ago. Row-stored and compact answers are both counted. Rows still
+-- in the DEFAULT partition are split out first so they are archived with their month.
+-- Detached tables keep their names for archiving. Returns the months archived.
+CREATE OR REPLACE FUNCTION archive_quiz_attempt_partitions(keep_months INTEGER DEFAULT 24, drop_archived BOOLEAN DEFAULT FALSE)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part RECORD;
+    part_month DATE;
+    part_end DATE;
+    answers_part TEXT;
+    fk RECORD;
+    archived JSONB := '[]'::jsonb;
+BEGIN
+    PERFORM split_quiz_attempt_default_partitions();
+
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'quiz_attempts'::regclass AND c.relname ~ '^quiz_attempts_p\d{6}$'
+        ORDER BY c.relname
+    LOOP
+        part_month := to_date(substr(part.relname, 16), 'YYYYMM');
+        part_end := part_month + interval '1 month';
+        CONTINUE WHEN part_end > date_trunc('month', current_date) - make_interval(months => keep_months);
+        answers_part := 'quiz_attempt_answers_p' || to_char(part_month, 'YYYYMM');
+
+        INSERT INTO quiz_attempt_rollups AS r (quiz_id, month, attempts, passed, learners, learner_ids, score_total, percent_total)
+        SELECT quiz_id, part_month, count(*), count(*) FILTER (WHERE passed), count(DISTINCT user_id),
+               array_agg(DISTINCT user_id), sum(score), sum(percent)
+        FROM quiz_attempts
+        WHERE submitted_at >= part_month AND submitted_at < part_end
+        GROUP BY quiz_id
+        ON CONFLICT (quiz_id, month) DO UPDATE SET
+            attempts = r.attempts + EXCLUDED.attempts,
+            passed = r.passed + EXCLUDED.passed,
+            learner_ids = ARRAY(SELECT DISTINCT unnest(r.learner_ids || EXCLUDED.learner_ids)),
+            learners = (SELECT count(DISTINCT u) FROM unnest(r.learner_ids || EXCLUDED.learner_ids) u),
+            score_total = r.score_total + EXCLUDED.score_total,
+            percent_total = r.percent_total + EXCLUDED.percent_total;
+
+        WITH answers AS (
+            SELECT a.quiz_id, x.question_id, x.selected_option_id AS option_id, x.is_correct, x.earned_points
+            FROM quiz_attempt_answers x
+            JOIN quiz_attempts a ON a.id = x.attempt_id AND a.submitted_at = x.submitted_at
+            WHERE x.submitted_at >= part_month AND x.submitted_at < part_end
+            UNION ALL
+            -- Compact attempts: decode option indices and correctness bits against their layout
+            SELECT a.quiz_id, l.question_ids[i],
+                   (l.option_ids -> (i - 1) ->> a.answer_options[i]::integer)::uuid,
+                   substring(a.correct_bits::text FROM i FOR 1) = '1',
+                   CASE WHEN substring(a.correct_bits::text FROM i FOR 1) = '1' THEN l.points[i] ELSE 0 END
+            FROM quiz_attempts a
+            JOIN quiz_answer_layouts l ON l.id = a.layout_id
+            CROSS JOIN LATERAL generate_subscripts(a.answer_options, 1) AS i
+            WHERE a.submitted_at >= part_month AND a.submitted_at < part_end AND a.answer_options[i] >= 0
+        ),
+        per_option AS (
+            SELECT quiz_id, question_id, option_id, count(*) AS selected,
+                   count(*) FILTER (WHERE is_correct) AS correct, sum(earned_points) AS earned_points
+            FROM answers
+            GROUP BY quiz_id, question_id, option_id
+        )
+        INSERT INTO quiz_question_rollups AS r (quiz_id, question_id, month, answered, correct, earned_points, option_counts)
+        SELECT quiz_id, question_id, part_month, sum(selected), sum(correct), sum(earned_points),
+               jsonb_object_agg(option_id, selected)
+        FROM per_option
+        GROUP BY quiz_id, question_id
+        ON CONFLICT (quiz_id, question_id, month) DO UPDATE SET
+            answered = r.answered + EXCLUDED.answered,
+            correct = r.correct + EXCLUDED.correct,
+            earned_points = r.earned_points + EXCLUDED.earned_points,
+            option_counts = (
+                SELECT jsonb_object_agg(key, total)
+                FROM (
+                    SELECT key, sum(value::bigint) AS total
+                    FROM (SELECT * FROM jsonb_each_text(r.option_counts)
+                          UNION ALL SELECT * FROM jsonb_each_text(EXCLUDED.option_counts)) counts
+                    GROUP BY key
+                ) merged
+            );
+
+        -- Answers first: a detached answers table must stop referencing quiz_attempts
+        -- before that month's attempts partition can be detached
+        IF to_regclass(answers_part) IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE quiz_attempt_answers DETACH PARTITION %I', answers_part);
+            FOR fk IN
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = answers_part::regclass AND contype = 'f' AND confrelid = 'quiz_attempts'::regclass
+            LOOP
+                EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', answers_part, fk.conname);
+            END LOOP;
+        END IF;
+        EXECUTE format('ALTER TABLE quiz_attempts DETACH PARTITION %I', part.relname);
+
+        IF drop_archived THEN
+            EXECUTE format('DROP TABLE IF EXISTS %I', answers_part);
+            EXECUTE format('DROP TABLE %I', part.relname);
+        END IF;
+        archived := archived || to_jsonb(to_char(part_month, 'YYYY-MM'));
+    END LOOP;
+    RETURN archived;
+END;
+$$;
+
+-- Verify the migration
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bounds
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'quiz_attempts'::regclass ORDER BY 1;
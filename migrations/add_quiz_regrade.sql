@@ -0,0 +1,59 @@
+-- Migration: Bulk regrading of quiz attempts after an answer key change
+-- Run this in Supabase SQL Editor (after add_quiz_attempt_partitions.sql)
+-- The 'quiz.regrade' job grades every attempt of a quiz against the current
+-- answer key in memory and writes back only what changed, in batches of
+-- apply_quiz_regrade() calls. quiz_regrade_runs records each run's progress.
+
+CREATE TABLE IF NOT EXISTS quiz_regrade_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    quiz_id UUID NOT NULL REFERENCES quizzes(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'loading', 'grading', 'writing', 'done', 'failed')),
+    total_attempts INTEGER NOT NULL DEFAULT 0,
+    total_answers INTEGER NOT NULL DEFAULT 0,
+    unmatched_attempts INTEGER NOT NULL DEFAULT 0,  -- None of their questions are in the quiz any more
+    changed_attempts INTEGER NOT NULL DEFAULT 0,
+    changed_answers INTEGER NOT NULL DEFAULT 0,  -- Row-stored answers whose correctness or points changed
+    written_attempts INTEGER NOT NULL DEFAULT 0,  -- Progress: written_attempts / changed_attempts
+    timings JSONB NULL,  -- Seconds per phase
+    error TEXT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE NULL,
+    finished_at TIMESTAMP WITH TIME ZONE NULL
+);
+CREATE INDEX IF NOT EXISTS quiz_regrade_runs_quiz_idx ON quiz_regrade_runs (quiz_id, created_at DESC);
+
+-- attempts: [{"id", "submitted_at", "score", "max_score", "percent", "passed", "correct_bits", "layout_id"}]
+--           (correct_bits / layout_id null when unchanged or row-stored; a new
+--           layout_id carries changed points for compact attempts)
+-- answers:  [{"id", "submitted_at", "is_correct", "earned_points"}] for row-stored answers
+-- submitted_at is matched too so each update only touches its month's partition.
+-- Returns the number of attempts updated.
+CREATE OR REPLACE FUNCTION apply_quiz_regrade(attempts JSONB, answers JSONB DEFAULT '[]'::jsonb)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated_answers AS (
+        UPDATE quiz_attempt_answers x
+        SET is_correct = u.is_correct, earned_points = u.earned_points
+        FROM jsonb_to_recordset(answers) AS u(id UUID, submitted_at TIMESTAMP WITH TIME ZONE,
+                                              is_correct BOOLEAN, earned_points INTEGER)
+        WHERE x.id = u.id AND x.submitted_at = u.submitted_at
+        RETURNING 1
+    ),
+    updated_attempts AS (
+        UPDATE quiz_attempts a
+        SET score = u.score, max_score = u.max_score, percent = u.percent, passed = u.passed,
+            correct_bits = coalesce(u.correct_bits::varbit, a.correct_bits),
+            layout_id = coalesce(u.layout_id, a.layout_id)
+        FROM jsonb_to_recordset(attempts) AS u(id UUID, submitted_at TIMESTAMP WITH TIME ZONE, score INTEGER,
+                                               max_score INTEGER, percent INTEGER, passed BOOLEAN, correct_bits TEXT,
+                                               layout_id UUID)
+        WHERE a.id = u.id AND a.submitted_at = u.submitted_at
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated_attempts;
+$$;
+
+-- Verify the migration
+SELECT proname FROM pg_proc WHERE proname = 'apply_quiz_regrade';
@@ -0,0 +1,41 @@
+-- Migration: Single-scan listing of every storage object the database still references
+-- Run this in Supabase SQL Editor
+-- Used by the storage garbage collector; returns one JSON document so the result
+-- is not subject to PostgREST row limits.
+
+CREATE OR REPLACE FUNCTION storage_references()
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    SELECT jsonb_build_object(
+        -- Paths inside the lesson-content bucket
+        'lesson_content', (
+            SELECT coalesce(jsonb_agg(DISTINCT mdx_path), '[]'::jsonb)
+            FROM lessons WHERE mdx_path IS NOT NULL
+        ),
+        -- Public/signed storage URLs (lesson MDX images, quiz images, course covers)
+        'urls', (
+            SELECT coalesce(jsonb_agg(DISTINCT url), '[]'::jsonb)
+            FROM (
+                SELECT jsonb_array_elements_text(content_outline -> 'images') AS url
+                FROM lessons WHERE content_outline ? 'images'
+                UNION SELECT image_url FROM quiz_questions WHERE image_url IS NOT NULL
+                UNION SELECT image_url FROM quiz_options WHERE image_url IS NOT NULL
+                UNION SELECT cover_image FROM courses WHERE cover_image IS NOT NULL
+            ) refs
+        ),
+        -- Raw object keys (course file_key in the R2 bucket)
+        'keys', (
+            SELECT coalesce(jsonb_agg(DISTINCT file_key), '[]'::jsonb)
+            FROM courses WHERE file_key IS NOT NULL
+        ),
+        -- Lessons whose MDX image references are unknown (never analysed)
+        'unanalyzed_lessons', (
+            SELECT count(*) FROM lessons
+            WHERE mdx_path IS NOT NULL AND content_outline IS NULL
+        )
+    );
+$$;
+
+-- Verify the migration
+SELECT jsonb_object_keys(storage_references());
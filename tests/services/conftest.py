@@ -0,0 +1,21 @@
+import os
+import pytest
+
+
+@pytest.fixture
+def pg():
+    """
+    Cursor on TEST_DATABASE_URL (supabase_schema.sql, quiz_schema.sql and the
+    migrations applied); everything a test writes is rolled back.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,40 @@
+import uuid
+
+from app.services import attempt_answers
+
+QUIZ = {
+    "id": str(uuid.uuid4()),
+    "questions": [
+        {"id": str(uuid.uuid4()), "points": points, "options": [{"id": str(uuid.uuid4())} for _ in range(3)]}
+        for points in (1, 2, 3)
+    ],
+}
+
+
+def answer(question, option, is_correct):
+    return {"question_id": question["id"], "selected_option_id": question["options"][option]["id"], "is_correct": is_correct}
+
+
+def test_encode_decode_round_trip_skips_unanswered_questions():
+    first, _, third = QUIZ["questions"]
+    layout = attempt_answers.build_layout(QUIZ)
+
+    encoded = attempt_answers.encode(layout, [answer(third, 2, True), answer(first, 1, False)])
+    assert encoded == {"layout_id": layout["id"], "answer_options": [1, -1, 2], "correct_bits": "001"}
+
+    decoded = attempt_answers.decode(layout, encoded["answer_options"], encoded["correct_bits"])
+    assert [(a["question_id"], a["is_correct"], a["earned_points"]) for a in decoded] == [
+        (first["id"], False, 0),
+        (third["id"], True, 3),
+    ]
+    assert decoded[1]["selected_option_id"] == third["options"][2]["id"]
+
+
+def test_layout_id_is_stable_and_unrepresentable_answers_fall_back():
+    first, second, _ = QUIZ["questions"]
+    layout = attempt_answers.build_layout(QUIZ)
+    assert attempt_answers.build_layout(QUIZ)["id"] == layout["id"]
+
+    foreign_option = {"question_id": first["id"], "selected_option_id": second["options"][0]["id"], "is_correct": False}
+    assert attempt_answers.encode(layout, [foreign_option]) is None
+    assert attempt_answers.encode(layout, [answer(first, 0, True), answer(first, 1, False)]) is None
@@ -0,0 +1,80 @@
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, choose_encoding, compressed_body_cache, compression_metrics
+
+BODY = b'{"lessons": [' + b",".join(b'{"title": "Lesson", "status": "Published"}' for _ in range(200)) + b"]}"
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware)
+
+
+@app.get("/tree")
+def tree():
+    return Response(BODY, media_type="application/json")
+
+
+@app.get("/snapshot")
+def snapshot():
+    return Response(BODY, media_type="application/json", headers={"ETag": '"abc123"'})
+
+
+@app.get("/small")
+def small():
+    return Response(b'{"ok": true}', media_type="application/json")
+
+
+@app.get("/image")
+def image():
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse((b'{"n": %d}\n' % n for n in range(500)), media_type="application/x-ndjson")
+
+
+client = TestClient(app)
+
+
+def test_choose_encoding_respects_quality_values():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("identity") is None
+
+
+def test_compresses_allowlisted_bodies_above_threshold():
+    compression_metrics.reset()
+
+    response = client.get("/tree", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == BODY
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+
+    metrics = compression_metrics.snapshot()
+    assert metrics["responses"] == 1 and metrics["skipped"] == 1
+    assert metrics["bytes_saved"] > len(BODY) // 2
+
+
+def test_immutable_payloads_are_compressed_once():
+    compression_metrics.reset()
+    compressed_body_cache.clear()
+
+    for _ in range(3):
+        response = client.get("/snapshot", headers={"Accept-Encoding": "gzip"})
+        assert response.content == BODY
+
+    metrics = compression_metrics.snapshot()
+    assert (metrics["cache_misses"], metrics["cache_hits"]) == (1, 2)
+
+
+def test_streams_are_compressed_incrementally():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 500
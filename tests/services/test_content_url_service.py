@@ -0,0 +1,55 @@
+import uuid
+
+import pytest
+
+from app.routers import lessons as lessons_router
+from app.services import content_url_service as content_url_module
+from app.services.content_url_service import ContentURLService, content_url_cache
+
+
+class FakeClient:
+    def __init__(self, mdx_path):
+        self.mdx_path = mdx_path
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": [{"mdx_path": self.mdx_path}]})()
+
+
+@pytest.fixture
+def lesson_id(monkeypatch):
+    monkeypatch.setattr(ContentURLService, "supabase_client", staticmethod(lambda: FakeClient("lesson/v1.mdx")))
+    monkeypatch.setattr(
+        content_url_module.storage_service, "signed_url_sync",
+        lambda bucket, path, ttl: f"https://storage/{path}?token=t",
+    )
+    lesson_id = uuid.uuid4()
+    yield lesson_id
+    ContentURLService.invalidate(lesson_id=str(lesson_id), mdx_path="lesson/v1.mdx")
+
+
+def test_lesson_path_is_cached_no_longer_than_the_bundle_ttl(lesson_id):
+    assert ContentURLService.get_mdx_path(str(lesson_id)) == "lesson/v1.mdx"
+
+    remaining = content_url_cache.ttl_remaining(f"lesson:{lesson_id}")
+    assert 0 < remaining <= content_url_module.settings.lesson_bundle_ttl_seconds
+
+
+def test_content_redirect_is_private_and_short_lived(lesson_id):
+    response = lessons_router._signed_content_response(lesson_id, "redirect")
+
+    assert response.headers["location"] == "https://storage/lesson/v1.mdx?token=t"
+    cache_control = response.headers["cache-control"]
+    assert cache_control.startswith("private, ")
+    assert int(cache_control.split("max-age=")[1]) <= content_url_module.settings.lesson_bundle_ttl_seconds
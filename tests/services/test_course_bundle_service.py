@@ -0,0 +1,132 @@
+import asyncio
+import json
+import tempfile
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services import course_bundle_service as bundle_module
+from app.services.course_bundle_service import CourseBundleService
+from app.services.storage_backends import LocalStorageBackend
+
+COURSE_ID = "6f1d3c1e-0000-4000-8000-000000000001"
+CHAPTER_ID = "6f1d3c1e-0000-4000-8000-000000000002"
+LESSON_ID = "6f1d3c1e-0000-4000-8000-000000000003"
+QUIZ_ID = "6f1d3c1e-0000-4000-8000-000000000004"
+QUESTION_ID = "6f1d3c1e-0000-4000-8000-000000000005"
+
+
+class FakeClient:
+    """
+    Tables as lists of rows. Ordering by a column the table lacks fails like
+    PostgREST does, and lesson slugs are unique as in the schema.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def table(self, name):
+        return FakeQuery(self.db.setdefault(name, []), name)
+
+
+class FakeQuery:
+    def __init__(self, rows, name):
+        self.rows, self.name = rows, name
+        self.filters = []
+        self.action, self.values = "select", None
+
+    def select(self, columns="*"):
+        return self
+
+    def insert(self, rows):
+        self.action, self.values = "insert", rows
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column):
+        if any(column not in row for row in self.rows):
+            raise APIError({"code": "42703", "message": f"column {self.name}.{column} does not exist"})
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(check(row) for check in self.filters)]
+        if self.action == "insert":
+            for row in self.values:
+                if self.name == "lessons" and any(other["slug"] == row["slug"] for other in self.rows):
+                    raise APIError({"code": "23505", "message": "duplicate key value violates unique constraint"})
+                self.rows.append(dict(row))
+            matched = self.values
+        elif self.action == "delete":
+            self.rows[:] = [row for row in self.rows if row not in matched]
+        return type("Result", (), {"data": matched})()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = {
+        "courses": [{"id": COURSE_ID, "title": "Course", "slug": "course", "cover_image": "", "status": "Published"}],
+        "chapters": [{"id": CHAPTER_ID, "course_id": COURSE_ID, "title": "Basics", "slug": "basics", "sort_key": "a0"}],
+        "lessons": [{
+            "id": LESSON_ID, "chapter_id": CHAPTER_ID, "title": "Intro", "slug": "intro", "sort_key": "a0",
+            "mdx_path": None, "content_outline": None,
+        }],
+        "quizzes": [{
+            "id": QUIZ_ID, "course_id": COURSE_ID, "chapter_id": CHAPTER_ID, "title": "Check",
+            "status": "Published", "published_at": "2024-01-01T00:00:00Z", "created_at": "2024-01-01T00:00:00Z",
+            "questions": [{
+                "id": QUESTION_ID, "quiz_id": QUIZ_ID, "question_text": "2 + 2?", "image_url": None,
+                "options": [{"id": "o1", "question_id": QUESTION_ID, "option_text": "4", "is_correct": True}],
+            }],
+        }],
+    }
+    backend = LocalStorageBackend(tempfile.mkdtemp())
+    monkeypatch.setattr(bundle_module.storage_service, "resolve", lambda bucket: (backend, bucket))
+    monkeypatch.setattr(CourseBundleService, "supabase_client", staticmethod(lambda: FakeClient(db)))
+    return db
+
+
+def export(course: dict) -> list:
+    async def collect():
+        return [chunk async for chunk in CourseBundleService.export_stream(course)]
+
+    return asyncio.run(collect())
+
+
+def test_export_includes_quizzes_with_their_questions(db):
+    records = [json.loads(line) for line in export(db["courses"][0])]
+
+    assert [record["type"] for record in records] == ["manifest", "course", "chapter", "lesson", "quiz"]
+    quiz = records[-1]["data"]
+    assert quiz["id"] == QUIZ_ID
+    assert quiz["questions"][0]["options"][0]["option_text"] == "4"
+
+
+def test_import_with_a_new_slug_round_trips_next_to_the_original(db):
+    bundle = export(db["courses"][0])
+
+    async def chunks():
+        for line in bundle:
+            yield line
+
+    result = asyncio.run(CourseBundleService.import_stream(chunks(), "course-v2"))
+
+    assert result["counts"] == {"chapters": 1, "lessons": 1, "quizzes": 1, "questions": 1, "options": 1, "files": 0}
+    course = next(row for row in db["courses"] if row["id"] == result["course_id"])
+    assert (course["slug"], course["status"]) == ("course-v2", "Draft")
+    assert sorted(lesson["slug"] for lesson in db["lessons"]) == ["intro", "intro-course-v2"]
+    quiz = next(row for row in db["quizzes"] if row["course_id"] == result["course_id"])
+    assert (quiz["status"], quiz["published_at"]) == ("Draft", None)
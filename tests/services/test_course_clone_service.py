@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services import course_clone_service as clone_module
+from app.services.course_clone_service import CourseCloneService
+
+FILES = [
+    {"lesson_id": "lesson-1", "source": "lesson-1.mdx", "destination": "copy-1.mdx"},
+    {"lesson_id": "lesson-2", "source": "lesson-2/v2.mdx", "destination": "copy-2.mdx"},
+]
+
+
+class FakeClient:
+    """clone_course RPC result plus a record of deletes"""
+
+    def __init__(self):
+        self.deleted = []
+        self._filters = None
+
+    def rpc(self, name, params):
+        self._result = {"course_id": "clone", "slug": "course-copy", "counts": {"lessons": 2}, "files": FILES}
+        return self
+
+    def table(self, name):
+        self._table = name
+        self._result = None
+        return self
+
+    def delete(self):
+        return self
+
+    def eq(self, column, value):
+        self.deleted.append((self._table, column, value))
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self._result})()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(CourseCloneService, "supabase_client", staticmethod(lambda: client))
+    return client
+
+
+def test_clone_copies_every_lesson_file(client, monkeypatch):
+    copied = []
+    monkeypatch.setattr(clone_module.storage_service, "copy_many_sync", lambda bucket, pairs: copied.extend(pairs) or [])
+
+    clone = CourseCloneService.clone("course")
+
+    assert clone["course_id"] == "clone"
+    assert copied == [("lesson-1.mdx", "copy-1.mdx"), ("lesson-2/v2.mdx", "copy-2.mdx")]
+    assert client.deleted == []
+
+
+def test_failed_content_copy_deletes_the_clone_and_names_the_lessons(client, monkeypatch):
+    monkeypatch.setattr(clone_module.storage_service, "copy_many_sync", lambda bucket, pairs: ["lesson-2/v2.mdx"])
+
+    with pytest.raises(HTTPException) as error:
+        CourseCloneService.clone("course")
+
+    assert error.value.status_code == 502
+    assert error.value.detail["failed_lessons"] == ["lesson-2"]
+    assert client.deleted == [("courses", "id", "clone")]
@@ -0,0 +1,28 @@
+import pytest
+from fastapi import HTTPException
+
+from app.routers import cron
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(cron.settings, "cron_secret", "s3cret")
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "s3cret", "Bearer s3cret "])
+def test_cron_calls_without_the_secret_are_rejected(secret, authorization):
+    with pytest.raises(HTTPException) as error:
+        cron.require_cron_secret(authorization)
+    assert error.value.status_code == 401
+
+
+def test_cron_call_with_the_secret_passes(secret):
+    cron.require_cron_secret("Bearer s3cret")
+
+
+def test_unconfigured_secret_refuses_every_call(monkeypatch):
+    monkeypatch.setattr(cron.settings, "cron_secret", "")
+
+    with pytest.raises(HTTPException) as error:
+        cron.require_cron_secret("Bearer ")
+    assert error.value.status_code == 503
@@ -0,0 +1,62 @@
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas import LearningEventBatch
+from app.services import event_service as event_service_module
+from app.services.event_service import EventBuffer
+
+
+class FakeRpc:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(params["events"])
+        return self
+
+    def execute(self):
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise RuntimeError("database unavailable")
+        return type("Result", (), {"data": len(self.calls[-1])})()
+
+
+def batch(*events):
+    return LearningEventBatch(user_id="user-1", events=[{"l": str(uuid.uuid4()), **e} for e in events])
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    monkeypatch.setattr(event_service_module.settings, "event_flush_max_pending", 1000)
+    monkeypatch.setattr(event_service_module.settings, "event_flush_batch_size", 2)
+    monkeypatch.setattr(event_service_module.settings, "event_buffer_max", 4)
+    return EventBuffer()
+
+
+def test_record_filters_timestamps_and_clamps_scroll(buffer):
+    now = int(time.time() * 1000)
+    result = buffer.record(batch({"k": "scroll", "t": now, "v": 130}, {"k": "open", "t": now - 10**10}))
+
+    assert (result["accepted"], result["rejected"]) == (1, 1)
+    assert buffer._pending[0]["v"] == 100.0 and buffer._pending[0]["u"] == "user-1"
+
+
+def test_flush_chunks_and_requeues_unwritten_rows(buffer, monkeypatch):
+    rpc = FakeRpc(fail_after=1)
+    monkeypatch.setattr(EventBuffer, "supabase_client", staticmethod(lambda: rpc))
+    now = int(time.time() * 1000)
+    buffer.record(batch(*[{"k": "open", "t": now}] * 3))
+
+    report = buffer.flush()
+    assert (report["status"], report["flushed"]) == ("failed", 2)
+    assert buffer.metrics()["pending_events"] == 1
+
+    rpc.fail_after = None
+    assert buffer.flush()["flushed"] == 1
+
+    with pytest.raises(HTTPException) as error:
+        buffer.record(batch(*[{"k": "time", "t": now, "v": 5}] * 5))
+    assert error.value.status_code == 503
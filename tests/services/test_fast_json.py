@@ -0,0 +1,77 @@
+from typing import List
+import asyncio
+import json
+import uuid
+
+from app.schemas.quiz import QuizUser
+from app.services.database_service import iter_pages
+from app.services.fast_json import project, respond, stream_rows
+
+QUIZ = {
+    "id": str(uuid.uuid4()),
+    "course_id": str(uuid.uuid4()),
+    "title": "Basics",
+    "status": "Published",
+    "questions": [
+        {
+            "id": str(uuid.uuid4()),
+            "prompt": "Pick one",
+            "position": 1,
+            "sort_key": "a0",
+            "options": [
+                {"id": str(uuid.uuid4()), "content": "Yes", "position": 1, "is_correct": True},
+                {"id": str(uuid.uuid4()), "content": "No", "position": 2, "is_correct": False},
+            ],
+        }
+    ],
+}
+
+
+def test_project_keeps_declared_fields_and_defaults():
+    (quiz,) = project(List[QuizUser], [QUIZ])
+
+    assert "status" not in quiz and quiz["chapter_id"] is None
+    assert quiz["description"] is None and quiz["passing_score_percent"] == 70
+    question = quiz["questions"][0]
+    assert "sort_key" not in question and question["points"] == 1
+    assert all("is_correct" not in option for option in question["options"])
+
+
+def test_fast_paths_match_validated_output():
+    validated = json.loads(respond(QuizUser, QUIZ, mode="validate").body)
+    projected = json.loads(respond(QuizUser, QUIZ, mode="project").body)
+
+    assert validated == projected
+    assert respond(QuizUser, QUIZ, mode="off") is QUIZ
+
+
+def _body(response) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+
+def test_stream_rows_emits_array_or_ndjson_from_pages():
+    pages = [[{"id": 1, "secret": "x"}, {"id": 2}], [{"id": 3}]]
+
+    array = _body(stream_rows(iter(pages)))
+    ndjson = _body(stream_rows(iter(pages), ndjson=True))
+
+    assert [row["id"] for row in json.loads(array)] == [1, 2, 3]
+    assert [json.loads(line)["id"] for line in ndjson.splitlines()] == [1, 2, 3]
+    assert json.loads(_body(stream_rows(iter([])))) == []
+
+
+def test_iter_pages_stops_at_short_page_or_stop():
+    rows = [{"n": n} for n in range(7)]
+
+    class Query:
+        def range(self, start, end):
+            self.data = rows[start:end + 1]
+            return self
+
+        def execute(self):
+            return self
+
+    assert [len(page) for page in iter_pages(Query, 3)] == [3, 3, 1]
+    assert [len(page) for page in iter_pages(Query, 3, start=1, stop=5)] == [3, 1]
@@ -0,0 +1,58 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import image_service as image_module
+from app.services.image_service import ImageService
+
+
+def png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 10, 10)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """In-memory objects behind the storage_service calls store_image makes"""
+    objects = {}
+    storage = image_module.storage_service
+    monkeypatch.setattr(image_module, "VARIANT_WIDTHS", [320, 640])
+    monkeypatch.setattr(storage, "put_sync", lambda bucket, path, data, **kwargs: objects.__setitem__(path, data))
+    monkeypatch.setattr(storage, "list_sync", lambda bucket, prefix="": [
+        {"key": key, "size": len(data)} for key, data in objects.items() if key.startswith(prefix)
+    ])
+    monkeypatch.setattr(storage, "public_url", lambda bucket, path: f"https://cdn/{path}")
+    return objects
+
+
+def test_expected_paths_match_what_store_image_writes(bucket):
+    data = png(1000, 500)
+
+    image = ImageService.store_image("lesson-images", data, "image/png")
+
+    assert sorted(bucket) == sorted(ImageService.expected_paths(data, "image/png"))
+    assert [(v["width"], v["height"]) for v in image["variants"]] == [(320, 160), (640, 320)]
+    assert image["deduplicated"] is False
+
+
+def test_complete_upload_is_reused(bucket):
+    data = png(400, 400)
+    ImageService.store_image("lesson-images", data, "image/png")
+
+    image = ImageService.store_image("lesson-images", data, "image/png")
+
+    assert image["deduplicated"] is True
+    assert image["path"].endswith("/400x400.webp")
+
+
+def test_partial_upload_is_redone(bucket):
+    data = png(1000, 500)
+    ImageService.store_image("lesson-images", data, "image/png")
+    del bucket[next(path for path in bucket if path.endswith("/640x320.webp"))]
+
+    image = ImageService.store_image("lesson-images", data, "image/png")
+
+    assert image["deduplicated"] is False
+    assert len(bucket) == 2 and image["path"].endswith("/640x320.webp")
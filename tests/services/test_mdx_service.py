@@ -0,0 +1,110 @@
+import pytest
+from fastapi import HTTPException
+
+from app.services import mdx_service as mdx_module
+from app.services.mdx_service import MdxService
+from app.services.storage_backends import StorageObjectNotFound
+
+SAMPLE = """---
+title: Intro
+---
+import { Callout } from "@/components/callout"
+
+# Getting Started
+
+Read the [docs](https://example.com/docs) first.
+
+![Diagram](/img/diagram.png)
+
+## Install
+
+```bash
+# not a heading
+pip install fastapi
+```
+
+## Install
+
+<Image src="/img/setup.webp" alt="setup" />
+
+### Verify *it* works
+
+```python
+print("ok")
+```
+"""
+
+
+def test_analyze_extracts_headings_outside_code_blocks():
+    outline = MdxService.analyze(SAMPLE)
+
+    assert [(h["depth"], h["text"]) for h in outline["headings"]] == [
+        (1, "Getting Started"),
+        (2, "Install"),
+        (2, "Install"),
+        (3, "Verify it works"),
+    ]
+    # Duplicate headings get unique anchors
+    assert [h["slug"] for h in outline["headings"]] == [
+        "getting-started", "install", "install-1", "verify-it-works",
+    ]
+
+
+def test_analyze_builds_nested_toc():
+    toc = MdxService.analyze(SAMPLE)["toc"]
+
+    assert len(toc) == 1
+    assert [c["slug"] for c in toc[0]["children"]] == ["install", "install-1"]
+    assert toc[0]["children"][1]["children"][0]["slug"] == "verify-it-works"
+
+
+def test_analyze_collects_references_and_languages():
+    outline = MdxService.analyze(SAMPLE)
+
+    assert outline["images"] == ["/img/diagram.png", "/img/setup.webp"]
+    assert outline["links"] == ["https://example.com/docs"]
+    assert outline["code_languages"] == ["bash", "python"]
+
+
+def test_word_count_ignores_code_frontmatter_and_imports():
+    outline = MdxService.analyze(SAMPLE)
+
+    # "Getting Started", "Read the docs first.", "Install" x2, "Verify it works"
+    assert outline["word_count"] == 11
+    assert outline["reading_time_minutes"] == 1
+
+
+def test_outline_update_skips_unchanged_content():
+    content = SAMPLE.encode()
+    first = MdxService.outline_update(content, None)
+
+    assert first["content_hash"] == MdxService.content_hash(content)
+    assert MdxService.outline_update(content, first["content_hash"]) == {}
+
+
+def test_outline_of_missing_content_is_404(monkeypatch):
+    class FakeClient:
+        def table(self, name):
+            return self
+
+        def select(self, columns):
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def limit(self, count):
+            return self
+
+        def execute(self):
+            return type("Result", (), {"data": [{"mdx_path": "gone.mdx", "content_hash": None, "content_outline": None}]})()
+
+    def missing(bucket, path):
+        raise StorageObjectNotFound(bucket, path)
+
+    monkeypatch.setattr(MdxService, "supabase_client", staticmethod(lambda: FakeClient()))
+    monkeypatch.setattr(mdx_module.storage_service, "get_sync", missing)
+
+    with pytest.raises(HTTPException) as error:
+        MdxService.get_outline("lesson")
+    assert error.value.status_code == 404
@@ -0,0 +1,47 @@
+from app.services import navigation_service as navigation_module
+from app.services.navigation_service import CourseNavIndex, NavigationService
+
+ROW = {
+    "course_id": "course",
+    "version": 2,
+    "chapters": [
+        {"id": "ch-1", "slug": "intro", "title": "Intro", "first_ordinal": 1, "lesson_count": 2},
+        {"id": "ch-2", "slug": "empty", "title": "Empty", "first_ordinal": None, "lesson_count": 0},
+        {"id": "ch-3", "slug": "deep", "title": "Deep", "first_ordinal": 3, "lesson_count": 2},
+    ],
+    "lessons": [
+        {"id": f"l-{n}", "chapter_id": chapter, "slug": f"lesson-{n}", "title": f"Lesson {n}", "ordinal": n}
+        for n, chapter in [(1, "ch-1"), (2, "ch-1"), (3, "ch-3"), (4, "ch-3")]
+    ],
+}
+
+
+def test_position_crosses_chapter_boundaries():
+    index = CourseNavIndex(ROW)
+
+    position = index.position(lesson_id="l-3")
+    assert (position["ordinal"], position["total"], position["chapter_ordinal"]) == (3, 4, 1)
+    assert position["chapter"]["slug"] == "deep"
+    assert position["prev_lesson"]["id"] == "l-2" and position["next_lesson"]["id"] == "l-4"
+
+    assert index.position(slug="lesson-1")["prev_lesson"] is None
+    assert index.position(lesson_id="l-4")["next_lesson"] is None
+    assert index.position(lesson_id="missing") is None
+
+
+def test_chapter_lessons_slice_the_flat_list():
+    index = CourseNavIndex(ROW)
+
+    assert [lesson["id"] for lesson in index.chapter_lessons("ch-3")] == ["l-3", "l-4"]
+    assert index.chapter_lessons("ch-2") == []
+
+
+def test_invalidate_forgets_the_item_ids_of_the_dropped_index(monkeypatch):
+    monkeypatch.setattr(NavigationService, "_load", staticmethod(lambda course_id: ROW))
+    NavigationService.get("course")
+    assert navigation_module._course_of.get("l-3") == "course"
+
+    NavigationService.invalidate(item_ids=["l-3"])
+
+    assert navigation_module.course_nav_cache.get("course") is None
+    assert all(navigation_module._course_of.get(item_id) is None for item_id in CourseNavIndex(ROW).ids())
@@ -0,0 +1,111 @@
+import pytest
+
+from app.services.ordering_service import OrderingService
+
+
+def key_between(pg, lower, upper):
+    pg.execute("SELECT ordering_key_between(%s, %s)", (lower, upper))
+    return pg.fetchone()[0]
+
+
+@pytest.fixture
+def chapters(pg):
+    """Course with chapters A-E, returns {title: id}"""
+    pg.execute("INSERT INTO courses (title, slug, cover_image) VALUES ('Course', 'ordering-test', '') RETURNING id")
+    course_id = pg.fetchone()[0]
+    ids = {}
+    for title in "ABCDE":
+        pg.execute(
+            "INSERT INTO chapters (course_id, title, slug) VALUES (%s, %s, %s) RETURNING id",
+            (course_id, title, title.lower()),
+        )
+        ids[title] = pg.fetchone()[0]
+    return course_id, ids
+
+
+def order(pg, course_id):
+    pg.execute("SELECT title, position, sort_key FROM chapters WHERE course_id = %s ORDER BY sort_key", (course_id,))
+    return pg.fetchall()
+
+
+@pytest.mark.parametrize("lower, upper", [
+    (None, None),
+    (None, "1"),     # prepending below the smallest first digit
+    (None, "01"),    # ... and below a key that starts with '0'
+    (None, "001"),
+    ("V", "W"),      # adjacent keys
+    ("Vz", "W"),
+    ("V", "V1"),
+    ("zz", None),
+    ("1", "2"),
+])
+def test_key_between_sorts_strictly_between(pg, lower, upper):
+    key = key_between(pg, lower, upper)
+
+    assert not key.endswith("0")
+    assert lower is None or lower < key
+    assert upper is None or key < upper
+
+
+def test_key_between_rejects_keys_with_no_room_below(pg):
+    with pytest.raises(Exception, match="no ordering key sorts below"):
+        key_between(pg, None, "0")
+
+
+def test_repeated_prepends_and_splits_stay_ordered(pg):
+    keys = ["V"]
+    for _ in range(200):
+        keys.insert(0, key_between(pg, None, keys[0]))
+    for _ in range(200):
+        keys.insert(1, key_between(pg, keys[0], keys[1]))
+
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+
+def test_partial_reorder_keeps_omitted_siblings_in_place(pg, chapters):
+    course_id, ids = chapters
+
+    pg.execute(
+        "SELECT set_ordering('chapters', %s::uuid[], %s)",
+        ([str(ids["E"]), str(ids["B"])], [1, 4]),
+    )
+
+    rows = order(pg, course_id)
+    assert [r[0] for r in rows] == ["E", "A", "C", "B", "D"]
+    assert [r[1] for r in rows] == [1, 2, 3, 4, 5]
+    assert len({r[2] for r in rows}) == 5
+
+
+def test_full_reorder_and_positions_past_the_end(pg, chapters):
+    course_id, ids = chapters
+
+    pg.execute(
+        "SELECT set_ordering('chapters', %s::uuid[], %s)",
+        ([str(ids[t]) for t in "DCBAE"], [1, 2, 3, 4, 99]),
+    )
+    assert [r[0] for r in order(pg, course_id)] == list("DCBAE")
+
+    pg.execute("SELECT set_ordering('chapters', %s::uuid[], %s)", ([str(ids["D"])], [99]))
+    assert [r[0] for r in order(pg, course_id)] == list("CBAED")
+
+
+def test_reorder_rejects_rows_of_different_parents(pg, chapters):
+    course_id, ids = chapters
+    pg.execute("INSERT INTO courses (title, slug, cover_image) VALUES ('Other', 'ordering-other', '') RETURNING id")
+    pg.execute("INSERT INTO chapters (course_id, title, slug) VALUES (%s, 'X', 'x') RETURNING id", (pg.fetchone()[0],))
+    other = pg.fetchone()[0]
+
+    with pytest.raises(Exception, match="share a parent"):
+        pg.execute("SELECT set_ordering('chapters', %s::uuid[], %s)", ([str(ids["A"]), str(other)], [1, 2]))
+
+
+def test_sort_ignores_stale_positions():
+    rows = [
+        {"id": "b", "sort_key": "W", "position": 1},
+        {"id": "a", "sort_key": "V", "position": 7},
+        {"id": "c", "sort_key": "X", "position": 1},
+    ]
+
+    OrderingService.sort(rows)
+
+    assert [(r["id"], r["position"]) for r in rows] == [("a", 1), ("b", 2), ("c", 3)]
@@ -0,0 +1,85 @@
+import pytest
+
+
+@pytest.fixture
+def quiz(pg):
+    """Quiz with one question and one correct option, returns (quiz_id, question_id, option_id)"""
+    pg.execute("INSERT INTO courses (title, slug, cover_image) VALUES ('Course', 'partition-test', '') RETURNING id")
+    pg.execute("INSERT INTO quizzes (course_id, title) VALUES (%s, 'Quiz') RETURNING id", (pg.fetchone()[0],))
+    quiz_id = pg.fetchone()[0]
+    pg.execute("INSERT INTO quiz_questions (quiz_id, position, prompt) VALUES (%s, 1, 'Q') RETURNING id", (quiz_id,))
+    question_id = pg.fetchone()[0]
+    pg.execute(
+        "INSERT INTO quiz_options (question_id, position, content, is_correct) VALUES (%s, 1, 'A', true) RETURNING id",
+        (question_id,),
+    )
+    return quiz_id, question_id, pg.fetchone()[0]
+
+
+def add_attempt(pg, quiz, user_id, submitted_at):
+    quiz_id, question_id, option_id = quiz
+    pg.execute(
+        """INSERT INTO quiz_attempts (quiz_id, user_id, score, max_score, percent, passed, submitted_at)
+           VALUES (%s, %s, 1, 1, 100, true, %s) RETURNING id""",
+        (quiz_id, user_id, submitted_at),
+    )
+    attempt_id = pg.fetchone()[0]
+    pg.execute(
+        """INSERT INTO quiz_attempt_answers (attempt_id, submitted_at, question_id, selected_option_id, is_correct, earned_points)
+           VALUES (%s, %s, %s, %s, true, 1)""",
+        (attempt_id, submitted_at, question_id, option_id),
+    )
+    return attempt_id
+
+
+def partition_of(pg, table, attempt_id):
+    column = "id" if table == "quiz_attempts" else "attempt_id"
+    pg.execute(f"SELECT tableoid::regclass::text FROM {table} WHERE {column} = %s", (attempt_id,))
+    return pg.fetchone()[0]
+
+
+def test_current_month_is_routed_to_its_partition(pg, quiz):
+    pg.execute("SELECT to_char(now(), 'YYYYMM')")
+    suffix = pg.fetchone()[0]
+
+    attempt_id = add_attempt(pg, quiz, "u1", "now()")
+
+    assert partition_of(pg, "quiz_attempts", attempt_id) == f"quiz_attempts_p{suffix}"
+    assert partition_of(pg, "quiz_attempt_answers", attempt_id) == f"quiz_attempt_answers_p{suffix}"
+
+
+def test_rows_in_the_default_partition_move_to_their_month(pg, quiz):
+    attempt_id = add_attempt(pg, quiz, "u1", "2001-02-10T12:00:00Z")
+    assert partition_of(pg, "quiz_attempts", attempt_id) == "quiz_attempts_default"
+
+    pg.execute("SELECT ensure_quiz_attempt_partitions(0)")
+
+    assert partition_of(pg, "quiz_attempts", attempt_id) == "quiz_attempts_p200102"
+    assert partition_of(pg, "quiz_attempt_answers", attempt_id) == "quiz_attempt_answers_p200102"
+    pg.execute("SELECT count(*) FROM quiz_attempts_default")
+    assert pg.fetchone()[0] == 0
+
+
+def test_archive_rolls_up_default_rows_without_double_counting_learners(pg, quiz):
+    quiz_id, question_id, _ = quiz
+    for user_id in ("u1", "u1", "u2"):
+        add_attempt(pg, quiz, user_id, "2001-01-15T12:00:00Z")
+    # An earlier partial rollup of the same month already counted u1
+    pg.execute(
+        """INSERT INTO quiz_attempt_rollups (quiz_id, month, attempts, passed, learners, learner_ids, score_total, percent_total)
+           VALUES (%s, '2001-01-01', 1, 1, 1, '{u1}', 1, 100)""",
+        (quiz_id,),
+    )
+
+    pg.execute("SELECT archive_quiz_attempt_partitions(24, false)")
+    assert "2001-01" in pg.fetchone()[0]
+
+    pg.execute(
+        "SELECT attempts, passed, learners, score_total FROM quiz_attempt_rollups WHERE quiz_id = %s AND month = '2001-01-01'",
+        (quiz_id,),
+    )
+    assert pg.fetchone() == (4, 4, 2, 4)
+    pg.execute("SELECT answered, correct FROM quiz_question_rollups WHERE question_id = %s", (question_id,))
+    assert pg.fetchone() == (3, 3)
+    pg.execute("SELECT count(*) FROM quiz_attempts WHERE quiz_id = %s", (quiz_id,))
+    assert pg.fetchone()[0] == 0
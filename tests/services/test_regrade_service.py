@@ -0,0 +1,147 @@
+import uuid
+
+from app.schemas.quiz import QuizOptionCreate, QuizQuestionCreate
+from app.services import attempt_answers
+from app.services.quiz_service import QuizService
+from app.services.regrade_service import AnswerKey, Gradebook
+
+
+def make_quiz(correct, points=(1, 2, 3), passing=70):
+    questions = []
+    for index, point in zip(correct, points):
+        options = [{"id": str(uuid.uuid4()), "is_correct": False} for _ in range(3)]
+        options[index]["is_correct"] = True
+        questions.append({"id": str(uuid.uuid4()), "points": point, "options": options})
+    return {"id": str(uuid.uuid4()), "passing_score_percent": passing, "questions": questions}
+
+
+def attempt(**fields):
+    return {"id": str(uuid.uuid4()), "submitted_at": "2026-01-01T00:00:00+00:00", **fields}
+
+
+def test_fixed_answer_key_regrades_compact_and_row_attempts():
+    quiz = make_quiz(correct=[0, 0, 0])
+    layout = attempt_answers.build_layout(quiz)
+    first, second, third = quiz["questions"]
+    # Both attempts picked option 1 for the second question and option 0 elsewhere: 4/6 under the old key
+    compact = attempt(score=4, max_score=6, percent=66, passed=False,
+                      **attempt_answers.encode(layout, [
+                          {"question_id": q["id"], "selected_option_id": q["options"][i]["id"], "is_correct": i == 0}
+                          for q, i in ((first, 0), (second, 1), (third, 0))
+                      ]))
+    rows = attempt(score=4, max_score=6, percent=66, passed=False, layout_id=None)
+    answer_rows = [
+        {"id": str(uuid.uuid4()), "attempt_id": rows["id"], "submitted_at": rows["submitted_at"],
+         "question_id": q["id"], "selected_option_id": q["options"][i]["id"],
+         "is_correct": i == 0, "earned_points": q["points"] if i == 0 else 0}
+        for q, i in ((first, 0), (second, 1), (third, 0))
+    ]
+
+    # The second question's correct option was actually option 1
+    second["options"][0]["is_correct"], second["options"][1]["is_correct"] = False, True
+    book = Gradebook(AnswerKey(quiz))
+    book.add_attempts([compact, rows], {layout["id"]: layout})
+    book.add_answer_rows(answer_rows, {compact["id"]: 0, rows["id"]: 1})
+    result = book.grade()
+
+    assert result["score"].tolist() == [6, 6]
+    assert result["percent"].tolist() == [100, 100]
+    assert result["passed"].tolist() == [True, True]
+    assert result["changed"].tolist() == [True, True]
+    assert result["correct_bits"] == {0: "111"}
+    updates = [book.answer_update(result, i) for i in result["answers"]]
+    assert [(a["id"], a["is_correct"], a["earned_points"]) for a in updates] == [
+        (answer_rows[1]["id"], True, 2)
+    ]
+    assert result["layouts"] == {}
+
+    # Grading again against the same key changes nothing
+    compact.update(score=6, percent=100, passed=True, correct_bits="111")
+    rows.update(score=6, percent=100, passed=True)
+    answer_rows[1].update(is_correct=True, earned_points=2)
+    book = Gradebook(AnswerKey(quiz))
+    book.add_attempts([compact, rows], {layout["id"]: layout})
+    book.add_answer_rows(answer_rows, {compact["id"]: 0, rows["id"]: 1})
+    assert not book.grade()["changed"].any()
+
+
+def test_changed_points_re_point_compact_attempts_and_unknown_questions_score_nothing():
+    quiz = make_quiz(correct=[0, 0, 0])
+    layout = attempt_answers.build_layout(quiz)
+    first = quiz["questions"][0]
+    compact = attempt(score=1, max_score=6, percent=16, passed=False,
+                      **attempt_answers.encode(layout, [
+                          {"question_id": first["id"], "selected_option_id": first["options"][0]["id"], "is_correct": True}
+                      ]))
+    stale = attempt(score=2, max_score=2, percent=100, passed=True, layout_id=None)
+
+    first["points"] = 4
+    book = Gradebook(AnswerKey(quiz))
+    book.add_attempts([compact, stale], {layout["id"]: layout})
+    book.add_answer_rows(
+        [{"id": str(uuid.uuid4()), "attempt_id": stale["id"], "submitted_at": stale["submitted_at"],
+          "question_id": str(uuid.uuid4()), "selected_option_id": str(uuid.uuid4()), "is_correct": True, "earned_points": 2}],
+        {compact["id"]: 0, stale["id"]: 1},
+    )
+    result = book.grade()
+
+    assert result["score"][0] == 4 and result["percent"][0] == 44
+    (replacement,) = result["layouts"].values()
+    assert replacement["points"] == [4, 2, 3] and result["layout_ids"] == {0: replacement["id"]}
+    # An attempt none of whose questions survive is left alone
+    assert result["matched"].tolist() == [True, False]
+    assert result["changed"].tolist() == [True, False]
+
+
+def stored_quiz():
+    return {
+        "id": str(uuid.uuid4()),
+        "questions": [
+            {
+                "id": f"q{i}", "prompt": f"Prompt {i}", "image_url": None, "points": 1,
+                "options": [
+                    {"id": f"q{i}o{j}", "content": f"Option {i}.{j}", "image_url": None, "is_correct": j == 0}
+                    for j in range(3)
+                ],
+            }
+            for i in range(2)
+        ],
+    }
+
+
+def payload(quiz, order=(0, 1), positions=(0, 1)):
+    """The stored quiz as an update payload, questions listed in `order` at `positions`"""
+    questions = []
+    for index, position in zip(order, positions):
+        q = quiz["questions"][index]
+        questions.append(QuizQuestionCreate(
+            prompt=q["prompt"], position=position, points=q["points"],
+            options=[QuizOptionCreate(content=o["content"], position=j, is_correct=o["is_correct"])
+                     for j, o in enumerate(q["options"])],
+        ))
+    return questions
+
+
+def test_answer_key_changes_only_touch_points_and_correct_flags():
+    quiz = stored_quiz()
+    questions = payload(quiz)
+    assert QuizService._answer_key_changes(quiz, questions) == {"points": {}, "is_correct": {}}
+
+    questions[1].points = 3
+    questions[1].options[0].is_correct, questions[1].options[2].is_correct = False, True
+    assert QuizService._answer_key_changes(quiz, questions) == {
+        "points": {"q1": 3},
+        "is_correct": {"q1o0": False, "q1o2": True},
+    }
+
+
+def test_reordered_or_edited_questions_are_not_updated_in_place():
+    quiz = stored_quiz()
+    # Same shape, but the second question now comes first: ids must not follow positions
+    assert QuizService._answer_key_changes(quiz, payload(quiz, positions=(1, 0))) is None
+    assert QuizService._answer_key_changes(quiz, payload(quiz, order=(1, 0))) is None
+
+    edited = payload(quiz)
+    edited[0].options[1].content = "A different option"
+    assert QuizService._answer_key_changes(quiz, edited) is None
+    assert QuizService._answer_key_changes(quiz, payload(quiz)[:1]) is None
@@ -0,0 +1,102 @@
+import pytest
+
+from app.services import search_service as search_module
+from app.services.search_service import InMemorySearchIndex, SearchService
+
+
+@pytest.fixture
+def index():
+    index = InMemorySearchIndex()
+    index.add("course", "c1", "c1", None, "Python Basics", "python", {"A": "Python Basics", "C": "Learn loops"},
+              body="Learn loops")
+    index.add("chapter", "ch1", "c1", "ch1", "Loops", "loops", {"A": "Loops"})
+    index.add("lesson", "l1", "c1", "ch1", "For loops", "for-loops", {"A": "For loops", "D": "python loops"},
+              body="python loops")
+    index.add("lesson", "l2", "c1", "ch1", "While", "while", {"A": "While", "D": "loops until done"},
+              body="loops until done")
+    return index
+
+
+def test_title_matches_outrank_body_matches(index):
+    total, results = index.search("loops", ["course", "chapter", "lesson"], 0, 10)
+
+    assert total == 4
+    assert [r["id"] for r in results] == ["l1", "ch1", "c1", "l2"]
+    assert results[0]["rank"] > results[-1]["rank"]
+    assert "<b>loops</b>" in results[0]["headline"]
+
+
+def test_all_terms_must_match_and_kinds_filter(index):
+    assert [r["id"] for r in index.search("python loops", ["course", "chapter", "lesson"], 0, 10)[1]] == ["c1", "l1"]
+    assert [r["id"] for r in index.search("loops", ["lesson"], 0, 10)[1]] == ["l1", "l2"]
+    assert index.search("the", ["lesson"], 0, 10) == (0, [])
+
+
+def test_pages_keep_the_total(index):
+    kinds = ["course", "chapter", "lesson"]
+    pages = [index.search("loops", kinds, skip, 2) for skip in (0, 2, 4)]
+
+    assert [total for total, _ in pages] == [4, 4, 4]
+    assert [r["id"] for _, page in pages for r in page] == ["l1", "ch1", "c1", "l2"]
+    assert pages[2][1] == []
+
+
+class FakeClient:
+    """search_content over a fixed ranked list, recording each call"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(params)
+        offset, limit = params["result_offset"], params["result_limit"]
+        self._data = [dict(r, total_count=len(self.rows)) for r in self.rows[offset:offset + limit]]
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self._data})()
+
+
+def test_page_past_the_end_still_reports_the_total(monkeypatch):
+    client = FakeClient([{"id": str(n)} for n in range(3)])
+    monkeypatch.setattr(SearchService, "use_memory_index", staticmethod(lambda: False))
+    monkeypatch.setattr(SearchService, "supabase_client", staticmethod(lambda: client))
+
+    page = SearchService.search("loops", ["lesson"], skip=2, limit=2)
+    assert (page["total"], len(page["results"]), len(client.calls)) == (3, 1, 1)
+
+    page = SearchService.search("loops", ["lesson"], skip=10, limit=2)
+    assert (page["total"], page["results"]) == (3, [])
+
+    client.rows = []
+    assert SearchService.search("nothing", ["lesson"], skip=10, limit=2)["total"] == 0
+
+
+def test_failed_load_leaves_the_index_unloaded(monkeypatch):
+    class FailingClient:
+        def table(self, name):
+            self._name = name
+            return self
+
+        def select(self, columns):
+            return self
+
+        def range(self, start, end):
+            return self
+
+        def execute(self):
+            if self._name == "lessons":
+                raise RuntimeError("connection reset")
+            return type("Result", (), {"data": [{"id": "c1", "course_id": "c1", "title": "Loops", "slug": "loops"}]})()
+
+    index = InMemorySearchIndex()
+    monkeypatch.setattr(search_module, "search_index", index)
+    monkeypatch.setattr(SearchService, "use_memory_index", staticmethod(lambda: True))
+    monkeypatch.setattr(SearchService, "supabase_client", staticmethod(lambda: FailingClient()))
+
+    with pytest.raises(RuntimeError):
+        SearchService.search("loops", ["course"])
+
+    assert index.loaded is False
+    assert index.search("loops", ["course", "chapter"], 0, 10) == (0, [])
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services import snapshot_service as snapshot_module
+from app.services.quiz_service import QuizService
+from app.services.snapshot_service import SnapshotService, snapshot_pointer_cache
+
+COURSE_ID = "6f1d3c1e-0000-4000-8000-000000000001"
+COURSE = {
+    "id": COURSE_ID, "title": "Course", "slug": "course", "cover_image": "", "status": "Published",
+    "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z", "chapters": [],
+}
+
+
+class FakeClient:
+    """courses row with a publish_version; update() honours the eq() filters"""
+
+    def __init__(self, publish_version):
+        self.row = {"id": COURSE_ID, "publish_version": publish_version, "snapshot": None}
+
+    def table(self, name):
+        self._filters = {}
+        return self
+
+    def update(self, values):
+        self._values = values
+        return self
+
+    def eq(self, column, value):
+        self._filters[column] = value
+        return self
+
+    def execute(self):
+        matched = all(self.row.get(column) == value for column, value in self._filters.items())
+        if matched:
+            self.row.update(self._values)
+        return type("Result", (), {"data": [self.row] if matched else []})()
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    monkeypatch.setattr(snapshot_module.storage_service, "head_sync", lambda bucket, path: None)
+    monkeypatch.setattr(snapshot_module.storage_service, "put_sync", lambda *args, **kwargs: None)
+    monkeypatch.setattr(QuizService, "get_quizzes_by_course", staticmethod(lambda course_id, published_only: []))
+
+
+def use_client(monkeypatch, client):
+    monkeypatch.setattr(SnapshotService, "supabase_client", staticmethod(lambda: client))
+
+
+def test_build_points_the_current_publish_at_its_snapshot(monkeypatch):
+    client = FakeClient("v2")
+    use_client(monkeypatch, client)
+    snapshot_pointer_cache.set(f"id:{COURSE_ID}", {"version": "v1"})
+
+    pointer = SnapshotService.build(dict(COURSE), "2024-06-01T10:00:00.123456+00:00", "v2")
+
+    assert pointer["version"] == "v2"
+    assert client.row["snapshot"] == pointer
+    assert snapshot_pointer_cache.get(f"id:{COURSE_ID}") is None
+
+
+def test_build_for_a_superseded_publish_leaves_the_pointer(monkeypatch):
+    client = FakeClient("v3")
+    use_client(monkeypatch, client)
+
+    assert SnapshotService.build(dict(COURSE), "2024-06-01T10:00:00+00:00", "v2") is None
+    assert client.row["snapshot"] is None
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.services.storage_backends import LocalStorageBackend, StorageObjectNotFound
+
+
+async def _chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_local_backend_round_trip(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    data = bytes(range(256)) * 100
+
+    async def scenario():
+        head = await storage.put("lesson-content", "a/b.mdx", _chunked(data, 1000), content_type="text/markdown")
+        assert head["size"] == len(data)
+        assert head["content_type"] == "text/markdown"
+        assert head["etag"] == (await storage.head("lesson-content", "a/b.mdx"))["etag"]
+
+        assert await storage.get("lesson-content", "a/b.mdx") == data
+        assert await storage.get("lesson-content", "a/b.mdx", offset=10, length=5) == data[10:15]
+
+        await storage.copy("lesson-content", "a/b.mdx", "c.mdx")
+        keys = [item["key"] async for item in storage.list("lesson-content")]
+        assert keys == ["a/b.mdx", "c.mdx"]
+
+        assert await storage.delete_many("lesson-content", ["a/b.mdx", "c.mdx", "missing.mdx"]) == 2
+        assert await storage.head("lesson-content", "a/b.mdx") is None
+        with pytest.raises(StorageObjectNotFound):
+            await storage.get("lesson-content", "c.mdx")
+
+    asyncio.run(scenario())
+
+
+def test_local_backend_rejects_paths_outside_bucket(tmp_path):
+    storage = LocalStorageBackend(str(tmp_path))
+    with pytest.raises(ValueError):
+        asyncio.run(storage.put("lesson-content", "../escape.mdx", b"x"))
+
+
+def test_copy_many_reports_missing_sources(tmp_path):
+    from app.services.storage_service import StorageService
+
+    service = StorageService(default_backend="local", bucket_map="")
+    service.register("local", LocalStorageBackend(str(tmp_path)))
+    service.put_sync("lesson-content", "a.mdx", b"# A")
+
+    failed = service.copy_many_sync("lesson-content", [("a.mdx", "b.mdx"), ("missing.mdx", "c.mdx")])
+    assert failed == ["missing.mdx"]
+    assert service.get_sync("lesson-content", "b.mdx") == b"# A"
+    assert service.head_sync("lesson-content", "c.mdx") is None
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.storage_gc import StorageGCService
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+OLD = NOW - timedelta(days=7)
+HASH = "a" * 64
+
+
+class MemoryBucket:
+    name = "lesson-images"
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.deleted = []
+
+    def list_objects(self):
+        return iter(self.objects)
+
+    def delete(self, keys):
+        self.deleted.extend(keys)
+        return len(keys)
+
+
+def _obj(key, modified=OLD, size=10):
+    return {"key": key, "size": size, "last_modified": modified}
+
+
+def test_dry_run_reports_orphans_without_deleting():
+    bucket = MemoryBucket([_obj("keep.png"), _obj("orphan.png", size=42)])
+    report = StorageGCService.collect(bucket, {"keep.png"}, dry_run=True, min_age_seconds=3600, now=NOW)
+
+    assert report["orphaned"] == 1
+    assert report["orphaned_bytes"] == 42
+    assert report["sample"] == ["orphan.png"]
+    assert bucket.deleted == []
+
+
+def test_referenced_variant_keeps_whole_image_group_and_recent_objects_survive():
+    bucket = MemoryBucket([
+        _obj(f"images/{HASH}/320x200.webp"),
+        _obj(f"images/{HASH}/640x400.webp"),
+        _obj("pending-upload.png", modified=NOW - timedelta(minutes=5)),
+        _obj("orphan.png"),
+    ])
+    report = StorageGCService.collect(
+        bucket, {f"images/{HASH}"}, dry_run=False, min_age_seconds=3600, now=NOW,
+    )
+
+    assert report["referenced"] == 2
+    assert report["skipped_recent"] == 1
+    assert bucket.deleted == ["orphan.png"]
+    assert report["deleted"] == 1
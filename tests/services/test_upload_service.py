@@ -0,0 +1,25 @@
+import tempfile
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas import PresignedUploadCreate
+from app.services import upload_service as upload_module
+from app.services.storage_backends import LocalStorageBackend
+from app.services.upload_service import UploadService
+
+
+def test_presign_on_a_backend_without_direct_uploads_is_501(monkeypatch):
+    backend = LocalStorageBackend(tempfile.mkdtemp())
+    monkeypatch.setattr(upload_module.storage_service, "resolve", lambda bucket: (backend, bucket))
+    monkeypatch.setattr(UploadService, "_ensure_owner_exists", staticmethod(lambda kind, owner_id: None))
+    request = PresignedUploadCreate(
+        kind="lesson-content", owner_id=uuid.uuid4(), filename="intro.mdx", content_type="text/markdown", size=10,
+    )
+
+    with pytest.raises(HTTPException) as error:
+        UploadService.create_presigned_upload(request)
+
+    assert error.value.status_code == 501
+    assert "local storage does not support direct uploads" in error.value.detail
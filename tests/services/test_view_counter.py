@@ -0,0 +1,59 @@
+import uuid
+
+import pytest
+
+from app.services import view_counter as view_counter_module
+from app.services.view_counter import ViewCounter
+
+
+class FakeRpc:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(params["increments"])
+        return self
+
+    def execute(self):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        return type("Result", (), {"data": len(self.calls[-1])})()
+
+
+@pytest.fixture(params=["memory", "file"])
+def counter(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(view_counter_module.settings, "view_buffer_mode", request.param)
+    monkeypatch.setattr(view_counter_module.settings, "view_spool_path", str(tmp_path / "views.log"))
+    monkeypatch.setattr(view_counter_module.settings, "view_flush_max_pending", 3)
+    return ViewCounter()
+
+
+def test_flush_aggregates_views_into_one_call(counter, monkeypatch):
+    rpc = FakeRpc()
+    monkeypatch.setattr(ViewCounter, "supabase_client", staticmethod(lambda: rpc))
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+
+    assert counter.record(a) is False
+    assert counter.record(b) is False
+    assert counter.record(a) is True  # view_flush_max_pending reached
+
+    report = counter.flush()
+    assert report["flushed"] == 3
+    assert rpc.calls == [[{"id": a, "count": 2}, {"id": b, "count": 1}]]
+    assert counter.metrics()["pending_views"] == 0 and counter.flush_lag() == 0
+
+
+def test_failed_flush_keeps_views_for_the_next_attempt(counter, monkeypatch):
+    rpc = FakeRpc(fail=True)
+    monkeypatch.setattr(ViewCounter, "supabase_client", staticmethod(lambda: rpc))
+    lesson_id = str(uuid.uuid4())
+    counter.record(lesson_id)
+    counter.record(lesson_id)
+
+    assert counter.flush()["status"] == "failed"
+    assert counter.metrics()["flush_failures"] == 1
+
+    rpc.fail = False
+    assert counter.flush()["flushed"] == 2
+    assert rpc.calls[-1] == [{"id": lesson_id, "count": 2}]